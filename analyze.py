@@ -0,0 +1,277 @@
+"""
+Batch analysis : search many positions with the engine on a pool of processes, and write the results in
+a JSONL file (one JSON object by line)
+
+The positions are read one at a time from a file of FEN strings (one by line, the lines starting with #
+are ignored) or from the games of a PGN file. Only a few positions are waiting for a process at a time
+and each result is written (and flushed) as soon as it is found, so the memory used doesn't depend on
+the number of positions, and the results already written are kept if the analysis is interrupted. Run :
+	python analyze.py --fens positions.txt --depth 5 --workers 4 --output results.jsonl
+	python analyze.py --pgn games.pgn --movetime 500 --every 10 --output results.jsonl
+
+Each line of the output has the id (the number of the position in the input), the FEN string, the best
+move (UCI notation), the score for the player who has the turn (centipawns), the depth, the nodes, the
+time (seconds), the principal variation and the process which searched it. At the end, the number of
+positions, the nodes per second and the positions per second of each process are printed
+"""
+
+import argparse
+import concurrent.futures
+import json
+import os
+import signal
+import sys
+import time
+
+from bitboard import Position
+from engine import Searcher, MAX_DEPTH
+from movegen import moveToUci
+from transposition import TranspositionTable, DEFAULT_SIZE
+import pgn
+
+# The number of positions waiting for a process, for each process
+PENDING_BY_WORKER = 4
+
+# The time budget of the searches at a fixed depth, in milliseconds (they are never stopped by the time)
+UNLIMITED_TIME = 10 ** 9
+
+# The transposition table of a process of the pool, kept between its searches
+_table = None
+
+
+def readFens(path):
+	"""
+	Read the FEN strings of a file, one at a time. An EPD line (a FEN string without the move counters,
+	followed by operations) is accepted too
+	@param path: the path of the file
+	@type path: str
+	@return: a generator of the FEN strings
+	@rtype: generator
+	"""
+
+	with open(path, encoding='utf-8') as file:
+		for line in file:
+			line = line.strip()
+
+			if line and line[0] != '#':
+				fields = line.split()
+				counters = fields[4:6] if len(fields) >= 6 and fields[4].isdigit() and fields[5].isdigit() else ['0', '1']
+				yield ' '.join(fields[:4] + counters)
+
+
+def readPgnPositions(path, every=1, useMmap=False):
+	"""
+	Read the positions of the games of a PGN file, one at a time
+	@param path: the path of the file
+	@type path: str
+	@param every: keep one position every this number of plies
+	@type every: int
+	@param useMmap: if the file must be read through mmap
+	@type useMmap: bool
+	@return: a generator of the FEN strings
+	@rtype: generator
+	"""
+
+	for number, game in enumerate(pgn.readGames(path, useMmap), 1):
+		try:
+			for ply, (position, _) in enumerate(game.replay()):
+				if ply % every == 0:
+					yield position.toFen()
+		except ValueError as error:
+			print(f'game {number} ({game}) : {error}, the rest of the game is skipped', file=sys.stderr)
+
+
+def _initWorker(hashSize):
+	"""
+	Create the transposition table of a process of the pool
+	@param hashSize: the size of the table, in megabytes
+	@type hashSize: float
+	@return: None
+	@rtype: None
+	"""
+
+	global _table
+	_table = TranspositionTable(hashSize)
+
+	# Ctrl+C only stops the main process, which stops giving positions to the pool
+	signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def analyzePosition(positionId, fen, depth, moveTime):
+	"""
+	Search a position in a process of the pool
+	@param positionId: the number of the position in the input
+	@type positionId: int
+	@param fen: the FEN string of the position
+	@type fen: str
+	@param depth: the depth of the search (or None to search until the time budget is spent)
+	@type depth: int
+	@param moveTime: the time budget, in milliseconds (or None for a search at a fixed depth)
+	@type moveTime: int
+	@return: the result, as a dict written in the output
+	@rtype: dict
+	"""
+
+	startTime = time.perf_counter()
+
+	try:
+		position = Position.fromFen(fen)
+	except ValueError as error:
+		return {'id': positionId, 'fen': fen, 'error': str(error), 'worker': os.getpid()}
+
+	timeLimit = moveTime if moveTime is not None else UNLIMITED_TIME
+	result = Searcher(position, timeLimit, table=_table).search(depth if depth is not None else MAX_DEPTH)
+
+	return {
+		'id': positionId,
+		'fen': fen,
+		'bestmove': moveToUci(result.move) if result.move is not None else None,
+		'score': result.score,
+		'depth': result.depth,
+		'nodes': result.nodes,
+		'time': round(time.perf_counter() - startTime, 4),
+		'pv': [moveToUci(move) for move in result.pv],
+		'worker': os.getpid()
+	}
+
+
+def analyze(fens, output, workers, depth=None, moveTime=None, hashSize=DEFAULT_SIZE):
+	"""
+	Search positions on a pool of processes and write the results as soon as they are found (not in the
+	order of the input)
+	@param fens: the FEN strings of the positions (an iterable read as the processes are free)
+	@type fens: iterable
+	@param output: the text file where the JSON lines are written
+	@type output: file
+	@param workers: the number of processes
+	@type workers: int
+	@param depth: the depth of the searches (or None to search until the time budget is spent)
+	@type depth: int
+	@param moveTime: the time budget of each search, in milliseconds (or None for a fixed depth)
+	@type moveTime: int
+	@param hashSize: the size of the transposition table of each process, in megabytes
+	@type hashSize: float
+	@return: the statistics of each process : a dict of {pid: [positions, nodes, search time]}
+	@rtype: dict
+	"""
+
+	stats = {}
+	pending = set()
+
+	# The id and the FEN string of each position searched, to write an error if its search fails
+	submitted = {}
+	fens = iter(fens)
+	positionId = 0
+
+	with concurrent.futures.ProcessPoolExecutor(workers, initializer=_initWorker, initargs=(hashSize,)) as executor:
+		try:
+			while True:
+				# Keep a few positions waiting for each process, without reading all the input
+				while len(pending) < workers * PENDING_BY_WORKER:
+					fen = next(fens, None)
+					if fen is None:
+						break
+
+					future = executor.submit(analyzePosition, positionId, fen, depth, moveTime)
+					submitted[future] = (positionId, fen)
+					pending.add(future)
+					positionId += 1
+
+				if not pending:
+					break
+
+				done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+
+				for future in done:
+					failedId, failedFen = submitted.pop(future)
+
+					# A position the search cannot handle only gives an error line, the others are searched
+					try:
+						result = future.result()
+					except Exception as error:
+						result = {'id': failedId, 'fen': failedFen, 'error': f'{type(error).__name__}: {error}',
+							'worker': None}
+
+					output.write(json.dumps(result) + '\n')
+					output.flush()
+
+					if result['worker'] is None:
+						continue
+
+					workerStats = stats.setdefault(result['worker'], [0, 0, 0])
+					workerStats[0] += 1
+					workerStats[1] += result.get('nodes', 0)
+					workerStats[2] += result.get('time', 0)
+		except KeyboardInterrupt:
+			# Keep the results already written, and don't search the waiting positions
+			executor.shutdown(cancel_futures=True)
+			print('Interrupted, the results already found are written', file=sys.stderr)
+
+	return stats
+
+
+def printStats(stats, elapsedTime):
+	"""
+	Print the throughput of each process and of the whole pool
+	@param stats: the statistics returned by analyze()
+	@type stats: dict
+	@param elapsedTime: the duration of the analysis, in seconds
+	@type elapsedTime: float
+	@return: None
+	@rtype: None
+	"""
+
+	for pid, (positions, nodes, searchTime) in sorted(stats.items()):
+		nodesPerSecond = nodes / searchTime if searchTime > 0 else 0
+		positionsPerSecond = positions / searchTime if searchTime > 0 else 0
+		print(f'worker {pid} : {positions} positions, {nodes} nodes, nps {nodesPerSecond:.0f}, '
+			f'{positionsPerSecond:.2f} positions/s', file=sys.stderr)
+
+	positions = sum(workerStats[0] for workerStats in stats.values())
+	nodes = sum(workerStats[1] for workerStats in stats.values())
+	if elapsedTime > 0:
+		print(f'total : {positions} positions in {elapsedTime:.2f}s, nps {nodes / elapsedTime:.0f}, '
+			f'{positions / elapsedTime:.2f} positions/s', file=sys.stderr)
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Search many positions with the engine and write the results as JSON lines')
+	source = parser.add_mutually_exclusive_group(required=True)
+	source.add_argument('--fens', help='a file of FEN strings, one by line')
+	source.add_argument('--pgn', help='a PGN file, whose positions are searched')
+	parser.add_argument('--every', type=int, default=1, help='search one position every this number of plies of the PGN games')
+	parser.add_argument('--mmap', action='store_true', help='read the PGN file through mmap')
+	limit = parser.add_mutually_exclusive_group()
+	limit.add_argument('--depth', type=int, help='the depth of the searches (5 by default)')
+	limit.add_argument('--movetime', type=int, help='the time budget of each search, in milliseconds')
+	parser.add_argument('--workers', type=int, default=os.cpu_count(), help='the number of processes')
+	parser.add_argument('--hash', type=float, default=DEFAULT_SIZE, help='the size of the transposition table of each process, in megabytes')
+	parser.add_argument('--output', help='the JSONL file of the results (standard output by default)')
+	parser.add_argument('--append', action='store_true', help='add the results at the end of the output file')
+	arguments = parser.parse_args()
+
+	depth = arguments.depth
+	if depth is None and arguments.movetime is None:
+		depth = 5
+
+	if arguments.fens is not None:
+		fens = readFens(arguments.fens)
+	else:
+		fens = readPgnPositions(arguments.pgn, arguments.every, arguments.mmap)
+
+	output = sys.stdout
+	if arguments.output is not None:
+		output = open(arguments.output, 'a' if arguments.append else 'w', encoding='utf-8')
+
+	startTime = time.perf_counter()
+	try:
+		stats = analyze(fens, output, arguments.workers, depth, arguments.movetime, arguments.hash)
+	finally:
+		if output is not sys.stdout:
+			output.close()
+
+	printStats(stats, time.perf_counter() - startTime)
+
+
+if __name__ == '__main__':
+	main()
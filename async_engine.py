@@ -0,0 +1,212 @@
+"""
+The engine thinking in a background thread, so the game window keeps drawing and handling its events
+while the engine searches
+
+The game loop starts a search with think() and calls poll() at each frame until the result is ready.
+A search can be stopped at any time (when the window is closed), and the engine can ponder : think on
+the time of the opponent, searching the position after the move it expects from him. If the opponent
+plays this move, the pondering search goes on as the search of the next move, with the normal time
+budget from the opponent's move
+"""
+
+import threading
+
+from bitboard import NO_MOVE
+from engine import searchPosition, MAX_DEPTH, PAWN_TABLE
+
+# The time budget of a pondering search, in milliseconds : it only ends when it is stopped or when the
+# opponent plays the expected move
+PONDER_TIME_LIMIT = 24 * 60 * 60 * 1000
+
+
+class AsyncEngine:
+	"""
+	An engine searching in a background thread. Only one search runs at a time
+	"""
+
+	def __init__(self, timeLimit, table=None, workers=1, info=None, book=None):
+		"""
+		@param timeLimit: the time budget of each move, in milliseconds
+		@type timeLimit: int
+		@param table: the transposition table, kept between the searches (or None to use a new one each time)
+		@type table: TranspositionTable
+		@param workers: the number of processes of each search (see smp.py)
+		@type workers: int
+		@param info: a function called with a SearchResult after each iteration (or None)
+		@type info: function
+		@param book: the opening book, consulted before each search (or None)
+		@type book: OpeningBook
+		"""
+
+		self.timeLimit = timeLimit
+		self.table = table
+		self.workers = workers
+		self.info = info
+		self.book = book
+
+		# The pawn structure cache of the searches run by this process
+		self.pawnTable = PAWN_TABLE
+
+		self.thread = None
+		self.stopEvent = None
+		self.result = None
+
+		# The move expected from the opponent while pondering, and the timer ending the search after a
+		# ponder hit
+		self.pondering = False
+		self.ponderMove = NO_MOVE
+		self.ponderTimer = None
+
+	def __repr__(self):
+		"""Used for debugging"""
+		state = 'pondering' if self.pondering else 'thinking' if self.isThinking() else 'idle'
+		return f'async engine {state}'
+
+	def isThinking(self):
+		"""
+		Return if a search is running or has a result not read yet
+		@return: if a search is running
+		@rtype: bool
+		"""
+
+		return self.thread is not None
+
+	def think(self, position, maxDepth=MAX_DEPTH):
+		"""
+		Start the search of the best move of the player who has the turn, the result is read with poll()
+		@param position: the position (it is copied, so it can change during the search)
+		@type position: Position
+		@param maxDepth: the maximal depth
+		@type maxDepth: int
+		@return: None
+		@rtype: None
+		"""
+
+		self.stop()
+		self._start(position.copy(), self.timeLimit, maxDepth)
+
+	def ponder(self, position, move):
+		"""
+		Start searching, on the time of the opponent, the position after the move expected from him
+		@param position: the position where the opponent has the turn
+		@type position: Position
+		@param move: the move expected from the opponent
+		@type move: int
+		@return: None
+		@rtype: None
+		"""
+
+		self.stop()
+
+		position = position.copy()
+		position.makeMove(move)
+
+		self.pondering = True
+		self.ponderMove = move
+		self._start(position, PONDER_TIME_LIMIT, MAX_DEPTH)
+
+	def opponentMoved(self, move):
+		"""
+		Tell the engine the move played by the opponent. If it is the move expected while pondering (ponder
+		hit), the pondering search becomes the search of the next move and gets the normal time budget.
+		Otherwise the pondering search is stopped, and think() must be called
+		@param move: the move played
+		@type move: int
+		@return: if the pondering search goes on
+		@rtype: bool
+		"""
+
+		if not self.pondering:
+			return False
+
+		if move != self.ponderMove:
+			self.stop()
+			return False
+
+		self.pondering = False
+		self.ponderTimer = threading.Timer(self.timeLimit / 1000, self.stopEvent.set)
+		self.ponderTimer.daemon = True
+		self.ponderTimer.start()
+
+		return True
+
+	def poll(self):
+		"""
+		Return the result of the search if it is finished. The result is only returned once
+		@return: the result of the search, or None if it isn't finished (or if the engine is pondering)
+		@rtype: SearchResult
+		"""
+
+		if self.pondering or self.thread is None or self.thread.is_alive():
+			return None
+
+		result = self.result
+		self._reset()
+
+		return result
+
+	def stop(self):
+		"""
+		Stop the search and wait for its thread, the result is dropped
+		@return: None
+		@rtype: None
+		"""
+
+		if self.thread is not None:
+			self.stopEvent.set()
+			self.thread.join()
+
+		self._reset()
+
+	def _reset(self):
+		"""
+		Forget the finished search
+		@return: None
+		@rtype: None
+		"""
+
+		if self.ponderTimer is not None:
+			self.ponderTimer.cancel()
+
+		self.thread = None
+		self.stopEvent = None
+		self.result = None
+		self.pondering = False
+		self.ponderMove = NO_MOVE
+		self.ponderTimer = None
+
+	def _start(self, position, timeLimit, maxDepth):
+		"""
+		Start a search in a new thread
+		@param position: the position, owned by the search
+		@type position: Position
+		@param timeLimit: the time budget, in milliseconds
+		@type timeLimit: int
+		@param maxDepth: the maximal depth
+		@type maxDepth: int
+		@return: None
+		@rtype: None
+		"""
+
+		self.stopEvent = threading.Event()
+		self.thread = threading.Thread(target=self._search, args=(position, timeLimit, maxDepth, self.stopEvent),
+			daemon=True)
+		self.thread.start()
+
+	def _search(self, position, timeLimit, maxDepth, stopEvent):
+		"""
+		The search, run by the thread
+		@param position: the position
+		@type position: Position
+		@param timeLimit: the time budget, in milliseconds
+		@type timeLimit: int
+		@param maxDepth: the maximal depth
+		@type maxDepth: int
+		@param stopEvent: the event which stops the search
+		@type stopEvent: threading.Event
+		@return: None
+		@rtype: None
+		"""
+
+		self.result = searchPosition(position, timeLimit, maxDepth, self.info, self.table, self.workers, stopEvent,
+			self.book)
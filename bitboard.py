@@ -0,0 +1,824 @@
+"""
+Bitboard representation of a chess position
+
+Each kind of piece of each color is stored in a 64 bits integer (a bitboard), where the bit n is set
+when a piece of this kind stands on the square n. The square n is the case (n % 8, n // 8) of
+ChessBoard.mainChessBoard, so the square 0 is the top left corner of the board (a8, black side) and
+the square 63 is the bottom right corner (h1, white side)
+"""
+
+from piece import Piece, Pawn, Knight, Bishop, Rook, Queen, King
+from zobrist import PIECE_KEYS, PAWN_KEYS, SIDE_KEY, CASTLING_KEYS, EN_PASSANT_KEYS
+from piece_square import PIECE_SQUARE_SCORES
+
+# Colors
+COLOR_WHITE = 0
+COLOR_BLACK = 1
+COLOR_NAMES = ('white', 'black')
+COLOR_INDEXES = {'white': COLOR_WHITE, 'black': COLOR_BLACK}
+
+# Piece types
+PAWN = 0
+KNIGHT = 1
+BISHOP = 2
+ROOK = 3
+QUEEN = 4
+KING = 5
+PIECE_TYPES = (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING)
+
+# The Piece class of each piece type, used to convert a position from/to a 2D List
+PIECE_CLASSES = (Pawn, Knight, Bishop, Rook, Queen, King)
+
+# Masks
+FULL_BOARD = 0xFFFFFFFFFFFFFFFF
+FILE_A = 0x0101010101010101
+FILE_H = FILE_A << 7
+RANK_8 = 0xFF
+RANK_1 = RANK_8 << 56
+
+# The bitboard of each square
+SQUARE_BITS = [1 << square for square in range(64)]
+
+# Castling rights, stored together as bits in Position.castling
+CASTLING_WHITE_KINGSIDE = 1
+CASTLING_WHITE_QUEENSIDE = 2
+CASTLING_BLACK_KINGSIDE = 4
+CASTLING_BLACK_QUEENSIDE = 8
+
+# The castling rights kept when a piece moves from or to each square : moving the king or a rook, or
+# capturing a rook, loses the corresponding rights
+CASTLING_RIGHTS_MASKS = [15] * 64
+CASTLING_RIGHTS_MASKS[0] = 15 ^ CASTLING_BLACK_QUEENSIDE
+CASTLING_RIGHTS_MASKS[4] = 15 ^ (CASTLING_BLACK_KINGSIDE | CASTLING_BLACK_QUEENSIDE)
+CASTLING_RIGHTS_MASKS[7] = 15 ^ CASTLING_BLACK_KINGSIDE
+CASTLING_RIGHTS_MASKS[56] = 15 ^ CASTLING_WHITE_QUEENSIDE
+CASTLING_RIGHTS_MASKS[60] = 15 ^ (CASTLING_WHITE_KINGSIDE | CASTLING_WHITE_QUEENSIDE)
+CASTLING_RIGHTS_MASKS[63] = 15 ^ CASTLING_WHITE_KINGSIDE
+
+# The initial squares of the king and the rook of each castling
+CASTLING_HOME_SQUARES = (
+	(CASTLING_WHITE_KINGSIDE, COLOR_WHITE, 60, 63),
+	(CASTLING_WHITE_QUEENSIDE, COLOR_WHITE, 60, 56),
+	(CASTLING_BLACK_KINGSIDE, COLOR_BLACK, 4, 7),
+	(CASTLING_BLACK_QUEENSIDE, COLOR_BLACK, 4, 0)
+)
+
+# The letters of the pieces in the FEN notation, by piece code
+PIECE_LETTERS = 'PNBRQKpnbrqk'
+
+# The letters of the castling rights in the FEN notation
+CASTLING_LETTERS = (
+	('K', CASTLING_WHITE_KINGSIDE),
+	('Q', CASTLING_WHITE_QUEENSIDE),
+	('k', CASTLING_BLACK_KINGSIDE),
+	('q', CASTLING_BLACK_QUEENSIDE)
+)
+
+# The FEN of the initial position
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# The (fromSq, toSq) move of the rook when the king castles, by destination square of the king
+CASTLING_ROOK_MOVES = {62: (63, 61), 58: (56, 59), 6: (7, 5), 2: (0, 3)}
+
+# The moves are packed in 16 bits integers :
+#	- bits 0-5 : the start square
+#	- bits 6-11 : the destination square
+#	- bits 12-13 : the type of the promotion piece, minus KNIGHT
+#	- bits 14-15 : the kind of the move
+# The move from a8 to a8 (0) is never legal, so it is used as NO_MOVE
+MOVE_NORMAL = 0
+MOVE_PROMOTION = 1 << 14
+MOVE_EN_PASSANT = 2 << 14
+MOVE_CASTLING = 3 << 14
+MOVE_KIND_MASK = 3 << 14
+NO_MOVE = 0
+
+# The maximal number of legal moves of a position is 218, so a move buffer of this size is never full
+MAX_MOVES = 256
+
+# MOVES[fromSq][toSq] : the normal moves, built once so the move generators don't create new integers
+MOVES = [[fromSq | toSq << 6 for toSq in range(64)] for fromSq in range(64)]
+
+
+def square(x, y):
+	"""
+	Return the square index of a case of the board
+	@param x: the x coord of the case
+	@type x: int
+	@param y: the y coord of the case
+	@type y: int
+	@return: the square index (0-63)
+	@rtype: int
+	"""
+
+	return y * 8 + x
+
+
+def squareCoord(sq):
+	"""
+	Return the (x, y) coord of a square index
+	@param sq: the square index (0-63)
+	@type sq: int
+	@return: the coord of the square
+	@rtype: tuple
+	"""
+
+	return sq & 7, sq >> 3
+
+
+def pieceCode(color, pieceType):
+	"""
+	Return the code of a piece, used to index Position.pieces
+	@param color: COLOR_WHITE or COLOR_BLACK
+	@type color: int
+	@param pieceType: PAWN, KNIGHT, BISHOP, ROOK, QUEEN or KING
+	@type pieceType: int
+	@return: the code of the piece (0-11)
+	@rtype: int
+	"""
+
+	return color * 6 + pieceType
+
+
+def popCount(bitboard):
+	"""
+	Return the number of squares set in a bitboard
+	@param bitboard: the bitboard
+	@type bitboard: int
+	@return: the number of bits set
+	@rtype: int
+	"""
+
+	return bin(bitboard).count('1')
+
+
+def squares(bitboard):
+	"""
+	Yield the index of each square set in a bitboard, from the lowest to the highest
+	@param bitboard: the bitboard
+	@type bitboard: int
+	@return: a generator of square indexes
+	@rtype: generator
+	"""
+
+	while bitboard:
+		lowestBit = bitboard & -bitboard
+		yield lowestBit.bit_length() - 1
+		bitboard ^= lowestBit
+
+
+def squareName(sq):
+	"""
+	Return the name of a square in the algebraic notation, like 'e4'
+	@param sq: the square index
+	@type sq: int
+	@return: the name of the square
+	@rtype: str
+	"""
+
+	return 'abcdefgh'[sq & 7] + str(8 - (sq >> 3))
+
+
+def squareFromName(name):
+	"""
+	Return the square index of a square name in the algebraic notation
+	@param name: the name of the square, like 'e4'
+	@type name: str
+	@return: the square index
+	@rtype: int
+	"""
+
+	return square('abcdefgh'.index(name[0]), 8 - int(name[1]))
+
+
+def encodeMove(fromSq, toSq, kind=MOVE_NORMAL, promotion=KNIGHT):
+	"""
+	Pack a move in an integer
+	@param fromSq: the start square
+	@type fromSq: int
+	@param toSq: the destination square
+	@type toSq: int
+	@param kind: MOVE_NORMAL, MOVE_PROMOTION, MOVE_EN_PASSANT or MOVE_CASTLING
+	@type kind: int
+	@param promotion: the type of the promotion piece, for MOVE_PROMOTION
+	@type promotion: int
+	@return: the move
+	@rtype: int
+	"""
+
+	return fromSq | toSq << 6 | (promotion - KNIGHT) << 12 | kind
+
+
+def moveFrom(move):
+	"""
+	Return the start square of a move
+	@param move: the move
+	@type move: int
+	@return: the start square
+	@rtype: int
+	"""
+
+	return move & 63
+
+
+def moveTo(move):
+	"""
+	Return the destination square of a move
+	@param move: the move
+	@type move: int
+	@return: the destination square
+	@rtype: int
+	"""
+
+	return move >> 6 & 63
+
+
+def movePromotion(move):
+	"""
+	Return the type of the promotion piece of a move
+	@param move: the move
+	@type move: int
+	@return: the piece type (or None if the move isn't a promotion)
+	@rtype: int
+	"""
+
+	if move & MOVE_KIND_MASK == MOVE_PROMOTION:
+		return (move >> 12 & 3) + KNIGHT
+
+	return None
+
+
+def moveToCoords(move):
+	"""
+	Return the coords of the start and of the destination of a move, the (x, y) tuples used by
+	ChessBoard.mainChessBoard and ChessBoard.possiblesMovesBoard
+	@param move: the move
+	@type move: int
+	@return: the ((x1, y1), (x2, y2)) coords
+	@rtype: tuple
+	"""
+
+	return squareCoord(move & 63), squareCoord(move >> 6 & 63)
+
+
+class Position:
+	"""
+	A chess position stored as bitboards :
+		- pieces, a bitboard for each piece code (see pieceCode())
+		- colors, a bitboard with all the pieces of each color
+		- occupied, a bitboard with all the pieces
+		- squares, the piece code on each square (or None), to find quickly which piece is on a square
+	and the state of the game : the side to move, the castling rights, the en passant square (the square
+	a pawn just skipped with his first move) and the move counters.
+	The Zobrist hash of the position is updated each time a piece or the state changes, like the hash of
+	its pawns alone and the sum of the piece-square scores of the pieces (see piece_square), and the moves
+	can be taken back with the undo stack
+	"""
+
+	def __init__(self):
+		self.pieces = [0] * 12
+		self.colors = [0, 0]
+		self.occupied = 0
+		self.squares = [None] * 64
+
+		self.sideToMove = COLOR_WHITE
+		self.castling = 0
+		self.epSquare = None
+		self.halfmoveClock = 0
+		self.fullmoveNumber = 1
+
+		self.hash = CASTLING_KEYS[0]
+		self.pawnHash = 0
+
+		# The packed material and piece-square score, from the point of view of white
+		self.pieceSquareScore = 0
+
+		# The (move, captured piece, castling, epSquare, halfmoveClock, hash) records of the moves played
+		self.undoStack = []
+
+	def __repr__(self):
+		"""Used for debugging"""
+		stringToReturn = ''
+
+		for y in range(8):
+			for x in range(8):
+				code = self.squares[square(x, y)]
+
+				if code is None:
+					stringToReturn += '.'
+				else:
+					stringToReturn += PIECE_LETTERS[code]
+
+			stringToReturn += '\n'
+
+		return stringToReturn
+
+	def copy(self):
+		"""
+		Return a copy of the position
+		@return: the copy
+		@rtype: Position
+		"""
+
+		position = Position.__new__(Position)
+		position.__dict__.update(self.__dict__)
+		position.pieces = self.pieces[:]
+		position.colors = self.colors[:]
+		position.squares = self.squares[:]
+		position.undoStack = self.undoStack[:]
+
+		return position
+
+	def putPiece(self, code, sq):
+		"""
+		Put a piece on an empty square
+		@param code: the code of the piece
+		@type code: int
+		@param sq: the square
+		@type sq: int
+		@return: None
+		@rtype: None
+		"""
+
+		bit = SQUARE_BITS[sq]
+
+		self.pieces[code] |= bit
+		self.colors[code // 6] |= bit
+		self.occupied |= bit
+		self.squares[sq] = code
+		self.hash ^= PIECE_KEYS[code][sq]
+		self.pawnHash ^= PAWN_KEYS[code][sq]
+		self.pieceSquareScore += PIECE_SQUARE_SCORES[code][sq]
+
+	def removePiece(self, sq):
+		"""
+		Remove the piece of a square
+		@param sq: the square
+		@type sq: int
+		@return: the code of the removed piece
+		@rtype: int
+		"""
+
+		code = self.squares[sq]
+		bit = SQUARE_BITS[sq]
+
+		self.pieces[code] ^= bit
+		self.colors[code // 6] ^= bit
+		self.occupied ^= bit
+		self.squares[sq] = None
+		self.hash ^= PIECE_KEYS[code][sq]
+		self.pawnHash ^= PAWN_KEYS[code][sq]
+		self.pieceSquareScore -= PIECE_SQUARE_SCORES[code][sq]
+
+		return code
+
+	def movePiece(self, fromSq, toSq):
+		"""
+		Move the piece of a square to another square, removing the piece that was on it
+		@param fromSq: the square of the piece to move
+		@type fromSq: int
+		@param toSq: the new square of the piece
+		@type toSq: int
+		@return: the code of the removed piece (or None)
+		@rtype: int
+		"""
+
+		captured = self.squares[toSq]
+
+		if captured is not None:
+			self.removePiece(toSq)
+
+		self.putPiece(self.removePiece(fromSq), toSq)
+
+		return captured
+
+	def makeMove(self, move):
+		"""
+		Play a move and give the turn to the other player. Handle the captures, the castling, the en
+		passant captures and the promotions. The state the move cannot restore by itself is pushed on the
+		undo stack, so unmakeMove() can take the move back
+		@param move: the packed move (see encodeMove())
+		@type move: int
+		@return: the code of the captured piece (or None)
+		@rtype: int
+		"""
+
+		fromSq = move & 63
+		toSq = move >> 6 & 63
+		kind = move & MOVE_KIND_MASK
+		code = self.squares[fromSq]
+		color = code // 6
+		epSquare = self.epSquare
+
+		captured = self.squares[toSq]
+		self.undoStack.append((move, captured, self.castling, epSquare, self.halfmoveClock, self.hash))
+
+		self.halfmoveClock += 1
+
+		if captured is not None:
+			self.removePiece(toSq)
+			self.halfmoveClock = 0
+
+		self.removePiece(fromSq)
+
+		if epSquare is not None:
+			self.hash ^= EN_PASSANT_KEYS[epSquare & 7]
+			self.epSquare = None
+
+		if kind == MOVE_NORMAL:
+			self.putPiece(code, toSq)
+
+			if code % 6 == PAWN:
+				self.halfmoveClock = 0
+
+				if toSq - fromSq == 16 or fromSq - toSq == 16:
+					self.epSquare = (fromSq + toSq) >> 1
+					self.hash ^= EN_PASSANT_KEYS[toSq & 7]
+		elif kind == MOVE_PROMOTION:
+			self.putPiece(code + (move >> 12 & 3) + KNIGHT, toSq)
+			self.halfmoveClock = 0
+		elif kind == MOVE_EN_PASSANT:
+			# The captured pawn is behind the destination square
+			self.putPiece(code, toSq)
+			captured = self.removePiece(toSq + 8 if color == COLOR_WHITE else toSq - 8)
+			self.halfmoveClock = 0
+		else:
+			# Castling : the rook jumps over the king
+			self.putPiece(code, toSq)
+			rookFrom, rookTo = CASTLING_ROOK_MOVES[toSq]
+			self.putPiece(self.removePiece(rookFrom), rookTo)
+
+		castling = self.castling & CASTLING_RIGHTS_MASKS[fromSq] & CASTLING_RIGHTS_MASKS[toSq]
+		if castling != self.castling:
+			self.hash ^= CASTLING_KEYS[self.castling] ^ CASTLING_KEYS[castling]
+			self.castling = castling
+
+		if color == COLOR_BLACK:
+			self.fullmoveNumber += 1
+		self.sideToMove = color ^ 1
+		self.hash ^= SIDE_KEY
+
+		return captured
+
+	def unmakeMove(self):
+		"""
+		Take back the last move played with makeMove()
+		@return: the move taken back
+		@rtype: int
+		"""
+
+		move, captured, self.castling, self.epSquare, self.halfmoveClock, hashKey = self.undoStack.pop()
+		fromSq = move & 63
+		toSq = move >> 6 & 63
+		kind = move & MOVE_KIND_MASK
+
+		color = self.sideToMove ^ 1
+		self.sideToMove = color
+		if color == COLOR_BLACK:
+			self.fullmoveNumber -= 1
+
+		code = self.removePiece(toSq)
+
+		if kind == MOVE_PROMOTION:
+			code = pieceCode(color, PAWN)
+		elif kind == MOVE_EN_PASSANT:
+			self.putPiece(pieceCode(color ^ 1, PAWN), toSq + 8 if color == COLOR_WHITE else toSq - 8)
+		elif kind == MOVE_CASTLING:
+			rookFrom, rookTo = CASTLING_ROOK_MOVES[toSq]
+			self.putPiece(self.removePiece(rookTo), rookFrom)
+
+		self.putPiece(code, fromSq)
+
+		if captured is not None:
+			self.putPiece(captured, toSq)
+
+		# The pieces put back changed the hash, the saved one is the right one
+		self.hash = hashKey
+
+		return move
+
+	def computeHash(self):
+		"""
+		Compute the Zobrist hash of the position from scratch
+		@return: the hash
+		@rtype: int
+		"""
+
+		hashKey = CASTLING_KEYS[self.castling]
+
+		for sq in squares(self.occupied):
+			hashKey ^= PIECE_KEYS[self.squares[sq]][sq]
+
+		if self.sideToMove == COLOR_BLACK:
+			hashKey ^= SIDE_KEY
+		if self.epSquare is not None:
+			hashKey ^= EN_PASSANT_KEYS[self.epSquare & 7]
+
+		return hashKey
+
+	def computePawnHash(self):
+		"""
+		Compute the hash of the pawns of the position from scratch
+		@return: the pawn hash
+		@rtype: int
+		"""
+
+		pawnHash = 0
+
+		for sq in squares(self.pieces[PAWN] | self.pieces[6 + PAWN]):
+			pawnHash ^= PAWN_KEYS[self.squares[sq]][sq]
+
+		return pawnHash
+
+	def computePieceSquareScore(self):
+		"""
+		Compute the packed piece-square score of the position from scratch
+		@return: the packed score, from the point of view of white
+		@rtype: int
+		"""
+
+		return sum(PIECE_SQUARE_SCORES[self.squares[sq]][sq] for sq in squares(self.occupied))
+
+	def mirror(self):
+		"""
+		Return the position with the colors swapped : each piece goes to the mirrored square (same file,
+		other side of the board) and changes color, and the other player has the turn. The mirrored
+		position is the same position for the other player
+		@return: the mirrored position (without undo stack)
+		@rtype: Position
+		"""
+
+		position = Position()
+
+		for sq in squares(self.occupied):
+			code = self.squares[sq]
+			position.putPiece((code + 6) % 12, sq ^ 56)
+
+		position.sideToMove = self.sideToMove ^ 1
+		position.castling = (self.castling & 3) << 2 | self.castling >> 2
+		position.epSquare = None if self.epSquare is None else self.epSquare ^ 56
+		position.halfmoveClock = self.halfmoveClock
+		position.fullmoveNumber = self.fullmoveNumber
+		position.hash = position.computeHash()
+
+		return position
+
+	def repetitionCount(self):
+		"""
+		Return how many times the position was already reached. Only the hashes of the undo stack are
+		compared, and only back to the last capture or pawn move (the positions before it cannot come back),
+		one position out of two, the ones with the same side to move. Each player needs two moves to come
+		back to a position, so the search starts 4 plies back
+		@return: the number of earlier occurrences of the position
+		@rtype: int
+		"""
+
+		undoStack = self.undoStack
+		count = 0
+
+		for plies in range(4, min(self.halfmoveClock, len(undoStack)) + 1, 2):
+			if undoStack[-plies][5] == self.hash:
+				count += 1
+
+		return count
+
+	def isRepetition(self):
+		"""
+		Return if the position was already reached since the last capture or pawn move, like repetitionCount()
+		but stopping at the first occurrence : the search scores a repetition as a draw
+		@return: if the position is a repetition
+		@rtype: bool
+		"""
+
+		undoStack = self.undoStack
+
+		for plies in range(4, min(self.halfmoveClock, len(undoStack)) + 1, 2):
+			if undoStack[-plies][5] == self.hash:
+				return True
+
+		return False
+
+	def hasInsufficientMaterial(self):
+		"""
+		Return if no player can mate : only the kings, or the kings and a single knight or bishop
+		@return: if the material is insufficient
+		@rtype: bool
+		"""
+
+		pieces = self.pieces
+		minors = pieces[KNIGHT] | pieces[BISHOP] | pieces[KNIGHT + 6] | pieces[BISHOP + 6]
+
+		return self.occupied == pieces[KING] | pieces[KING + 6] | minors and minors & (minors - 1) == 0
+
+	def drawReason(self):
+		"""
+		Return why the game is a draw in this position by the 50 moves rule, the threefold repetition or the
+		insufficient material (the stalemate needs the legal moves, see movegen)
+		@return: the reason, or None if the game goes on
+		@rtype: str
+		"""
+
+		if self.halfmoveClock >= 100:
+			return '50 moves rule'
+		if self.repetitionCount() >= 2:
+			return 'threefold repetition'
+		if self.hasInsufficientMaterial():
+			return 'insufficient material'
+
+		return None
+
+	def kingSquare(self, color):
+		"""
+		Return the square of the king of a color
+		@param color: COLOR_WHITE or COLOR_BLACK
+		@type color: int
+		@return: the square of the king (or None if there is no king)
+		@rtype: int
+		"""
+
+		king = self.pieces[pieceCode(color, KING)]
+
+		if king:
+			return (king & -king).bit_length() - 1
+
+		return None
+
+	@classmethod
+	def fromFen(cls, fen):
+		"""
+		Create a position from a FEN string. The position must be playable : one king of each color, and the
+		player who doesn't have the turn not in check
+		@param fen: the FEN string (the move counters can be omitted)
+		@type fen: str
+		@return: the position
+		@rtype: Position
+		"""
+
+		# movegen imports this module
+		from movegen import isSquareAttacked
+
+		fields = fen.split()
+		if len(fields) < 4:
+			raise ValueError(f'Invalid FEN : {fen}')
+
+		position = cls()
+
+		rows = fields[0].split('/')
+		if len(rows) != 8:
+			raise ValueError(f'Invalid FEN : {fen}')
+
+		for y, row in enumerate(rows):
+			x = 0
+			for letter in row:
+				if letter.isdigit():
+					x += int(letter)
+				elif letter in PIECE_LETTERS and x < 8:
+					position.putPiece(PIECE_LETTERS.index(letter), square(x, y))
+					x += 1
+				else:
+					raise ValueError(f'Invalid FEN : {fen}')
+
+			if x != 8:
+				raise ValueError(f'Invalid FEN : {fen}')
+
+		if fields[1] not in ('w', 'b'):
+			raise ValueError(f'Invalid FEN : {fen}')
+		position.sideToMove = COLOR_WHITE if fields[1] == 'w' else COLOR_BLACK
+
+		for letter, right in CASTLING_LETTERS:
+			if letter in fields[2]:
+				position.castling |= right
+
+		if fields[3] != '-':
+			position.epSquare = squareFromName(fields[3])
+
+		if len(fields) >= 6:
+			position.halfmoveClock = int(fields[4])
+			position.fullmoveNumber = int(fields[5])
+
+		for color in (COLOR_WHITE, COLOR_BLACK):
+			if popCount(position.pieces[pieceCode(color, KING)]) != 1:
+				raise ValueError(f'Invalid FEN, {COLOR_NAMES[color]} must have one king : {fen}')
+
+		waitingColor = position.sideToMove ^ 1
+		if isSquareAttacked(position, position.kingSquare(waitingColor), position.sideToMove):
+			raise ValueError(f'Invalid FEN, {COLOR_NAMES[waitingColor]} is in check without the turn : {fen}')
+
+		position.hash = position.computeHash()
+
+		return position
+
+	def toFen(self):
+		"""
+		Return the FEN string of the position
+		@return: the FEN string
+		@rtype: str
+		"""
+
+		rows = []
+		for y in range(8):
+			row = ''
+			emptySquares = 0
+
+			for x in range(8):
+				code = self.squares[square(x, y)]
+
+				if code is None:
+					emptySquares += 1
+				else:
+					if emptySquares:
+						row += str(emptySquares)
+						emptySquares = 0
+					row += PIECE_LETTERS[code]
+
+			if emptySquares:
+				row += str(emptySquares)
+			rows.append(row)
+
+		castling = ''
+		for letter, right in CASTLING_LETTERS:
+			if self.castling & right:
+				castling += letter
+
+		fields = [
+			'/'.join(rows),
+			'w' if self.sideToMove == COLOR_WHITE else 'b',
+			castling or '-',
+			'-' if self.epSquare is None else squareName(self.epSquare),
+			str(self.halfmoveClock),
+			str(self.fullmoveNumber)
+		]
+
+		return ' '.join(fields)
+
+	@classmethod
+	def fromBoard(cls, board, sideToMove='white'):
+		"""
+		Create a position from a 2D List of Piece objects, like ChessBoard.mainChessBoard
+		@param board: the 2D List
+		@type board: List
+		@param sideToMove: the color of the player who has the turn
+		@type sideToMove: str
+		@return: the position
+		@rtype: Position
+		"""
+
+		position = cls()
+		position.sideToMove = COLOR_INDEXES[sideToMove]
+
+		for y in range(8):
+			for x in range(8):
+				place = board[y][x]
+
+				if isinstance(place, Piece):
+					piece = place
+					pieceType = PIECE_CLASSES.index(type(piece))
+					position.putPiece(pieceCode(COLOR_INDEXES[piece.color], pieceType), square(x, y))
+
+		# The pieces don't remember if they moved, so a king and a rook on their initial squares are
+		# supposed to be able to castle
+		for right, color, kingSq, rookSq in CASTLING_HOME_SQUARES:
+			if position.squares[kingSq] == pieceCode(color, KING) and position.squares[rookSq] == pieceCode(color, ROOK):
+				position.castling |= right
+
+		position.hash = position.computeHash()
+
+		return position
+
+	def pieceObject(self, sq):
+		"""
+		Create the Piece object of the piece on a square, like the ones of ChessBoard.mainChessBoard
+		@param sq: the square
+		@type sq: int
+		@return: the piece (or None if the square is empty)
+		@rtype: Piece
+		"""
+
+		code = self.squares[sq]
+		if code is None:
+			return None
+
+		x, y = squareCoord(sq)
+		color = COLOR_NAMES[code // 6]
+
+		if code % 6 == PAWN:
+			if color == 'white':
+				piece = Pawn(x, y, color, -1)
+			else:
+				piece = Pawn(x, y, color, 1)
+
+			# A pawn can only do his first move from his initial row
+			piece.firstMove = y == (6 if color == 'white' else 1)
+		else:
+			piece = PIECE_CLASSES[code % 6](x, y, color)
+
+		return piece
+
+	def toBoard(self):
+		"""
+		Create a 2D List of Piece objects from the position, like ChessBoard.mainChessBoard
+		@return: the 2D List
+		@rtype: List
+		"""
+
+		return [[self.pieceObject(square(x, y)) for x in range(8)] for y in range(8)]
@@ -0,0 +1,102 @@
+"""
+The drawing of the chess board with pygame
+
+ChessBoard (chess_board.py) only stores the game and applies the rules, without pygame, so it can be
+used by the engine and the analysis processes on machines without display. ChessBoardView adds the
+drawing methods used by the game window
+"""
+
+import pygame
+
+from chess_board import ChessBoard
+from bitboard import square
+from constants import RESOLUTION, ROWS, COLS, SQUARE_SIZE, PIECE_PADDING, CIRCLE_PADDING, WHITE, MAROON, GREEN
+from sprites import SpriteAtlas
+
+
+class ChessBoardView(ChessBoard):
+    """
+    A chess board drawn in a pygame window. Only the dirty cases are drawn again at each frame
+    """
+
+    def __init__(self, fen=None):
+        """
+        @param fen: the FEN string of the initial position, or None for the initial position of a game
+        @type fen: str
+        """
+
+        super().__init__(fen)
+
+        # The squares are drawn once on the background, then copied under the changed cases
+        self.background = None
+        self.sprites = SpriteAtlas()
+
+    def drawSquares(self, window):
+        """
+        Draw the squares
+        @param window: the window (or the surface) where we draw the squares
+        @type window: pygame window
+        @return: None
+        @rtype: None
+        """
+
+        window.fill(MAROON)
+
+        for row in range(ROWS):
+            for col in range(row % 2, COLS, 2):
+                pygame.draw.rect(window, WHITE, (row * SQUARE_SIZE, col * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+
+    def drawPiece(self, window, image, coord):
+        """
+        Draw a piece on a window
+        @param window: the window where we draw the piece
+        @type window: pygame window
+        @param image: the image of the piece
+        @type image: pygame image
+        @param coord: the coord of the piece on a chessboard
+        @type coord: tuple
+        @return: None
+        @rtype: None
+        """
+
+        row = coord[0]
+        column = coord[1]
+
+        window.blit(image, (row * SQUARE_SIZE + PIECE_PADDING, column * SQUARE_SIZE + PIECE_PADDING))
+
+    def drawBoards(self, window):
+        """
+        Draw the two boards : the chess board and the possibles moves board. Only the dirty cases (changed
+        since the last drawing) are drawn : the square of the case is copied from the background, then
+        the piece and the possible move are drawn on it
+        @param window: the window where we draw the 2 boards
+        @type window: pygame window
+        @return: the rects of the window that changed, to give to pygame.display.update()
+        @rtype: List
+        """
+
+        # Draw the squares once on the background
+        if self.background is None:
+            self.background = pygame.Surface(RESOLUTION).convert()
+            self.drawSquares(self.background)
+
+        dirtyRects = []
+
+        for x, y in self.dirtySquares:
+            rect = pygame.Rect(x * SQUARE_SIZE, y * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
+            window.blit(self.background, rect, rect)
+
+            # Draw the piece
+            code = self.position.squares[square(x, y)]
+            if code is not None:
+                self.drawPiece(window, self.sprites.get(code % 6, code // 6), (x, y))
+
+            # Draw the possible move
+            if self.possiblesMovesBoard[y][x] == 1:
+                pygame.draw.circle(window, GREEN, (x * SQUARE_SIZE + CIRCLE_PADDING, y * SQUARE_SIZE + CIRCLE_PADDING), 15)
+
+            dirtyRects.append(rect)
+
+        self.dirtySquares.clear()
+
+        return dirtyRects
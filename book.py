@@ -0,0 +1,321 @@
+"""
+Opening book : the moves played in the openings of a game database, read from a binary file so the
+engine plays them without searching
+
+The file has the layout of the Polyglot books : records of 16 bytes in big-endian order, sorted by
+their key, with
+	- the key of the position (64 bits)
+	- the move (16 bits) : the destination file and rank (3 bits each, the rank 1 is 0), the start file
+	  and rank, and the promotion piece (3 bits, 1 for a knight to 4 for a queen). A castling is written
+	  as the move of the king to its rook, like e1h1
+	- the weight of the move (16 bits), how often it is chosen
+	- the learn field (32 bits), unused and written as 0
+The key is the Zobrist hash of the engine (see zobrist.py) and not the Polyglot hash, so the books of
+other programs cannot be read, and the books built here are only read by this engine
+
+The file is mapped in memory and never parsed : the records of a position are found by a binary search
+on the keys, reading only a few pages of the file, so a book of any size opens at once. Run :
+	python book.py build games.pgn --output book.bin   build a book from the games of PGN files
+	python book.py probe book.bin --fen "<fen>"        print the moves of a position found in a book
+"""
+
+import argparse
+import mmap
+import os
+import random
+import struct
+import time
+
+from bitboard import Position, START_FEN, MOVE_KIND_MASK, MOVE_PROMOTION, MOVE_CASTLING, CASTLING_ROOK_MOVES
+from movegen import legalMoves, moveToUci
+from pgn import readGames
+
+# The layout of a record : key, move, weight, learn
+ENTRY_FORMAT = '>QHHI'
+ENTRY_SIZE = struct.calcsize(ENTRY_FORMAT)
+
+# The largest weight of a record
+MAX_WEIGHT = 0xFFFF
+
+# The number of plies of each game added to a book by default
+DEFAULT_BOOK_PLIES = 20
+
+# The points of a move in a game, for the side which played it : a win counts twice a draw, a loss
+# nothing. The result of an unfinished game is unknown, it counts like a draw
+RESULT_POINTS = {'1-0': (2, 0), '0-1': (0, 2), '1/2-1/2': (1, 1), '*': (1, 1)}
+
+
+def encodeBookMove(move):
+	"""
+	Return the move field of a book record for a packed move
+	@param move: the packed move
+	@type move: int
+	@return: the move of the record
+	@rtype: int
+	"""
+
+	fromSq = move & 63
+	toSq = move >> 6 & 63
+	kind = move & MOVE_KIND_MASK
+
+	# The castlings are written as the king taking its own rook
+	if kind == MOVE_CASTLING:
+		toSq = CASTLING_ROOK_MOVES[toSq][0]
+
+	# The squares are counted from a8 by the engine, and from a1 in the book
+	bookMove = (toSq & 7) | (7 - (toSq >> 3)) << 3 | (fromSq & 7) << 6 | (7 - (fromSq >> 3)) << 9
+
+	if kind == MOVE_PROMOTION:
+		bookMove |= ((move >> 12 & 3) + 1) << 12
+
+	return bookMove
+
+
+def decodeBookMove(position, bookMove):
+	"""
+	Find the legal move of a position written in a book record
+	@param position: the position
+	@type position: Position
+	@param bookMove: the move of the record
+	@type bookMove: int
+	@return: the packed move, or None if the move is not legal (a record of another position with the
+		same key)
+	@rtype: int
+	"""
+
+	for move in legalMoves(position, position.sideToMove):
+		if encodeBookMove(move) == bookMove:
+			return move
+
+	return None
+
+
+class OpeningBook:
+	"""
+	An opening book file mapped in memory. It can be used as a context manager, which closes it
+	"""
+
+	def __init__(self, path):
+		"""
+		@param path: the path of the book file
+		@type path: str
+		"""
+
+		self.path = path
+		self.file = None
+		self.mapped = None
+		self.entryCount = 0
+
+		size = os.path.getsize(path)
+		if size % ENTRY_SIZE:
+			raise ValueError(f'{path} is not a book : its size is not a multiple of {ENTRY_SIZE} bytes')
+
+		# An empty file cannot be mapped, the book has no moves
+		if size:
+			self.file = open(path, 'rb')
+			self.mapped = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+			self.entryCount = size // ENTRY_SIZE
+
+	def __repr__(self):
+		"""Used for debugging"""
+		return f'opening book {self.path} : {self.entryCount} moves'
+
+	def __len__(self):
+		return self.entryCount
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exception):
+		self.close()
+
+	def close(self):
+		"""
+		Unmap and close the file
+		@return: None
+		@rtype: None
+		"""
+
+		if self.mapped is not None:
+			self.mapped.close()
+			self.file.close()
+			self.mapped = None
+			self.file = None
+			self.entryCount = 0
+
+	def _findFirst(self, key):
+		"""
+		Find the first record of a key by a binary search
+		@param key: the key
+		@type key: int
+		@return: the index of the first record whose key is not lower than the key
+		@rtype: int
+		"""
+
+		mapped = self.mapped
+		low = 0
+		high = self.entryCount
+
+		while low < high:
+			middle = (low + high) // 2
+			if struct.unpack_from('>Q', mapped, middle * ENTRY_SIZE)[0] < key:
+				low = middle + 1
+			else:
+				high = middle
+
+		return low
+
+	def entries(self, key):
+		"""
+		Return the records of a key
+		@param key: the key of the position (its Zobrist hash)
+		@type key: int
+		@return: the list of the (book move, weight) of the records, the heaviest first
+		@rtype: List
+		"""
+
+		found = []
+
+		index = self._findFirst(key)
+		while index < self.entryCount:
+			entryKey, bookMove, weight, _ = struct.unpack_from(ENTRY_FORMAT, self.mapped, index * ENTRY_SIZE)
+			if entryKey != key:
+				break
+
+			found.append((bookMove, weight))
+			index += 1
+
+		return found
+
+	def moves(self, position):
+		"""
+		Return the legal moves of a position found in the book
+		@param position: the position
+		@type position: Position
+		@return: the list of the (packed move, weight), the heaviest first
+		@rtype: List
+		"""
+
+		found = []
+
+		for bookMove, weight in self.entries(position.hash):
+			move = decodeBookMove(position, bookMove)
+			if move is not None:
+				found.append((move, weight))
+
+		return found
+
+	def chooseMove(self, position, generator=random):
+		"""
+		Choose a move of a position in the book, each move with a chance proportional to its weight
+		@param position: the position
+		@type position: Position
+		@param generator: the random number generator
+		@type generator: random.Random
+		@return: the packed move, or None if the position is not in the book
+		@rtype: int
+		"""
+
+		found = [(move, weight) for move, weight in self.moves(position) if weight > 0]
+		if not found:
+			return None
+
+		moves, weights = zip(*found)
+		return generator.choices(moves, weights)[0]
+
+
+def buildBook(pgnPaths, outputPath, plies=DEFAULT_BOOK_PLIES, minGames=1):
+	"""
+	Build a book from the games of PGN files : the first moves of each game are added, weighted by the
+	points they scored
+	@param pgnPaths: the paths of the PGN files
+	@type pgnPaths: List
+	@param outputPath: the path of the book file written
+	@type outputPath: str
+	@param plies: the number of plies of each game added
+	@type plies: int
+	@param minGames: the number of games a move must be played in to be added
+	@type minGames: int
+	@return: the number of games read and of records written
+	@rtype: tuple
+	"""
+
+	# statistics[key][book move] : the [games, points] of the move
+	statistics = {}
+	games = 0
+
+	for path in pgnPaths:
+		for game in readGames(path):
+			games += 1
+			points = RESULT_POINTS.get(game.result, RESULT_POINTS['*'])
+
+			try:
+				for ply, (position, move) in enumerate(game.replay()):
+					if ply >= plies:
+						break
+
+					moveStatistics = statistics.setdefault(position.hash, {}).setdefault(encodeBookMove(move), [0, 0])
+					moveStatistics[0] += 1
+					moveStatistics[1] += points[position.sideToMove]
+			except ValueError:
+				# The moves before the illegal move are kept
+				pass
+
+	records = []
+	for key, moves in statistics.items():
+		kept = [(bookMove, moveGames, movePoints) for bookMove, (moveGames, movePoints) in moves.items()
+			if moveGames >= minGames and movePoints > 0]
+		if not kept:
+			continue
+
+		# The weights of a position are scaled down together when the best one doesn't fit
+		scale = min(1, MAX_WEIGHT / max(movePoints for _, _, movePoints in kept))
+		for bookMove, _, movePoints in kept:
+			records.append((key, max(1, int(movePoints * scale)), bookMove))
+
+	# Sorted by key, the heaviest move of a position first
+	records.sort(key=lambda record: (record[0], -record[1]))
+
+	with open(outputPath, 'wb') as file:
+		for key, weight, bookMove in records:
+			file.write(struct.pack(ENTRY_FORMAT, key, bookMove, weight, 0))
+
+	return games, len(records)
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Build an opening book, or print the moves of a position in a book')
+	commands = parser.add_subparsers(dest='command', required=True)
+
+	build = commands.add_parser('build', help='build a book from the games of PGN files')
+	build.add_argument('paths', nargs='+', help='the PGN files')
+	build.add_argument('--output', required=True, help='the book file written')
+	build.add_argument('--plies', type=int, default=DEFAULT_BOOK_PLIES, help='the number of plies of each game added')
+	build.add_argument('--min-games', type=int, default=1, help='the number of games a move must be played in')
+
+	probe = commands.add_parser('probe', help='print the moves of a position found in a book')
+	probe.add_argument('path', help='the book file')
+	probe.add_argument('--fen', default=START_FEN, help='the position (FEN string)')
+
+	arguments = parser.parse_args()
+
+	if arguments.command == 'build':
+		startTime = time.perf_counter()
+		games, records = buildBook(arguments.paths, arguments.output, arguments.plies, arguments.min_games)
+		print(f'{games} games, {records} moves written in {time.perf_counter() - startTime:.2f}s')
+		return
+
+	position = Position.fromFen(arguments.fen)
+	with OpeningBook(arguments.path) as book:
+		found = book.moves(position)
+		totalWeight = sum(weight for _, weight in found)
+
+		for move, weight in found:
+			print(f'{moveToUci(move)} weight {weight} ({weight / totalWeight * 100:.1f}%)')
+
+		if not found:
+			print('the position is not in the book')
+
+
+if __name__ == '__main__':
+	main()
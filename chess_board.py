@@ -1,26 +1,41 @@
-import pygame
-
 from piece import *
-from constants import *
+from constants import ROWS, COLS
+from bitboard import Position, square, moveToCoords, movePromotion, COLOR_INDEXES, QUEEN
+from movegen import isSquareAttacked, legalMoves
+import perft
+import pgn
 
 
 class ChessBoard:
     """
     A chess board who will store :
      - the main chess board (2D List), where all the pieces are stored
-     - the test chess board (2D List), that the chess board object use to check if one of the king
-       is check
      - the possibles moves board, where the possibles moves of the selected piece are stored, just for
        the drawing of the chess board
+     - the position, the bitboards of the main chess board, used for the fast move generation and
+       attack queries
+     - the dirty squares, the cases changed since the last drawing : only them are drawn again
     """
 
-    def __init__(self):
+    def __init__(self, fen=None):
+        """
+        @param fen: the FEN string of the initial position, or None for the initial position of a game
+        @type fen: str
+        """
+
         self.mainChessBoard = [[None for _ in range(ROWS)] for _ in range(COLS)]
         self.possiblesMovesBoard = [[None for _ in range(ROWS)] for _ in range(COLS)]
-        self.testChessBoard = [[None for _ in range(ROWS)] for _ in range(COLS)]
         self.pieceSelected = ()
 
-        self.initChessBoard()
+        # The cases changed since the last drawing (see board_view.ChessBoardView)
+        self.dirtySquares = set()
+        self.redrawAll()
+
+        if fen is None:
+            self.initChessBoard()
+            self.position = Position.fromBoard(self.mainChessBoard)
+        else:
+            self.loadFen(fen)
 
     def __repr__(self):
         """
@@ -35,23 +50,85 @@ class ChessBoard:
 
         return stringToReturn
 
-    def updateTestChessBoard(self):
+    def resetPossiblesMovesBoard(self):
         """
-        Update the test chess board
+        Reset the possibles moves board
         @return: None
         @rtype: None
         """
-        for row in range(ROWS):
-            for col in range(COLS):
-                self.testChessBoard[col][row] = self.mainChessBoard[col][row]
+        for y in range(ROWS):
+            for x in range(COLS):
+                if self.possiblesMovesBoard[y][x] is not None:
+                    self.dirtySquares.add((x, y))
 
-    def resetPossiblesMovesBoard(self):
+        self.possiblesMovesBoard = [[None for _ in range(ROWS)] for _ in range(COLS)]
+
+    def showPossiblesMoves(self, possiblesMoves):
         """
-        Reset the possibles moves board
+        Add possibles moves on the possibles moves board
+        @param possiblesMoves: the coords of the possibles moves
+        @type possiblesMoves: List
         @return: None
         @rtype: None
         """
-        self.possiblesMovesBoard = [[None for _ in range(ROWS)] for _ in range(COLS)]
+        for x, y in possiblesMoves:
+            self.possiblesMovesBoard[y][x] = 1
+            self.dirtySquares.add((x, y))
+
+    def redrawAll(self):
+        """
+        Mark all the cases as changed, so the next drawing draws the whole chess board
+        @return: None
+        @rtype: None
+        """
+        self.dirtySquares = {(x, y) for y in range(ROWS) for x in range(COLS)}
+
+    def updateMainChessBoard(self):
+        """
+        Rebuild the main chess board from the position
+        @return: None
+        @rtype: None
+        """
+        self.mainChessBoard = self.position.toBoard()
+        self.redrawAll()
+
+    def loadFen(self, fen):
+        """
+        Set up the position of a FEN string on the chess board
+        @param fen: the FEN string
+        @type fen: str
+        @return: None
+        @rtype: None
+        """
+        self.position = Position.fromFen(fen)
+        self.updateMainChessBoard()
+
+        self.pieceSelected = ()
+        self.resetPossiblesMovesBoard()
+
+    def toFen(self):
+        """
+        Return the FEN string of the position of the chess board
+        @return: the FEN string
+        @rtype: str
+        """
+        return self.position.toFen()
+
+    def toPgn(self, headers=None):
+        """
+        Return the moves played with makeMove() in the PGN format, from the position where they started
+        @param headers: the tags of the game (Event, White, Black, Result ...)
+        @type headers: dict
+        @return: the PGN text of the game
+        @rtype: str
+        """
+        position = self.position.copy()
+        moves = []
+        while position.undoStack:
+            moves.append(position.unmakeMove())
+        moves.reverse()
+
+        return pgn.gameToPgn(moves, headers, position.toFen())
 
     def initChessBoard(self):
         """
@@ -94,29 +171,6 @@ class ChessBoard:
         self.mainChessBoard[0][3] = Queen(3, 0, 'black')
         self.mainChessBoard[7][3] = Queen(3, 7, 'white')
 
-    def movePiece(self, board, piece, pos2):
-        """
-        Move a piece from a position 1 to a position 2
-        @param board: chessBoard.mainChessBoard or ChessBoard.testChessBoard
-        @type board: List
-        @param piece: the piece to move
-        @type piece: Piece
-        @param pos2: the new position of the piece after the move
-        @type pos2: tuple
-        @return: None
-        @rtype: None
-        """
-
-        # Get the piece's initial position
-        pos1 = piece.pos
-
-        # Update the piece coord
-        piece.updateCoords(pos2[0], pos2[1])
-
-        # Delete the old piece of his old position and replace it to his new position on the board
-        board[pos1[1]][pos1[0]] = None
-        board[pos2[1]][pos2[0]] = piece
-
     def king(self, color):
         """
         Return the king object of the color asked in the chessboard
@@ -126,18 +180,17 @@ class ChessBoard:
         @rtype: King
         """
 
-        for row in self.mainChessBoard:
-            for piece in row:
-                if isinstance(piece, King):
-                    if piece.color == color:
-                        return piece
+        kingSquare = self.position.kingSquare(COLOR_INDEXES[color])
+
+        if kingSquare is not None:
+            return self.mainChessBoard[kingSquare >> 3][kingSquare & 7]
 
         print('There is no king in the chessboard')
 
     def isCheck(self, board, king):
         """
         Verify if the king is check
-        @param board: ChessBoard.mainChessBoard or ChessBoard.testChessBoard
+        @param board: ChessBoard.mainChessBoard or another 2D List of pieces
         @type board: List
         @param king: the king we need to check
         @type king: King
@@ -145,163 +198,150 @@ class ChessBoard:
         @rtype: bool
         """
 
-        # For each piece of the opponents, check if the king is not in the possibles moves of this piece
-        for row in range(ROWS):
-            for col in range(COLS):
-                place = board[col][row]
+        # The position is synchronized with the main chess board only, so the position of another
+        # board must be built
+        if board is self.mainChessBoard:
+            position = self.position
+        else:
+            position = Position.fromBoard(board)
 
-                if isinstance(place, Piece):
-                    piece = place
+        # Look from the king's square if an opponent piece attacks it
+        kingColor = COLOR_INDEXES[king.color]
 
-                    if piece.color != king.color:
-                        possiblesMoves = piece.getPossiblesMoves(board)
+        return isSquareAttacked(position, square(king.x, king.y), kingColor ^ 1)
 
-                        for move in possiblesMoves:
-                            if move == king.pos:
-                                return True
+    def legalMoves(self, color):
+        """
+        Return the legal moves of a player, the moves that don't leave his king in check
+        @param color: the color of the player
+        @type color: str
+        @return: the list of the moves, packed in integers (see bitboard.encodeMove())
+        @rtype: List
+        """
 
-        return False
+        return legalMoves(self.position, COLOR_INDEXES[color])
 
-    def isCheckMate(self, king):
+    def getPossiblesMoves(self, coord):
         """
-        Verify if teh king is checkmate
-        @param king: the king we need to check
-        @type king: King
-        @return: if the king is checkmate
-        @rtype: bool
+        Return the legal moves of the piece on a case of the main chess board
+        @param coord: the coord of the piece
+        @type coord: tuple
+        @return: the list of all the position where the piece can go
+        @rtype: List
         """
 
-        self.updateTestChessBoard()
+        piece = self.mainChessBoard[coord[1]][coord[0]]
+        possiblesMoves = []
 
-        # First, check if the king is check. If not, don't need to calculate the king is checkmate
-        if self.isCheck(self.mainChessBoard, king):
+        # The four promotions of a pawn go to the same case
+        for move in self.legalMoves(piece.color):
+            moveFrom, moveTo = moveToCoords(move)
+            if moveFrom == coord and moveTo not in possiblesMoves:
+                possiblesMoves.append(moveTo)
 
-            # For each piece
-            for row in range(ROWS):
-                for col in range(COLS):
-                    place = self.mainChessBoard[col][row]
+        return possiblesMoves
 
-                    if isinstance(place, Piece):
-                        piece = place
+    def findMove(self, pos1, pos2, promotion=QUEEN):
+        """
+        Find the legal move of the piece on a position 1 to a position 2
+        @param pos1: the position of the piece
+        @type pos1: tuple
+        @param pos2: the position where the piece goes
+        @type pos2: tuple
+        @param promotion: the piece type a pawn reaching the last row is promoted to
+        @type promotion: int
+        @return: the packed move (or None if the move is not legal)
+        @rtype: int
+        """
 
-                        # If the piece has in the same color than the king
-                        if piece.color == king.color:
+        piece = self.mainChessBoard[pos1[1]][pos1[0]]
 
-                            # Get the possibles moves of this piece
-                            possiblesMoves = piece.getPossiblesMoves(self.mainChessBoard)
-                            initialPosition = piece.pos
+        for move in self.legalMoves(piece.color):
+            if moveToCoords(move) == (tuple(pos1), tuple(pos2)) and movePromotion(move) in (None, promotion):
+                return move
 
-                            # For each move, move the piece into the test chess board and check if the
-                            # king is check. If not, the king isn't checkmate
-                            for move in possiblesMoves:
-                                # Move the piece
+        return None
 
-                                self.movePiece(self.testChessBoard, piece, move)
+    def makeMove(self, move):
+        """
+        Play a move on the position (with the castling, en passant and promotion rules), and update the
+        main chess board. The move can be taken back with unmakeMove()
+        @param move: the packed move
+        @type move: int
+        @return: None
+        @rtype: None
+        """
 
-                                # If the king isn't check
-                                if not self.isCheck(self.testChessBoard, king):
-                                    # Update the piece's coords in his initial position
-                                    piece.updateCoords(initialPosition[0], initialPosition[1])
-                                    return False
+        self.position.makeMove(move)
+        self.updateMoveRows(move)
 
-                                # If not, update the test chess board and Update the piece's coords in his
-                                # initial position
-                                self.updateTestChessBoard()
-                                piece.updateCoords(initialPosition[0], initialPosition[1])
+    def unmakeMove(self):
+        """
+        Take back the last move played with makeMove(), and update the main chess board
+        @return: the packed move taken back
+        @rtype: int
+        """
 
-                            # And finally, if the piece cannot save the king, do like just above and check
-                            # if another piece can save the king
-                            self.updateTestChessBoard()
-                            piece.updateCoords(initialPosition[0], initialPosition[1])
+        move = self.position.unmakeMove()
+        self.updateMoveRows(move)
 
-            return True
-        else:
-            return False
+        return move
 
-    def drawSquares(self, window):
+    def updateMoveRows(self, move):
         """
-        Draw the squares
-        @param window: the window where we draw the squares
-        @type window: pygame window
+        Rebuild the rows of the main chess board changed by a move. The rook of a castling and the pawn
+        taken en passant are on the row of the king and of the capturing pawn, so the row of the start
+        and of the destination of the move are enough. The cases whose piece changed are marked dirty
+        @param move: the packed move
+        @type move: int
         @return: None
         @rtype: None
         """
 
-        window.fill(MAROON)
+        for row in {(move & 63) >> 3, (move >> 6 & 63) >> 3}:
+            for col in range(COLS):
+                oldPiece = self.mainChessBoard[row][col]
+                newPiece = self.position.pieceObject(square(col, row))
+                self.mainChessBoard[row][col] = newPiece
 
-        for row in range(ROWS):
-            for col in range(row % 2, COLS, 2):
-                pygame.draw.rect(window, WHITE, (row * SQUARE_SIZE, col * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+                if type(oldPiece) is not type(newPiece) or (newPiece is not None and oldPiece.color != newPiece.color):
+                    self.dirtySquares.add((col, row))
 
-    def drawPiece(self, window, image, coord):
+    def isCheckMate(self, king):
         """
-        Draw a piece on a window
-        @param window: the window where we draw the piece
-        @type window: pygame window
-        @param image: the image of the piece
-        @type image: pygame image
-        @param coord: the coord of the piece on a chessboard
-        @type coord: tuple
-        @return: None
-        @rtype: None
+        Verify if the king is checkmate : he is check and his player has no legal move
+        @param king: the king we need to check
+        @type king: King
+        @return: if the king is checkmate
+        @rtype: bool
         """
 
-        row = coord[0]
-        column = coord[1]
+        return self.isCheck(self.mainChessBoard, king) and not self.legalMoves(king.color)
 
-        window.blit(image, (row * SQUARE_SIZE + PIECE_PADDING, column * SQUARE_SIZE + PIECE_PADDING))
+    def isStalemate(self, king):
+        """
+        Verify if the king is stalemate : he isn't check but his player has no legal move
+        @param king: the king we need to check
+        @type king: King
+        @return: if the king is stalemate
+        @rtype: bool
+        """
+
+        return not self.isCheck(self.mainChessBoard, king) and not self.legalMoves(king.color)
 
-    def drawBoards(self, window):
+    def perft(self, depth, divide=False):
         """
-        Draw the two boards : the chess board and the possibles moves board
-        @param window: the window where we draw the 2 boards
-        @type window: pygame window
-        @return: None
-        @rtype: None
+        Count the leaf nodes of the tree of legal moves of the position, to check and measure the move
+        generation (see perft.py)
+        @param depth: the depth of the tree
+        @type depth: int
+        @param divide: if the count must be detailed for each move of the player who has the turn
+        @type divide: bool
+        @return: the number of leaf nodes, or a list of (move, number of leaf nodes) tuples if divide
+        @rtype: int
         """
 
-        # Draw squares
-        self.drawSquares(window)
-
-        # Draw pieces
-        for row in range(ROWS):
-            for column in range(COLS):
-                element = self.mainChessBoard[column][row]
-
-                if isinstance(element, Piece):
-                    if element.color == 'white':
-                        if isinstance(element, Pawn):
-                            self.drawPiece(window, WHITE_PAWN, (row, column))
-                        elif isinstance(element, Rook):
-                            self.drawPiece(window, WHITE_ROOK, (row, column))
-                        elif isinstance(element, Knight):
-                            self.drawPiece(window, WHITE_KNIGHT, (row, column))
-                        elif isinstance(element, Bishop):
-                            self.drawPiece(window, WHITE_BISHOP, (row, column))
-                        elif isinstance(element, Queen):
-                            self.drawPiece(window, WHITE_QUEEN, (row, column))
-                        elif isinstance(element, King):
-                            self.drawPiece(window, WHITE_KING, (row, column))
-
-                    elif element.color == 'black':
-                        if isinstance(element, Pawn):
-                            self.drawPiece(window, BLACK_PAWN, (row, column))
-                        elif isinstance(element, Rook):
-                            self.drawPiece(window, BLACK_ROOK, (row, column))
-                        elif isinstance(element, Knight):
-                            self.drawPiece(window, BLACK_KNIGHT, (row, column))
-                        elif isinstance(element, Bishop):
-                            self.drawPiece(window, BLACK_BISHOP, (row, column))
-                        elif isinstance(element, Queen):
-                            self.drawPiece(window, BLACK_QUEEN, (row, column))
-                        elif isinstance(element, King):
-                            self.drawPiece(window, BLACK_KING, (row, column))
-
-        # Draw possibles moves
-        for row in range(ROWS):
-            for column in range(COLS):
-                element = self.possiblesMovesBoard[column][row]
-
-                if element == 1:
-                    pygame.draw.circle(window, GREEN,
-                                       (row * SQUARE_SIZE + CIRCLE_PADDING, column * SQUARE_SIZE + CIRCLE_PADDING), 15)
+        if divide:
+            return perft.divide(self.position, depth)
+
+        return perft.perft(self.position, depth)
@@ -0,0 +1,618 @@
+"""
+The chess engine : a negamax alpha-beta search with iterative deepening
+
+The search goes one ply deeper at each iteration until the time budget is spent, and the best move of
+the last finished iteration is played. Each iteration searches the principal variation of the
+previous one first, and the moves of each node are ordered (see move_ordering), so most of the tree is
+cut by the alpha-beta bounds. At the end of the main search, a quiescence search plays the captures
+and the promotions until the position is quiet, the captures losing material (see see.py) or unable to
+raise the score (delta pruning) excepted. The positions already searched are stored in a
+transposition table, shared by the iterations (and by the searches when the caller keeps the table).
+The endgames of the tablebases (see tablebase.py) are not searched, their exact result is used. Run :
+	python engine.py --depth 5   search the test positions and print the nodes (main and quiescence), the
+	                             time and the rate of the cutoffs made by the first move
+"""
+
+import argparse
+import time
+
+from bitboard import Position, COLOR_INDEXES, PAWN, NO_MOVE, MOVE_KIND_MASK, MOVE_PROMOTION
+from zobrist import SIDE_KEY, EN_PASSANT_KEYS
+from movegen import legalMoves, isSquareAttacked, moveToUci
+from move_ordering import MoveOrdering
+from see import see, SEE_VALUES
+from transposition import TranspositionTable, BOUND_EXACT, BOUND_LOWER, BOUND_UPPER
+from evaluation import evaluate
+from pawn_table import PawnHashTable
+from tablebase import Tablebases, WIN, LOSS
+
+# Scores, in centipawns
+MATE_SCORE = 100000
+INFINITY = 1000000
+
+# The deepest iteration of the search, and the longest line searched with the quiescence search
+MAX_DEPTH = 64
+MAX_PLY = 128
+
+# Delta pruning : a capture is not searched by the quiescence search when even winning the captured
+# piece and this margin doesn't raise the score to alpha
+DELTA_MARGIN = 200
+
+# The clock is read every TIME_CHECK_NODES nodes, reading it at each node would slow down the search
+TIME_CHECK_NODES = 1024
+
+# The cache of the pawn structures of the process, kept between the searches
+PAWN_TABLE = PawnHashTable()
+
+# The endgame tablebases of the process (see tablebase.py), only used when their files are generated
+TABLEBASES = Tablebases()
+
+
+class SearchTimeout(Exception):
+	"""Raised inside the search when the time budget is spent or when the search is stopped"""
+
+
+class SearchResult:
+	"""
+	The result of a search :
+		- the best move (or None if there is no legal move)
+		- the score of the best move for the player who has the turn, in centipawns
+		- the depth of the last finished iteration
+		- the number of nodes searched
+		- the principal variation, the moves expected from the best move
+		- the time spent, in seconds
+	"""
+
+	def __init__(self, move, score, depth, nodes, pv, elapsedTime):
+		self.move = move
+		self.score = score
+		self.depth = depth
+		self.nodes = nodes
+		self.pv = pv
+		self.elapsedTime = elapsedTime
+
+	def __repr__(self):
+		"""Used for debugging"""
+		nodesPerSecond = self.nodes / self.elapsedTime if self.elapsedTime > 0 else 0
+		pv = ' '.join(moveToUci(move) for move in self.pv)
+
+		return f'depth {self.depth} score {self.score} nodes {self.nodes} nps {nodesPerSecond:.0f} ' \
+			f'time {self.elapsedTime * 1000:.0f}ms pv {pv}'
+
+
+class Searcher:
+	"""
+	A search of the best move of a position, with a time budget. The counters of the search (nodes,
+	depth) are kept to be reported
+	"""
+
+	def __init__(self, position, timeLimit, info=None, table=None, stopEvent=None):
+		"""
+		@param position: the position to search (the moves searched are taken back)
+		@type position: Position
+		@param timeLimit: the time budget, in milliseconds
+		@type timeLimit: int
+		@param info: a function called with a SearchResult after each iteration (or None)
+		@type info: function
+		@param table: the transposition table (or None to use a new one)
+		@type table: TranspositionTable
+		@param stopEvent: an event which stops the search when it is set, like the time budget (or None)
+		@type stopEvent: threading.Event or multiprocessing.Event
+		"""
+
+		self.position = position
+		self.timeLimit = timeLimit
+		self.info = info
+		self.table = table if table is not None else TranspositionTable()
+		self.pawnTable = PAWN_TABLE
+		self.tablebases = TABLEBASES
+		self.stopEvent = stopEvent
+
+		# All the nodes searched, and the nodes of the quiescence search among them
+		self.nodes = 0
+		self.quiescenceNodes = 0
+		self.deadline = 0
+		self.pvTable = [[] for _ in range(MAX_PLY + 1)]
+		self.previousPv = []
+
+		self.ordering = MoveOrdering(MAX_PLY)
+
+	def search(self, maxDepth=MAX_DEPTH, firstDepth=1):
+		"""
+		Search the best move by iterative deepening, until the time budget is spent or the maximal depth
+		is reached
+		@param maxDepth: the maximal depth
+		@type maxDepth: int
+		@param firstDepth: the depth of the first iteration
+		@type firstDepth: int
+		@return: the result of the last finished iteration
+		@rtype: SearchResult
+		"""
+
+		startTime = time.perf_counter()
+		self.deadline = startTime + self.timeLimit / 1000
+		self.nodes = 0
+		self.quiescenceNodes = 0
+		self.table.newSearch()
+
+		rootMoves = legalMoves(self.position, self.position.sideToMove)
+		rootUndoLength = len(self.position.undoStack)
+
+		# Without a finished iteration, play the first legal move
+		result = SearchResult(rootMoves[0] if rootMoves else None, 0, 0, 0, rootMoves[:1], 0)
+
+		if len(rootMoves) <= 1:
+			return result
+
+		for depth in range(firstDepth, maxDepth + 1):
+			self.previousPv = self.pvTable[0][:]
+			self.ordering.newIteration()
+
+			try:
+				score = self.searchRoot(rootMoves, depth)
+			except SearchTimeout:
+				# Take back the moves of the interrupted iteration
+				while len(self.position.undoStack) > rootUndoLength:
+					self.position.unmakeMove()
+				break
+
+			pv = self.pvTable[0][:]
+			result = SearchResult(pv[0], score, depth, self.nodes, pv, time.perf_counter() - startTime)
+
+			if self.info is not None:
+				self.info(result)
+
+			# Search the best move first at the next iteration
+			rootMoves.remove(pv[0])
+			rootMoves.insert(0, pv[0])
+
+			# Stop when a mate is found, searching deeper cannot find a better move
+			if abs(score) >= MATE_SCORE - MAX_PLY:
+				break
+
+		result.nodes = self.nodes
+		result.elapsedTime = time.perf_counter() - startTime
+
+		return result
+
+	def searchRoot(self, rootMoves, depth):
+		"""
+		Search the moves of the root position at a depth
+		@param rootMoves: the legal moves of the root position, the expected best first
+		@type rootMoves: List
+		@param depth: the depth
+		@type depth: int
+		@return: the score of the best move
+		@rtype: int
+		"""
+
+		alpha = -INFINITY
+
+		position = self.position
+
+		for move in rootMoves:
+			position.makeMove(move)
+			score = -self.negamax(position, depth - 1, -INFINITY, -alpha, 1)
+			position.unmakeMove()
+
+			if score > alpha:
+				alpha = score
+				self.pvTable[0] = [move] + self.pvTable[1]
+
+		return alpha
+
+	def negamax(self, position, depth, alpha, beta, ply):
+		"""
+		Search a position with the alpha-beta algorithm
+		@param position: the position
+		@type position: Position
+		@param depth: the remaining depth
+		@type depth: int
+		@param alpha: the score the player who has the turn is already sure to get
+		@type alpha: int
+		@param beta: the score the opponent is already sure to get
+		@type beta: int
+		@param ply: the distance from the root position
+		@type ply: int
+		@return: the score of the position for the player who has the turn
+		@rtype: int
+		"""
+
+		self.nodes += 1
+		if self.nodes % TIME_CHECK_NODES == 0 and (time.perf_counter() > self.deadline
+				or self.stopEvent is not None and self.stopEvent.is_set()):
+			raise SearchTimeout()
+
+		self.pvTable[ply] = []
+
+		# A repeated position is a draw, whatever the moves after it
+		if position.isRepetition():
+			return 0
+
+		# So is a position of the 50 moves rule, unless the move which reached it was a checkmate
+		if position.halfmoveClock >= 100:
+			color = position.sideToMove
+			if isSquareAttacked(position, position.kingSquare(color), color ^ 1) and not legalMoves(position, color):
+				return -MATE_SCORE + ply
+			return 0
+
+		# The exact result of the endgames in the tablebases
+		probed = self.tablebases.probe(position)
+		if probed is not None:
+			return tablebaseScore(*probed, ply)
+
+		if depth <= 0 or ply >= MAX_DEPTH:
+			return self.quiescence(position, alpha, beta, ply)
+
+		# Use the result of a previous search of the position if it was deep enough
+		entry = self.table.probe(position.hash)
+		hashMove = NO_MOVE
+		if entry is not None:
+			entryDepth, entryScore, bound, hashMove = entry
+
+			if entryDepth >= depth:
+				entryScore = scoreFromTable(entryScore, ply)
+
+				if bound == BOUND_EXACT or (bound == BOUND_LOWER and entryScore >= beta) \
+						or (bound == BOUND_UPPER and entryScore <= alpha):
+					return entryScore
+
+		# Without a best move in the table, search the principal variation of the previous iteration first
+		if hashMove == NO_MOVE and ply < len(self.previousPv):
+			hashMove = self.previousPv[ply]
+
+		bestMoveFound = NO_MOVE
+		bound = BOUND_UPPER
+		moveNumber = 0
+
+		for move in self.ordering.orderedMoves(position, ply, hashMove):
+			moveNumber += 1
+
+			position.makeMove(move)
+			score = -self.negamax(position, depth - 1, -beta, -alpha, ply + 1)
+			position.unmakeMove()
+
+			if score >= beta:
+				self.ordering.recordCutoff(position, move, ply, depth, moveNumber)
+				self.table.store(position.hash, depth, scoreToTable(beta, ply), BOUND_LOWER, move)
+				return beta
+
+			if score > alpha:
+				alpha = score
+				bestMoveFound = move
+				bound = BOUND_EXACT
+				self.pvTable[ply] = [move] + self.pvTable[ply + 1]
+
+		# No legal move : checkmate or stalemate. Closer mates get better scores
+		if not moveNumber:
+			color = position.sideToMove
+			if isSquareAttacked(position, position.kingSquare(color), color ^ 1):
+				return -MATE_SCORE + ply
+			return 0
+
+		self.table.store(position.hash, depth, scoreToTable(alpha, ply), bound, bestMoveFound)
+
+		return alpha
+
+	def quiescence(self, position, alpha, beta, ply):
+		"""
+		Search the captures and the promotions of a position at the end of the main search, until the
+		position is quiet, so a capture is never evaluated before the recapture (horizon effect). The player
+		who has the turn can also stop capturing and take the static evaluation (stand pat), except in check
+		where all the moves are searched
+		@param position: the position
+		@type position: Position
+		@param alpha: the score the player who has the turn is already sure to get
+		@type alpha: int
+		@param beta: the score the opponent is already sure to get
+		@type beta: int
+		@param ply: the distance from the root position
+		@type ply: int
+		@return: the score of the position for the player who has the turn
+		@rtype: int
+		"""
+
+		self.nodes += 1
+		self.quiescenceNodes += 1
+		if self.nodes % TIME_CHECK_NODES == 0 and (time.perf_counter() > self.deadline
+				or self.stopEvent is not None and self.stopEvent.is_set()):
+			raise SearchTimeout()
+
+		self.pvTable[ply] = []
+
+		if ply >= MAX_PLY:
+			return evaluate(position, self.pawnTable)
+
+		color = position.sideToMove
+
+		# In check, standing pat could hide a mate : all the evasions are searched
+		if isSquareAttacked(position, position.kingSquare(color), color ^ 1):
+			moveNumber = 0
+			for move in self.ordering.orderedMoves(position, ply, NO_MOVE):
+				moveNumber += 1
+
+				position.makeMove(move)
+				score = -self.quiescence(position, -beta, -alpha, ply + 1)
+				position.unmakeMove()
+
+				if score >= beta:
+					return beta
+				if score > alpha:
+					alpha = score
+
+			return alpha if moveNumber else -MATE_SCORE + ply
+
+		standPat = evaluate(position, self.pawnTable)
+		if standPat >= beta:
+			return beta
+		if standPat > alpha:
+			alpha = standPat
+
+		squares = position.squares
+
+		for move in self.ordering.noisyMoves(position, ply):
+			kind = move & MOVE_KIND_MASK
+
+			if kind != MOVE_PROMOTION:
+				# Delta pruning : even the whole value of the victim doesn't bring the score to alpha
+				victim = squares[move >> 6 & 63]
+				victimValue = SEE_VALUES[victim % 6] if victim is not None else SEE_VALUES[PAWN]
+				if standPat + victimValue + DELTA_MARGIN <= alpha:
+					continue
+
+				# The captures losing material once the exchange is resolved
+				if see(position, move) < 0:
+					continue
+
+			position.makeMove(move)
+			score = -self.quiescence(position, -beta, -alpha, ply + 1)
+			position.unmakeMove()
+
+			if score >= beta:
+				return beta
+			if score > alpha:
+				alpha = score
+
+		return alpha
+
+
+def tablebaseScore(result, distance, ply):
+	"""
+	Convert the result of a tablebase probe to a score, the mates found in the tablebases get the scores
+	of the mates found by the search
+	@param result: the result for the side to move (WIN, DRAW or LOSS)
+	@type result: int
+	@param distance: the distance to mate, in plies
+	@type distance: int
+	@param ply: the distance from the root position
+	@type ply: int
+	@return: the score of the position for the player who has the turn
+	@rtype: int
+	"""
+
+	if result == WIN:
+		return MATE_SCORE - ply - distance
+	if result == LOSS:
+		return -MATE_SCORE + ply + distance
+
+	return 0
+
+
+def tablebaseMove(position):
+	"""
+	Find the best move of a position in the tablebases, without searching : the move which mates the
+	fastest, or keeps the draw, or delays the mate the most
+	@param position: the position (the moves are taken back)
+	@type position: Position
+	@return: the result with the best move, or None if the position isn't in the tablebases
+	@rtype: SearchResult
+	"""
+
+	startTime = time.perf_counter()
+	bestScore = -INFINITY
+	best = None
+
+	for move in legalMoves(position, position.sideToMove):
+		position.makeMove(move)
+		probed = TABLEBASES.probe(position)
+		position.unmakeMove()
+
+		if probed is None:
+			return None
+
+		score = -tablebaseScore(*probed, 1)
+		if score > bestScore:
+			bestScore = score
+			best = move
+
+	if best is None:
+		return None
+
+	return SearchResult(best, bestScore, 0, 0, [best], time.perf_counter() - startTime)
+
+
+def scoreToTable(score, ply):
+	"""
+	Convert a score to store it in the transposition table. The mate scores depend on the distance from
+	the root, so they are stored as a distance from the position
+	@param score: the score
+	@type score: int
+	@param ply: the distance from the root position
+	@type ply: int
+	@return: the score to store
+	@rtype: int
+	"""
+
+	if score >= MATE_SCORE - MAX_PLY:
+		return score + ply
+	if score <= -MATE_SCORE + MAX_PLY:
+		return score - ply
+
+	return score
+
+
+def scoreFromTable(score, ply):
+	"""
+	Convert a score stored in the transposition table back to a score from the root
+	@param score: the stored score
+	@type score: int
+	@param ply: the distance from the root position
+	@type ply: int
+	@return: the score
+	@rtype: int
+	"""
+
+	if score >= MATE_SCORE - MAX_PLY:
+		return score - ply
+	if score <= -MATE_SCORE + MAX_PLY:
+		return score + ply
+
+	return score
+
+
+def printInfo(result):
+	"""
+	Print the result of an iteration of the search
+	@param result: the result
+	@type result: SearchResult
+	@return: None
+	@rtype: None
+	"""
+
+	print(result)
+
+
+def searchPosition(position, timeLimit, maxDepth=MAX_DEPTH, info=None, table=None, workers=1, stopEvent=None,
+		book=None):
+	"""
+	Search the best move of the player who has the turn on a position. A position of the opening book or
+	of the endgame tablebases is not searched, a move of the book or the best move of the tablebases is
+	played
+	@param position: the position (the moves searched are taken back)
+	@type position: Position
+	@param timeLimit: the time budget, in milliseconds
+	@type timeLimit: int
+	@param maxDepth: the maximal depth
+	@type maxDepth: int
+	@param info: a function called with a SearchResult after each iteration (like printInfo), or None
+	@type info: function
+	@param table: the transposition table, to keep it between the searches (or None to use a new one). It
+		must be a shared table when several workers search
+	@type table: TranspositionTable
+	@param workers: the number of processes searching together (see smp.py)
+	@type workers: int
+	@param stopEvent: an event which stops the search when it is set (or None)
+	@type stopEvent: threading.Event
+	@param book: the opening book (or None)
+	@type book: OpeningBook
+	@return: the result of the search, with the best move in result.move
+	@rtype: SearchResult
+	"""
+
+	if book is not None:
+		move = book.chooseMove(position)
+		if move is not None:
+			return SearchResult(move, 0, 0, 0, [move], 0)
+
+	result = tablebaseMove(position)
+	if result is not None:
+		if info is not None:
+			info(result)
+		return result
+
+	if workers > 1:
+		from smp import parallelSearch
+		return parallelSearch(position, timeLimit, workers, maxDepth, info, table, stopEvent)
+
+	return Searcher(position, timeLimit, info, table, stopEvent).search(maxDepth)
+
+
+def bestMove(chessBoard, color, timeLimit, maxDepth=MAX_DEPTH, info=None, table=None, workers=1):
+	"""
+	Search the best move of a player on a chess board
+	@param chessBoard: the chess board
+	@type chessBoard: ChessBoard
+	@param color: the color of the player, 'white' or 'black'
+	@type color: str
+	@param timeLimit: the time budget, in milliseconds
+	@type timeLimit: int
+	@param maxDepth: the maximal depth
+	@type maxDepth: int
+	@param info: a function called with a SearchResult after each iteration (like printInfo), or None
+	@type info: function
+	@param table: the transposition table, to keep it between the searches (or None to use a new one). It
+		must be a shared table when several workers search
+	@type table: TranspositionTable
+	@param workers: the number of processes searching together (see smp.py)
+	@type workers: int
+	@return: the result of the search, with the best move in result.move
+	@rtype: SearchResult
+	"""
+
+	position = chessBoard.position.copy()
+
+	# The search is done for the player asked, even if it isn't his turn on the position
+	colorIndex = COLOR_INDEXES[color]
+	if position.sideToMove != colorIndex:
+		position.sideToMove = colorIndex
+		position.hash ^= SIDE_KEY
+
+		if position.epSquare is not None:
+			position.hash ^= EN_PASSANT_KEYS[position.epSquare & 7]
+			position.epSquare = None
+
+	return searchPosition(position, timeLimit, maxDepth, info, table, workers)
+
+
+def benchmark(depth):
+	"""
+	Search the test positions to a fixed depth and print the nodes (of the main search and of the
+	quiescence search), the time and the quality of the move order : the part of the cutoffs made by the
+	first move searched
+	@param depth: the depth of the searches
+	@type depth: int
+	@return: the total nodes, quiescence nodes, time, and first move cutoff rate
+	@rtype: tuple
+	"""
+
+	from perft import PERFT_POSITIONS
+
+	totalNodes = 0
+	quiescenceNodes = 0
+	totalTime = 0
+	cutoffs = 0
+	firstMoveCutoffs = 0
+
+	for name, fen, _ in PERFT_POSITIONS:
+		searcher = Searcher(Position.fromFen(fen), 10 ** 9)
+
+		startTime = time.perf_counter()
+		result = searcher.search(depth)
+		elapsedTime = time.perf_counter() - startTime
+
+		totalNodes += searcher.nodes
+		quiescenceNodes += searcher.quiescenceNodes
+		totalTime += elapsedTime
+		cutoffs += searcher.ordering.cutoffs
+		firstMoveCutoffs += searcher.ordering.firstMoveCutoffs
+
+		print(f'{name} : {result}, main {searcher.nodes - searcher.quiescenceNodes} / quiescence '
+			f'{searcher.quiescenceNodes} nodes, first move cutoff rate {searcher.ordering.firstMoveCutoffRate() * 100:.1f}%')
+
+	cutoffRate = firstMoveCutoffs / cutoffs if cutoffs else 0
+	print(f'total : {totalNodes} nodes ({quiescenceNodes / totalNodes * 100:.1f}% in the quiescence search) in '
+		f'{totalTime:.2f}s, nps {totalNodes / totalTime:.0f}, first move cutoff rate {cutoffRate * 100:.1f}%')
+
+	return totalNodes, quiescenceNodes, totalTime, cutoffRate
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Search the test positions and measure the engine')
+	parser.add_argument('--depth', type=int, default=5, help='the depth of the searches')
+	arguments = parser.parse_args()
+
+	benchmark(arguments.depth)
+
+
+if __name__ == '__main__':
+	main()
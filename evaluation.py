@@ -0,0 +1,431 @@
+"""
+The evaluation of a position by the engine, in centipawns :
+	- the material and the piece-square tables, kept up to date by the moves (see piece_square and
+	  bitboard.Position), so they cost nothing here
+	- the mobility of the knights, bishops, rooks and queens : the squares they attack, without the
+	  squares of their own pieces and the squares attacked by the enemy pawns
+	- the pawn structure : doubled, isolated, backward and passed pawns, kept in a cache (see
+	  pawn_table) since it only changes when a pawn moves, and the distance of the kings to the passed
+	  pawns in the endgame
+Each term has a middlegame and an endgame value (packed like in piece_square), and the two values are
+mixed according to the material left on the board (tapered evaluation). Run :
+	python evaluation.py   measure the evaluations per second, and the hit rate of the pawn structure
+	                       cache in searches
+The incremental scores and the symmetry of the evaluation are checked by tests/test_evaluation.py
+"""
+
+import argparse
+import random
+import time
+
+from bitboard import Position, START_FEN, COLOR_WHITE, COLOR_BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, FULL_BOARD, \
+	FILE_A, FILE_H, popCount, squares
+from movegen import KNIGHT_ATTACKS, ROOK_TABLES, ROOK_MASKS, BISHOP_TABLES, BISHOP_MASKS, legalMoves
+from pawn_table import PawnHashTable
+from piece_square import PHASE_WEIGHTS, MAX_PHASE, score, middlegameValue, endgameValue
+from perft import PERFT_POSITIONS
+
+# Mobility : a bonus for each square attacked, compared to the average number of squares of the piece
+MOBILITY_WEIGHTS = {KNIGHT: score(4, 4), BISHOP: score(5, 5), ROOK: score(2, 4), QUEEN: score(1, 2)}
+MOBILITY_AVERAGES = {KNIGHT: 4, BISHOP: 6, ROOK: 7, QUEEN: 13}
+
+# Pawn structure
+DOUBLED_PAWN = score(-10, -20)
+ISOLATED_PAWN = score(-5, -15)
+BACKWARD_PAWN = score(-8, -10)
+
+# PASSED_PAWN_BONUSES[relative rank] : the bonus of a passed pawn, by the number of rows it has advanced
+# from the first row of its color
+PASSED_PAWN_BONUSES = (0, score(5, 10), score(5, 15), score(10, 25), score(20, 45), score(35, 75), score(60, 120), 0)
+
+# In the endgame, a passed pawn is stronger when the enemy king is far from the square in front of it,
+# and when its own king is close
+PASSED_PAWN_ENEMY_KING = 5
+PASSED_PAWN_OWN_KING = 2
+
+# FILE_MASKS[file], ADJACENT_FILES_MASKS[file] : the squares of a file, and of the files next to it
+FILE_MASKS = [FILE_A << file for file in range(8)]
+ADJACENT_FILES_MASKS = [(FILE_MASKS[file - 1] if file > 0 else 0) | (FILE_MASKS[file + 1] if file < 7 else 0)
+	for file in range(8)]
+
+
+def _passedPawnMask(color, sq):
+	"""
+	Return the squares where an enemy pawn stops a pawn from being passed : the squares in front of it,
+	on its file and on the files next to it
+	@param color: the color of the pawn
+	@type color: int
+	@param sq: the square of the pawn
+	@type sq: int
+	@return: the bitboard of the squares
+	@rtype: int
+	"""
+
+	file = sq & 7
+	files = FILE_MASKS[file] | ADJACENT_FILES_MASKS[file]
+
+	# White pawns go towards the row 0, black pawns towards the row 7
+	if color == COLOR_WHITE:
+		return files & ((1 << (sq & ~7)) - 1)
+
+	return files & ~((1 << ((sq | 7) + 1)) - 1) & FULL_BOARD
+
+
+def _supportMask(color, sq):
+	"""
+	Return the squares where a pawn of the same color can defend a pawn now or when it advances : the
+	squares of the files next to it, on its row and behind it
+	@param color: the color of the pawn
+	@type color: int
+	@param sq: the square of the pawn
+	@type sq: int
+	@return: the bitboard of the squares
+	@rtype: int
+	"""
+
+	files = ADJACENT_FILES_MASKS[sq & 7]
+
+	if color == COLOR_WHITE:
+		return files & ~((1 << (sq & ~7)) - 1) & FULL_BOARD
+
+	return files & ((1 << ((sq | 7) + 1)) - 1)
+
+
+# PASSED_PAWN_MASKS[color][square], SUPPORT_MASKS[color][square]
+PASSED_PAWN_MASKS = [[_passedPawnMask(color, sq) for sq in range(64)] for color in (COLOR_WHITE, COLOR_BLACK)]
+SUPPORT_MASKS = [[_supportMask(color, sq) for sq in range(64)] for color in (COLOR_WHITE, COLOR_BLACK)]
+
+# DISTANCES[square1][square2] : the number of king moves between two squares
+DISTANCES = [[max(abs((sq1 & 7) - (sq2 & 7)), abs((sq1 >> 3) - (sq2 >> 3))) for sq2 in range(64)] for sq1 in range(64)]
+
+
+def pawnAttacks(pawns, color):
+	"""
+	Return the squares attacked by the pawns of a color
+	@param pawns: the bitboard of the pawns
+	@type pawns: int
+	@param color: the color of the pawns
+	@type color: int
+	@return: the attacks bitboard
+	@rtype: int
+	"""
+
+	if color == COLOR_WHITE:
+		return (pawns >> 7 & ~FILE_A) | (pawns >> 9 & ~FILE_H)
+
+	return (pawns << 9 & ~FILE_A | pawns << 7 & ~FILE_H) & FULL_BOARD
+
+
+def evaluatePawns(position):
+	"""
+	Evaluate the pawn structure : only the pawns are used, so the result only changes when a pawn moves.
+	A backward pawn cannot be defended by the pawns next to it, and cannot advance safely because an
+	enemy pawn attacks the square in front of it
+	@param position: the position
+	@type position: Position
+	@return: the packed score from the point of view of white, and the bitboard of the passed pawns of
+	both colors
+	@rtype: tuple
+	"""
+
+	packedScore = 0
+	passedPawns = 0
+	pawnsByColor = (position.pieces[PAWN], position.pieces[6 + PAWN])
+
+	for color in (COLOR_WHITE, COLOR_BLACK):
+		pawns = pawnsByColor[color]
+		enemyPawns = pawnsByColor[color ^ 1]
+		enemyAttacks = pawnAttacks(enemyPawns, color ^ 1)
+		passedMasks = PASSED_PAWN_MASKS[color]
+		supportMasks = SUPPORT_MASKS[color]
+		forward = -8 if color == COLOR_WHITE else 8
+		colorScore = 0
+
+		for sq in squares(pawns):
+			file = sq & 7
+
+			if not pawns & ADJACENT_FILES_MASKS[file]:
+				colorScore += ISOLATED_PAWN
+			elif not pawns & supportMasks[sq] and enemyAttacks >> (sq + forward) & 1:
+				colorScore += BACKWARD_PAWN
+
+			if not enemyPawns & passedMasks[sq]:
+				passedPawns |= 1 << sq
+				colorScore += PASSED_PAWN_BONUSES[7 - (sq >> 3) if color == COLOR_WHITE else sq >> 3]
+
+		for file in range(8):
+			count = popCount(pawns & FILE_MASKS[file])
+			if count > 1:
+				colorScore += DOUBLED_PAWN * (count - 1)
+
+		packedScore += colorScore if color == COLOR_WHITE else -colorScore
+
+	return packedScore, passedPawns
+
+
+def evaluatePassedPawns(position, passedPawns):
+	"""
+	Evaluate the distance of the kings to the passed pawns, which depends on the kings so it isn't part
+	of the pawn structure
+	@param position: the position
+	@type position: Position
+	@param passedPawns: the bitboard of the passed pawns of both colors
+	@type passedPawns: int
+	@return: the packed score from the point of view of white
+	@rtype: int
+	"""
+
+	packedScore = 0
+	kingSquares = (position.kingSquare(COLOR_WHITE), position.kingSquare(COLOR_BLACK))
+	if kingSquares[0] is None or kingSquares[1] is None:
+		return 0
+
+	for color in (COLOR_WHITE, COLOR_BLACK):
+		ownKing = DISTANCES[kingSquares[color]]
+		enemyKing = DISTANCES[kingSquares[color ^ 1]]
+
+		for sq in squares(passedPawns & position.colors[color]):
+			if color == COLOR_WHITE:
+				rank = 7 - (sq >> 3)
+				stopSq = sq - 8
+			else:
+				rank = sq >> 3
+				stopSq = sq + 8
+
+			# The distances matter more when the pawn is close to promote
+			weight = rank - 2
+			if weight > 0:
+				bonus = (PASSED_PAWN_ENEMY_KING * enemyKing[stopSq] - PASSED_PAWN_OWN_KING * ownKing[stopSq]) * weight
+				packedScore += bonus if color == COLOR_WHITE else -bonus
+
+	return packedScore
+
+
+def evaluateMobility(position):
+	"""
+	Evaluate the mobility of the knights, bishops, rooks and queens
+	@param position: the position
+	@type position: Position
+	@return: the packed score from the point of view of white
+	@rtype: int
+	"""
+
+	packedScore = 0
+	pieces = position.pieces
+	occupied = position.occupied
+
+	for color in (COLOR_WHITE, COLOR_BLACK):
+		offset = color * 6
+		enemy = color ^ 1
+
+		# The squares of the own pieces and the squares attacked by the enemy pawns don't count
+		area = ~(position.colors[color] | pawnAttacks(pieces[enemy * 6 + PAWN], enemy)) & FULL_BOARD
+		colorScore = 0
+
+		for sq in squares(pieces[offset + KNIGHT]):
+			colorScore += (popCount(KNIGHT_ATTACKS[sq] & area) - MOBILITY_AVERAGES[KNIGHT]) * MOBILITY_WEIGHTS[KNIGHT]
+
+		for sq in squares(pieces[offset + BISHOP]):
+			attacks = BISHOP_TABLES[sq][occupied & BISHOP_MASKS[sq]]
+			colorScore += (popCount(attacks & area) - MOBILITY_AVERAGES[BISHOP]) * MOBILITY_WEIGHTS[BISHOP]
+
+		for sq in squares(pieces[offset + ROOK]):
+			attacks = ROOK_TABLES[sq][occupied & ROOK_MASKS[sq]]
+			colorScore += (popCount(attacks & area) - MOBILITY_AVERAGES[ROOK]) * MOBILITY_WEIGHTS[ROOK]
+
+		for sq in squares(pieces[offset + QUEEN]):
+			attacks = ROOK_TABLES[sq][occupied & ROOK_MASKS[sq]] | BISHOP_TABLES[sq][occupied & BISHOP_MASKS[sq]]
+			colorScore += (popCount(attacks & area) - MOBILITY_AVERAGES[QUEEN]) * MOBILITY_WEIGHTS[QUEEN]
+
+		packedScore += colorScore if color == COLOR_WHITE else -colorScore
+
+	return packedScore
+
+
+def gamePhase(position):
+	"""
+	Return the phase of the game, from the material left on the board
+	@param position: the position
+	@type position: Position
+	@return: the phase, from MAX_PHASE (all the pieces, middlegame) to 0 (kings and pawns, endgame)
+	@rtype: int
+	"""
+
+	pieces = position.pieces
+	phase = PHASE_WEIGHTS[KNIGHT] * popCount(pieces[KNIGHT] | pieces[6 + KNIGHT]) \
+		+ PHASE_WEIGHTS[BISHOP] * popCount(pieces[BISHOP] | pieces[6 + BISHOP]) \
+		+ PHASE_WEIGHTS[ROOK] * popCount(pieces[ROOK] | pieces[6 + ROOK]) \
+		+ PHASE_WEIGHTS[QUEEN] * popCount(pieces[QUEEN] | pieces[6 + QUEEN])
+
+	# Early promotions can give more material than at the beginning
+	return min(phase, MAX_PHASE)
+
+
+def staticScore(position, pawnTable=None):
+	"""
+	Evaluate a position from the point of view of white
+	@param position: the position
+	@type position: Position
+	@param pawnTable: the cache of the pawn structures (or None to evaluate the pawn structure)
+	@type pawnTable: PawnHashTable
+	@return: the score for white, in centipawns
+	@rtype: int
+	"""
+
+	if pawnTable is None:
+		pawnScore, passedPawns = evaluatePawns(position)
+	else:
+		entry = pawnTable.probe(position.pawnHash)
+
+		if entry is None:
+			pawnScore, passedPawns = evaluatePawns(position)
+			pawnTable.store(position.pawnHash, pawnScore, passedPawns)
+		else:
+			pawnScore, passedPawns = entry
+
+	packedScore = position.pieceSquareScore + pawnScore + evaluateMobility(position)
+	if passedPawns:
+		packedScore += evaluatePassedPawns(position, passedPawns)
+
+	# Mix the middlegame and the endgame values. The division rounds towards zero, so the score of the
+	# mirrored position is exactly the opposite
+	phase = gamePhase(position)
+	total = middlegameValue(packedScore) * phase + endgameValue(packedScore) * (MAX_PHASE - phase)
+
+	return total // MAX_PHASE if total >= 0 else -(-total // MAX_PHASE)
+
+
+def evaluate(position, pawnTable=None):
+	"""
+	Evaluate a position for the engine
+	@param position: the position
+	@type position: Position
+	@param pawnTable: the cache of the pawn structures (or None to evaluate the pawn structure)
+	@type pawnTable: PawnHashTable
+	@return: the score for the player who has the turn, in centipawns
+	@rtype: int
+	"""
+
+	whiteScore = staticScore(position, pawnTable)
+
+	return -whiteScore if position.sideToMove == COLOR_BLACK else whiteScore
+
+
+def randomPositions(games=20, plies=120, seed=0):
+	"""
+	Yield the positions of random games, from the initial position and from the test positions of perft
+	@param games: the number of games from each start position
+	@type games: int
+	@param plies: the maximal number of moves of each game
+	@type plies: int
+	@param seed: the seed of the random moves
+	@type seed: int
+	@return: a generator of the positions (the same Position object, changed by each move)
+	@rtype: generator
+	"""
+
+	generator = random.Random(seed)
+	fens = [START_FEN] + [fen for _, fen, _ in PERFT_POSITIONS]
+
+	for fen in fens:
+		for _ in range(games):
+			position = Position.fromFen(fen)
+
+			for _ in range(plies):
+				moves = legalMoves(position, position.sideToMove)
+				if not moves:
+					break
+
+				position.makeMove(generator.choice(moves))
+				yield position
+
+
+def benchmark(games=20, plies=120, repeat=5):
+	"""
+	Measure the evaluations per second on the positions of random games, and compare the incremental
+	material and piece-square score to the same score computed from scratch
+	@param games: the number of games from each start position
+	@type games: int
+	@param plies: the maximal number of moves of each game
+	@type plies: int
+	@param repeat: the number of times each position is evaluated
+	@type repeat: int
+	@return: the evaluations per second
+	@rtype: float
+	"""
+
+	positions = [position.copy() for position in randomPositions(games, plies)]
+	count = len(positions) * repeat
+
+	startTime = time.perf_counter()
+	for _ in range(repeat):
+		for position in positions:
+			evaluate(position)
+	evaluateTime = time.perf_counter() - startTime
+
+	# The positions are evaluated again, so the pawn structure is found in the cache
+	pawnTable = PawnHashTable()
+	startTime = time.perf_counter()
+	for _ in range(repeat):
+		for position in positions:
+			evaluate(position, pawnTable)
+	cachedTime = time.perf_counter() - startTime
+
+	startTime = time.perf_counter()
+	for _ in range(repeat):
+		for position in positions:
+			position.computePieceSquareScore()
+	scratchTime = time.perf_counter() - startTime
+
+	print(f'{len(positions)} positions, {count} evaluations in {evaluateTime:.2f}s : {count / evaluateTime:.0f} evals/s')
+	print(f'with the pawn structure cache : {count / cachedTime:.0f} evals/s ({pawnTable})')
+	print(f'material and piece-square tables from scratch : {scratchTime / count * 1e6:.2f}us by position '
+		f'({scratchTime / evaluateTime * 100:.0f}% of the evaluation time), 0 with the incremental score')
+
+	return count / evaluateTime
+
+
+def searchPawnHitRate(depth=4):
+	"""
+	Search the test positions of perft with the engine and measure the hit rate of the pawn structure
+	cache : the searches evaluate many positions with the same pawns
+	@param depth: the depth of the searches
+	@type depth: int
+	@return: the hit rate (between 0 and 1)
+	@rtype: float
+	"""
+
+	# The engine uses this module, so it is only imported here
+	from engine import Searcher
+
+	pawnTable = PawnHashTable()
+
+	for name, fen, _ in PERFT_POSITIONS:
+		searcher = Searcher(Position.fromFen(fen), 10 ** 9)
+		searcher.pawnTable = pawnTable
+
+		probes, hits = pawnTable.probes, pawnTable.hits
+		startTime = time.perf_counter()
+		searcher.search(depth)
+		probes, hits = pawnTable.probes - probes, pawnTable.hits - hits
+
+		print(f'{name} : depth {depth}, {searcher.nodes} nodes in {time.perf_counter() - startTime:.2f}s, pawn '
+			f'structure cache hit rate {hits / probes * 100 if probes else 0:.1f}%')
+
+	print(pawnTable)
+
+	return pawnTable.hitRate()
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Measure the evaluations per second and the pawn cache hit rate')
+	parser.add_argument('--games', type=int, default=20, help='the number of random games from each start position')
+	parser.add_argument('--depth', type=int, default=4, help='the depth of the searches measuring the pawn cache hit rate')
+	arguments = parser.parse_args()
+
+	benchmark(arguments.games)
+	searchPawnHitRate(arguments.depth)
+
+
+if __name__ == '__main__':
+	main()
@@ -1,22 +1,76 @@
-from chess_board import *
+import time
+
+import pygame
+
+from board_view import ChessBoardView
 from piece import Piece
-from constants import RESOLUTION, BLACK, WHITE, SQUARE_SIZE
+from bitboard import COLOR_NAMES
+from constants import RESOLUTION, BLACK, WHITE, SQUARE_SIZE, FRAME_RATE
+import engine
+from async_engine import AsyncEngine
+from transposition import TranspositionTable
+from book import OpeningBook
 
 
 class Game:
-	"""A chess game"""
+	"""A chess game, between two players or between a player and the engine"""
+
+	def __init__(self, aiColor=None, aiTimeLimit=1000, aiHashSize=16, renderStats=False, fen=None,
+			aiWorkers=1, aiPonder=False, aiBook=None):
+		"""
+		@param aiColor: the color played by the engine, or None if two players play
+		@type aiColor: str
+		@param aiTimeLimit: the time the engine can think for each move, in milliseconds
+		@type aiTimeLimit: int
+		@param aiHashSize: the size of the transposition table of the engine, in megabytes
+		@type aiHashSize: float
+		@param renderStats: if the frame time and the CPU use must be printed at the end of the game
+		@type renderStats: bool
+		@param fen: the FEN string of the initial position, or None for the initial position of a game
+		@type fen: str
+		@param aiWorkers: the number of processes the engine uses to search
+		@type aiWorkers: int
+		@param aiPonder: if the engine thinks on the time of the player too
+		@type aiPonder: bool
+		@param aiBook: the path of the opening book of the engine, or None to always search
+		@type aiBook: str
+		"""
 
-	def __init__(self):
 		pygame.init()
 		self.window = pygame.display.set_mode(RESOLUTION)
 		pygame.display.set_caption('Chess Game')
 
-		self.chessBoard = ChessBoard()
+		self.chessBoard = ChessBoardView(fen)
 
 		self.run = True
-		self.turn = 'white'
+		self.turn = COLOR_NAMES[self.chessBoard.position.sideToMove]
 		self.turnKing = self.chessBoard.king(self.turn)
 
+		self.aiColor = aiColor
+		self.aiTimeLimit = aiTimeLimit
+		self.aiWorkers = aiWorkers
+		self.aiPonder = aiPonder
+		self.aiTable = None
+		self.aiBook = None
+		self.aiEngine = None
+
+		# The engine thinks in a background thread, the window keeps drawing during its search
+		if aiColor is not None:
+			self.aiTable = TranspositionTable(aiHashSize, shared=aiWorkers > 1)
+			if aiBook is not None:
+				self.aiBook = OpeningBook(aiBook)
+			# The lines of the search are only printed with the statistics
+			self.aiEngine = AsyncEngine(aiTimeLimit, self.aiTable, aiWorkers, engine.printInfo if renderStats else None,
+				self.aiBook)
+
+		self.clock = pygame.time.Clock()
+
+		# The rendering statistics : the frames drawn, the time spent to draw them and the squares drawn
+		self.renderStats = renderStats
+		self.frames = 0
+		self.frameTime = 0
+		self.squaresDrawn = 0
+
 	def popup(self, title, message):
 		"""Show the end popup"""
 		popup = pygame.display.set_mode((500, 300))
@@ -27,30 +81,107 @@ class Game:
 		textRect = text.get_rect()
 		textRect.center = (250, 150)
 
-		run = True
+		popup.fill(WHITE)
+		popup.blit(text, textRect)
+		pygame.display.update()
 
-		while run:
-			popup.fill(WHITE)
-			popup.blit(text, textRect)
+		# Nothing changes in the popup, so wait for the user to close it
+		while pygame.event.wait().type != pygame.QUIT:
+			pass
 
-			for event in pygame.event.get():
-				if event.type == pygame.QUIT:
-					run = False
+	def endTurn(self):
+		"""
+		Give the turn to the other player, and stop the game if he is checkmate, or if the game is a draw
+		@return: None
+		@rtype: None
+		"""
+
+		# Reset the possibles moves board
+		self.chessBoard.resetPossiblesMovesBoard()
+
+		# Swap the turn
+		if self.turn == 'white':
+			self.turn = 'black'
+		else:
+			self.turn = 'white'
+
+		# Update the turn king (the king of the player who plays)
+		self.turnKing = self.chessBoard.king(self.turn)
+
+		# The reason of a draw other than the stalemate, looked for once
+		reason = self.chessBoard.position.drawReason()
+
+		# If the turnking is checkmate, stop the game
+		if self.chessBoard.isCheckMate(self.turnKing):
+			if self.turn == 'white':
+				winner = 'black'
+			else:
+				winner = 'white'
+
+			self.run = False
+			self.popup('Game finished', f'{winner.capitalize()} player won the game !')
+
+		# If the player who has the turn cannot move without being check, the game is a draw
+		elif self.chessBoard.isStalemate(self.turnKing):
+			self.run = False
+			self.popup('Game finished', 'Stalemate, the game is a draw !')
+
+		# The other draws : the 50 moves rule, the threefold repetition and the insufficient material
+		elif reason is not None:
+			self.run = False
+			self.popup('Game finished', f'{reason.capitalize()}, the game is a draw !')
+
+	def updateAi(self):
+		"""
+		Start the search of the engine when it gets the turn, and play its move when the search is finished
+		@return: None
+		@rtype: None
+		"""
+
+		result = self.aiEngine.poll()
 
-			pygame.display.update()
+		if result is None:
+			if not self.aiEngine.isThinking():
+				self.aiEngine.think(self.chessBoard.position)
+			return
+
+		# The use of the transposition table and of the pawn structure cache, only printed with the statistics
+		if self.renderStats:
+			print(self.aiTable)
+			print(self.aiEngine.pawnTable)
+
+		self.chessBoard.makeMove(result.move)
+		self.endTurn()
+
+		# Think on the time of the player, expecting the next move of the principal variation
+		if self.run and self.aiPonder and len(result.pv) >= 2:
+			self.aiEngine.ponder(self.chessBoard.position, result.pv[1])
 
 	def start(self):
 		"""Start a chess game"""
+		startTime = time.perf_counter()
+		startCpuTime = time.process_time()
+
 		while self.run:
 
-			for event in pygame.event.get():
+			# When nothing has to be drawn and the engine doesn't play, sleep until the next event instead
+			# of looping for nothing
+			events = pygame.event.get()
+			if not events and not self.chessBoard.dirtySquares and self.turn != self.aiColor:
+				events = [pygame.event.wait()] + pygame.event.get()
+
+			for event in events:
 
-				# If the user want to leave, stop the game
+				# If the user want to leave, stop the game (and the search of the engine)
 				if event.type == pygame.QUIT:
 					self.run = False
 
-				# If the user clicked, check where he clicked
-				elif event.type == pygame.MOUSEBUTTONUP:
+				# The window was hidden or resized, its content must be drawn again
+				elif event.type == pygame.VIDEOEXPOSE:
+					self.chessBoard.redrawAll()
+
+				# If the user clicked while he has the turn, check where he clicked
+				elif event.type == pygame.MOUSEBUTTONUP and self.turn != self.aiColor:
 
 					# Get the clicked place on the chess board and on the possibles moves board
 					mousePosition = pygame.mouse.get_pos()
@@ -70,51 +201,71 @@ class Game:
 							# Reset the possibles moves board
 							self.chessBoard.resetPossiblesMovesBoard()
 
-							# Get the possibles moves of the clicked piece
-							possiblesMoves = piece.getPossiblesMoves(self.chessBoard.mainChessBoard)
+							# Get the legal moves of the clicked piece
+							possiblesMoves = self.chessBoard.getPossiblesMoves(boardCoord)
 
 							# Add the possibles moves on the possibles moves board
-							for move in possiblesMoves:
-								self.chessBoard.possiblesMovesBoard[move[1]][move[0]] = 1
+							self.chessBoard.showPossiblesMoves(possiblesMoves)
 
 					# Else, if the user clicked on a possible move, move the piece selected to this possible move's place
-					# But first, check if the king of the player who has the turn is in check after his move
+					# The possibles moves are legal, so the king of the player who has the turn cannot be check after his move
 					if possibleMove == 1:
-						# Move the piece
-						self.chessBoard.movePiece(self.chessBoard.mainChessBoard, self.chessBoard.mainChessBoard[self.chessBoard.pieceSelected[1]][self.chessBoard.pieceSelected[0]], boardCoord)
-
-						# If the king of the player who has the turn is check, reverse the move just above
-						if self.chessBoard.isCheck(self.chessBoard.mainChessBoard, self.turnKing):
-							print('Your king is check !')
-							self.chessBoard.movePiece(self.chessBoard.mainChessBoard, self.chessBoard.mainChessBoard[boardCoord[1]][boardCoord[0]], self.chessBoard.pieceSelected)
-						else:
-							# Reset the possibles moves board
-							self.chessBoard.resetPossiblesMovesBoard()
-
-							# Swap the turn
-							if self.turn == 'white':
-								self.turn = 'black'
-							else:
-								self.turn = 'white'
-
-							# Update the turn king (the king of the player who plays)
-							self.turnKing = self.chessBoard.king(self.turn)
+						# Move the piece (a pawn reaching the last row becomes a queen)
+						move = self.chessBoard.findMove(self.chessBoard.pieceSelected, boardCoord)
+						self.chessBoard.makeMove(move)
 
-							# If the turnking is checkmate, stop the game
-							if self.chessBoard.isCheckMate(self.turnKing):
-								if self.turn == 'white':
-									winner = 'black'
-								else:
-									winner = 'white'
+						# The search of the engine goes on if it was pondering this move
+						if self.aiEngine is not None:
+							self.aiEngine.opponentMoved(move)
 
-								self.run = False
-								self.popup('Game finished', f'{winner.capitalize()} player won the game !')
+						self.endTurn()
 
 					# Else (the user clicked on a blank case), clean the possibles moves board and the piece selected
 					if not isinstance(place, Piece) and possibleMove != 1:
 						self.chessBoard.pieceSelected = ()
 						self.chessBoard.resetPossiblesMovesBoard()
 
-			# Update the user's screen
-			self.chessBoard.drawBoards(self.window)
-			pygame.display.update()
+			# Update the changed parts of the user's screen
+			if self.chessBoard.dirtySquares:
+				frameStartTime = time.perf_counter()
+
+				self.squaresDrawn += len(self.chessBoard.dirtySquares)
+				pygame.display.update(self.chessBoard.drawBoards(self.window))
+
+				self.frameTime += time.perf_counter() - frameStartTime
+				self.frames += 1
+
+			# If the engine has the turn, start its search once the screen shows the last move, or play its
+			# move when the search is finished
+			if self.run and self.turn == self.aiColor:
+				self.updateAi()
+
+			self.clock.tick(FRAME_RATE)
+
+		# Stop the search of the engine, then release the shared memory of its table and its book
+		if self.aiEngine is not None:
+			self.aiEngine.stop()
+			self.aiTable.close()
+			if self.aiBook is not None:
+				self.aiBook.close()
+
+		if self.renderStats:
+			self.printRenderStats(time.perf_counter() - startTime, time.process_time() - startCpuTime)
+
+	def printRenderStats(self, elapsedTime, cpuTime):
+		"""
+		Print the rendering statistics of the game : the frames drawn, the average frame time and the CPU
+		use of the process (the thinking of the engine included)
+		@param elapsedTime: the duration of the game, in seconds
+		@type elapsedTime: float
+		@param cpuTime: the CPU time used during the game, in seconds
+		@type cpuTime: float
+		@return: None
+		@rtype: None
+		"""
+
+		averageFrameTime = self.frameTime / self.frames * 1000 if self.frames else 0
+		cpuUse = cpuTime / elapsedTime * 100 if elapsedTime > 0 else 0
+
+		print(f'{self.frames} frames drawn in {elapsedTime:.1f}s, {self.squaresDrawn} squares, '
+			f'frame time {averageFrameTime:.2f}ms, CPU use {cpuUse:.1f}%')
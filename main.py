@@ -1,9 +1,23 @@
+import argparse
+
 import pygame
 
 from game import Game
 
 def main():
-	newGame = Game()
+	parser = argparse.ArgumentParser(description='Play a chess game')
+	parser.add_argument('--ai', choices=['white', 'black'], help='let the engine play this color')
+	parser.add_argument('--ai-time', type=int, default=1000, help='the thinking time of the engine for each move, in milliseconds')
+	parser.add_argument('--ai-hash', type=float, default=16, help='the size of the transposition table of the engine, in megabytes')
+	parser.add_argument('--ai-workers', type=int, default=1, help='the number of processes the engine uses to search')
+	parser.add_argument('--ai-ponder', action='store_true', help='let the engine think on the time of the player too')
+	parser.add_argument('--ai-book', help='the opening book of the engine (see book.py)')
+	parser.add_argument('--stats', action='store_true', help='print the frame time and the CPU use at the end of the game')
+	parser.add_argument('--fen', help='start the game from this position (FEN string)')
+	arguments = parser.parse_args()
+
+	newGame = Game(arguments.ai, arguments.ai_time, arguments.ai_hash, arguments.stats, arguments.fen,
+		arguments.ai_workers, arguments.ai_ponder, arguments.ai_book)
 	newGame.start()
 
 if __name__ == '__main__':
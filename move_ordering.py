@@ -0,0 +1,265 @@
+"""
+The order of the moves in the search. Alpha-beta cuts a node as soon as a move is good enough, so the
+best moves must be searched first. The moves of a node are given in stages, each stage is only
+generated when the previous ones didn't cut the node :
+	- the hash move : the best move found by a previous search of the position
+	- the good captures and the promotions, the most valuable victim first and, for the same victim,
+	  the least valuable attacker first (MVV-LVA)
+	- the killer moves : the quiet moves that cut a node at the same ply in another branch
+	- the quiet moves, by their history : how often and how deep a move of this piece to this square
+	  cut a node before
+	- the bad captures : the captures losing material once the exchange on their square is resolved
+	  (see see.py), found when their turn comes in the captures stage
+Most nodes are cut by the hash move or a capture, before the quiet moves are generated
+"""
+
+from bitboard import PAWN, KNIGHT, NO_MOVE, MAX_MOVES, MOVE_KIND_MASK, MOVE_NORMAL, MOVE_PROMOTION, \
+	MOVE_EN_PASSANT, MOVE_CASTLING
+from movegen import generateLegalMoves, isLegalMove, GENERATE_NOISY, GENERATE_QUIET
+from see import see, SEE_VALUES
+
+# MVV_LVA[victim type][attacker type] : the order of the captures
+MVV_LVA = [[(victim + 1) * 8 - attacker for attacker in range(6)] for victim in range(6)]
+
+# A promotion is ordered like the capture of the promotion piece by a pawn
+PROMOTION_ORDER = [MVV_LVA[promotion][PAWN] for promotion in range(6)]
+
+# When a history score passes this limit, all the scores are halved, so the recent cutoffs count more
+HISTORY_LIMIT = 1 << 20
+
+# The number of killer moves kept for each ply
+KILLER_COUNT = 2
+
+
+class MoveOrdering:
+	"""
+	The tables of the move ordering of a search (killer moves and history), and the statistics of the
+	cutoffs
+	"""
+
+	def __init__(self, maxPly):
+		"""
+		@param maxPly: the maximal distance from the root of the search
+		@type maxPly: int
+		"""
+
+		# The move buffers and the scores of their moves, and the bad captures put aside, one for each ply,
+		# allocated once for the search
+		self.moveBuffers = [[NO_MOVE] * MAX_MOVES for _ in range(maxPly + 1)]
+		self.scoreBuffers = [[0] * MAX_MOVES for _ in range(maxPly + 1)]
+		self.badCaptureBuffers = [[NO_MOVE] * MAX_MOVES for _ in range(maxPly + 1)]
+
+		# killers[ply] : the last quiet moves that cut a node at this ply, the most recent first
+		self.killers = [[NO_MOVE] * KILLER_COUNT for _ in range(maxPly + 1)]
+
+		# history[piece code][destination square]
+		self.history = [[0] * 64 for _ in range(12)]
+
+		self.cutoffs = 0
+		self.firstMoveCutoffs = 0
+
+	def __repr__(self):
+		"""Used for debugging"""
+		return f'move ordering : {self.cutoffs} cutoffs, first move cutoff rate {self.firstMoveCutoffRate() * 100:.1f}%'
+
+	def newIteration(self):
+		"""
+		Start an iteration of the search : the history of the previous iterations counts less
+		@return: None
+		@rtype: None
+		"""
+
+		for pieceHistory in self.history:
+			for sq in range(64):
+				pieceHistory[sq] >>= 1
+
+	def orderedMoves(self, position, ply, hashMove):
+		"""
+		Yield the legal moves of the side to move, stage by stage, the moves expected to be the best first
+		@param position: the position, it must be the same when the next move is asked
+		@type position: Position
+		@param ply: the distance from the root of the search
+		@type ply: int
+		@param hashMove: the best move of a previous search of the position (or NO_MOVE)
+		@type hashMove: int
+		@return: a generator of the moves
+		@rtype: generator
+		"""
+
+		color = position.sideToMove
+		squares = position.squares
+		moves = self.moveBuffers[ply]
+		scores = self.scoreBuffers[ply]
+
+		# The hash move can come from another position with the same hash, so it is checked
+		if hashMove != NO_MOVE and isLegalMove(position, hashMove):
+			yield hashMove
+		else:
+			hashMove = NO_MOVE
+
+		# Good captures and promotions. The bad captures are kept for the end
+		count = generateLegalMoves(position, color, moves, GENERATE_NOISY)
+		self._scoreNoisyMoves(position, moves, scores, count)
+
+		badCaptures = self.badCaptureBuffers[ply]
+		badCaptureCount = 0
+		for move in self._selectMoves(moves, scores, count, hashMove, NO_MOVE, NO_MOVE):
+			# A capture of a piece worth at least the capturing piece never loses material
+			victim = squares[move >> 6 & 63]
+			if move & MOVE_KIND_MASK == MOVE_NORMAL and SEE_VALUES[victim % 6] < SEE_VALUES[squares[move & 63] % 6] \
+					and see(position, move) < 0:
+				badCaptures[badCaptureCount] = move
+				badCaptureCount += 1
+			else:
+				yield move
+
+		# Killer moves, still quiet and legal in this position
+		firstKiller, secondKiller = self.killers[ply]
+		for killer in (firstKiller, secondKiller):
+			if killer != NO_MOVE and killer != hashMove and squares[killer >> 6 & 63] is None \
+					and isLegalMove(position, killer):
+				yield killer
+
+		# Quiet moves
+		history = self.history
+		count = generateLegalMoves(position, color, moves, GENERATE_QUIET)
+		for index in range(count):
+			move = moves[index]
+			scores[index] = history[squares[move & 63]][move >> 6 & 63]
+
+		yield from self._selectMoves(moves, scores, count, hashMove, firstKiller, secondKiller)
+
+		for index in range(badCaptureCount):
+			yield badCaptures[index]
+
+	def noisyMoves(self, position, ply):
+		"""
+		Yield the captures and the promotions of the side to move by MVV-LVA, for the quiescence search
+		@param position: the position, it must be the same when the next move is asked
+		@type position: Position
+		@param ply: the distance from the root of the search
+		@type ply: int
+		@return: a generator of the moves
+		@rtype: generator
+		"""
+
+		moves = self.moveBuffers[ply]
+		scores = self.scoreBuffers[ply]
+
+		count = generateLegalMoves(position, position.sideToMove, moves, GENERATE_NOISY)
+		self._scoreNoisyMoves(position, moves, scores, count)
+
+		return self._selectMoves(moves, scores, count)
+
+	@staticmethod
+	def _scoreNoisyMoves(position, moves, scores, count):
+		"""
+		Give the MVV-LVA order of the captures and the promotions of a move buffer
+		@param position: the position
+		@type position: Position
+		@param moves: the move buffer
+		@type moves: List
+		@param scores: the scores of the moves, written by this method
+		@type scores: List
+		@param count: the number of moves in the buffer
+		@type count: int
+		@return: None
+		@rtype: None
+		"""
+
+		squares = position.squares
+
+		for index in range(count):
+			move = moves[index]
+			kind = move & MOVE_KIND_MASK
+			victim = squares[move >> 6 & 63]
+
+			if kind == MOVE_PROMOTION:
+				scores[index] = PROMOTION_ORDER[(move >> 12 & 3) + KNIGHT]
+				if victim is not None:
+					scores[index] += MVV_LVA[victim % 6][PAWN]
+			elif kind == MOVE_EN_PASSANT:
+				scores[index] = MVV_LVA[PAWN][PAWN]
+			else:
+				scores[index] = MVV_LVA[victim % 6][squares[move & 63] % 6]
+
+	@staticmethod
+	def _selectMoves(moves, scores, count, *skippedMoves):
+		"""
+		Yield the moves of a buffer by decreasing score, without the moves already given by another stage.
+		Selection sort : most nodes are cut after a few moves, so sorting all the moves would be wasted
+		@param moves: the move buffer
+		@type moves: List
+		@param scores: the scores of the moves
+		@type scores: List
+		@param count: the number of moves in the buffer
+		@type count: int
+		@param skippedMoves: the moves not to yield
+		@type skippedMoves: int
+		@return: a generator of the moves
+		@rtype: generator
+		"""
+
+		for index in range(count):
+			best = index
+			bestScore = scores[index]
+			for other in range(index + 1, count):
+				if scores[other] > bestScore:
+					best = other
+					bestScore = scores[other]
+
+			move = moves[best]
+			if best != index:
+				moves[best] = moves[index]
+				scores[best] = scores[index]
+
+			if move not in skippedMoves:
+				yield move
+
+	def recordCutoff(self, position, move, ply, depth, moveNumber):
+		"""
+		Remember a move which cut a node : a quiet move becomes a killer move of the ply, and its history
+		increases with the depth of the node
+		@param position: the position of the node (the move is taken back)
+		@type position: Position
+		@param move: the move
+		@type move: int
+		@param ply: the distance from the root of the search
+		@type ply: int
+		@param depth: the remaining depth of the node
+		@type depth: int
+		@param moveNumber: the number of moves searched in the node, this move included
+		@type moveNumber: int
+		@return: None
+		@rtype: None
+		"""
+
+		self.cutoffs += 1
+		if moveNumber == 1:
+			self.firstMoveCutoffs += 1
+
+		kind = move & MOVE_KIND_MASK
+		if position.squares[move >> 6 & 63] is not None or (kind != MOVE_NORMAL and kind != MOVE_CASTLING):
+			return
+
+		killers = self.killers[ply]
+		if killers[0] != move:
+			killers[1] = killers[0]
+			killers[0] = move
+
+		pieceHistory = self.history[position.squares[move & 63]]
+		pieceHistory[move >> 6 & 63] += depth * depth
+
+		if pieceHistory[move >> 6 & 63] > HISTORY_LIMIT:
+			for table in self.history:
+				for sq in range(64):
+					table[sq] >>= 1
+
+	def firstMoveCutoffRate(self):
+		"""
+		Return the part of the cutoffs made by the first move searched, the quality of the order
+		@return: the rate (between 0 and 1)
+		@rtype: float
+		"""
+
+		return self.firstMoveCutoffs / self.cutoffs if self.cutoffs else 0
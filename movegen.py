@@ -0,0 +1,786 @@
+"""
+Move generation on the bitboards of a Position
+
+All the attacks are precomputed tables, built once when the module is imported :
+	- the knight, king and pawn attacks of each square
+	- for the sliding pieces (rook, bishop and queen), the attacks of each square for every possible
+	  occupancy of the squares that can block them (the relevant occupancy). Like the PEXT
+	  instruction, the occupancy of the board is masked with the relevant squares and the result is
+	  directly used as the key of the lookup table of the square
+
+The sliding tables take some time to build, so they are saved in a cache file the first time, and the
+next imports only load this file
+"""
+
+import marshal
+import os
+import time
+
+from bitboard import COLOR_WHITE, COLOR_BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, FULL_BOARD, FILE_A, \
+	FILE_H, RANK_1, RANK_8, SQUARE_BITS, CASTLING_WHITE_KINGSIDE, CASTLING_WHITE_QUEENSIDE, CASTLING_BLACK_KINGSIDE, \
+	CASTLING_BLACK_QUEENSIDE, PIECE_LETTERS, MOVES, MOVE_NORMAL, MOVE_PROMOTION, MOVE_EN_PASSANT, MOVE_CASTLING, \
+	MOVE_KIND_MASK, NO_MOVE, MAX_MOVES, square, squareCoord, squareName, squares, encodeMove, movePromotion
+
+# Directions used by the sliding pieces, as (dx, dy) steps on the board
+ROOK_DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+BISHOP_DIRECTIONS = ((1, 1), (-1, -1), (1, -1), (-1, 1))
+
+KNIGHT_STEPS = ((2, -1), (2, 1), (-2, 1), (-2, -1), (1, 2), (-1, 2), (1, -2), (-1, -2))
+KING_STEPS = ((-1, -1), (0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0))
+
+# The pieces a pawn can be promoted to, the best first
+PROMOTION_TYPES = (QUEEN, ROOK, BISHOP, KNIGHT)
+
+# The moves written by generateLegalMoves() : all the moves, only the noisy moves (the captures, the en
+# passant captures and the promotions), or only the quiet moves (the other moves, castling included).
+# The search generates the noisy moves first, and often doesn't need the quiet moves
+GENERATE_ALL = 0
+GENERATE_NOISY = 1
+GENERATE_QUIET = 2
+
+# For each castling : the right needed, the color, the king move, the squares that must be empty and
+# the squares the king goes through, that must not be attacked
+CASTLINGS = (
+	(CASTLING_WHITE_KINGSIDE, COLOR_WHITE, 60, 62, SQUARE_BITS[61] | SQUARE_BITS[62], (61, 62)),
+	(CASTLING_WHITE_QUEENSIDE, COLOR_WHITE, 60, 58, SQUARE_BITS[57] | SQUARE_BITS[58] | SQUARE_BITS[59], (59, 58)),
+	(CASTLING_BLACK_KINGSIDE, COLOR_BLACK, 4, 6, SQUARE_BITS[5] | SQUARE_BITS[6], (5, 6)),
+	(CASTLING_BLACK_QUEENSIDE, COLOR_BLACK, 4, 2, SQUARE_BITS[1] | SQUARE_BITS[2] | SQUARE_BITS[3], (3, 2))
+)
+
+# The cache file of the sliding tables, and its version (to change each time the tables change)
+TABLES_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '__pycache__', 'movegen_tables.bin')
+TABLES_VERSION = 1
+
+# Time allowed to get the tables when the module is imported, in seconds. Loading the cache file must
+# stay under this budget so launching the game isn't noticeably slower
+STARTUP_BUDGET = 0.1
+
+
+def _stepAttacks(sq, steps):
+	"""
+	Return the bitboard of the squares reached with one of the steps from a square
+	@param sq: the square index
+	@type sq: int
+	@param steps: the (dx, dy) steps
+	@type steps: tuple
+	@return: the attacks bitboard
+	@rtype: int
+	"""
+
+	x, y = squareCoord(sq)
+	attacks = 0
+
+	for dx, dy in steps:
+		if 7 >= x + dx >= 0 and 7 >= y + dy >= 0:
+			attacks |= SQUARE_BITS[square(x + dx, y + dy)]
+
+	return attacks
+
+
+def _slidingAttacks(sq, occupied, directions):
+	"""
+	Return the attacks of a sliding piece by walking each direction until a blocker. Only used to build
+	the tables
+	@param sq: the square of the sliding piece
+	@type sq: int
+	@param occupied: the bitboard of all the pieces
+	@type occupied: int
+	@param directions: the directions the piece can slide to
+	@type directions: tuple
+	@return: the attacks bitboard
+	@rtype: int
+	"""
+
+	x, y = squareCoord(sq)
+	attacks = 0
+
+	for dx, dy in directions:
+		n = 1
+		while 7 >= x + dx * n >= 0 and 7 >= y + dy * n >= 0:
+			bit = SQUARE_BITS[square(x + dx * n, y + dy * n)]
+			attacks |= bit
+
+			if occupied & bit:
+				break
+
+			n += 1
+
+	return attacks
+
+
+def _betweenSquares(sq):
+	"""
+	Return the squares between a square and each square on the same row, column or diagonal
+	@param sq: the square index
+	@type sq: int
+	@return: a List with the bitboard of the squares between for each square (0 if not aligned)
+	@rtype: List
+	"""
+
+	x, y = squareCoord(sq)
+	between = [0] * 64
+
+	for dx, dy in ROOK_DIRECTIONS + BISHOP_DIRECTIONS:
+		squaresPassed = 0
+		n = 1
+		while 7 >= x + dx * n >= 0 and 7 >= y + dy * n >= 0:
+			target = square(x + dx * n, y + dy * n)
+			between[target] = squaresPassed
+			squaresPassed |= SQUARE_BITS[target]
+			n += 1
+
+	return between
+
+
+def _relevantOccupancyMask(sq, directions):
+	"""
+	Return the squares that can block a sliding piece. The last square of each direction is not
+	included, because a piece on it doesn't change the attacks
+	@param sq: the square of the sliding piece
+	@type sq: int
+	@param directions: the directions the piece can slide to
+	@type directions: tuple
+	@return: the mask bitboard
+	@rtype: int
+	"""
+
+	x, y = squareCoord(sq)
+	mask = 0
+
+	for dx, dy in directions:
+		n = 1
+		while 7 >= x + dx * (n + 1) >= 0 and 7 >= y + dy * (n + 1) >= 0:
+			mask |= SQUARE_BITS[square(x + dx * n, y + dy * n)]
+			n += 1
+
+	return mask
+
+
+def _buildSlidingTables(directions):
+	"""
+	Build the masks and the lookup tables of a sliding piece
+	@param directions: the directions the piece can slide to
+	@type directions: tuple
+	@return: the masks List and the tables List (a dict for each square)
+	@rtype: tuple
+	"""
+
+	masks = []
+	tables = []
+
+	for sq in range(64):
+		mask = _relevantOccupancyMask(sq, directions)
+		table = {}
+
+		# Enumerate all the subsets of the mask (Carry-Rippler trick)
+		occupancy = 0
+		while True:
+			table[occupancy] = _slidingAttacks(sq, occupancy, directions)
+			occupancy = (occupancy - mask) & mask
+
+			if occupancy == 0:
+				break
+
+		masks.append(mask)
+		tables.append(table)
+
+	return masks, tables
+
+
+def _loadSlidingTables():
+	"""
+	Load the sliding tables from the cache file, or build them and save them in the cache file
+	@return: the rook masks, rook tables, bishop masks and bishop tables, and if they were loaded from
+	the cache file
+	@rtype: tuple
+	"""
+
+	try:
+		with open(TABLES_CACHE_PATH, 'rb') as cacheFile:
+			version, tables = marshal.loads(cacheFile.read())
+
+		if version == TABLES_VERSION:
+			return tables, True
+	except (OSError, EOFError, ValueError, TypeError):
+		pass
+
+	tables = _buildSlidingTables(ROOK_DIRECTIONS) + _buildSlidingTables(BISHOP_DIRECTIONS)
+
+	# The cache is only an optimization : if it cannot be written, the tables will be built again
+	try:
+		os.makedirs(os.path.dirname(TABLES_CACHE_PATH), exist_ok=True)
+		temporaryPath = TABLES_CACHE_PATH + '.' + str(os.getpid())
+
+		with open(temporaryPath, 'wb') as cacheFile:
+			cacheFile.write(marshal.dumps((TABLES_VERSION, tables)))
+
+		os.replace(temporaryPath, TABLES_CACHE_PATH)
+	except OSError:
+		pass
+
+	return tables, False
+
+
+KNIGHT_ATTACKS = [_stepAttacks(sq, KNIGHT_STEPS) for sq in range(64)]
+KING_ATTACKS = [_stepAttacks(sq, KING_STEPS) for sq in range(64)]
+
+# PAWN_ATTACKS[color][square] : the squares attacked by a pawn of this color on this square
+PAWN_ATTACKS = [
+	[_stepAttacks(sq, ((-1, -1), (1, -1))) for sq in range(64)],
+	[_stepAttacks(sq, ((-1, 1), (1, 1))) for sq in range(64)]
+]
+
+# BETWEEN[square1][square2] : the squares between two aligned squares
+BETWEEN = [_betweenSquares(sq) for sq in range(64)]
+
+_startTime = time.perf_counter()
+(ROOK_MASKS, ROOK_TABLES, BISHOP_MASKS, BISHOP_TABLES), TABLES_FROM_CACHE = _loadSlidingTables()
+TABLES_LOAD_TIME = time.perf_counter() - _startTime
+
+
+def rookAttacks(sq, occupied):
+	"""
+	Return the squares attacked by a rook
+	@param sq: the square of the rook
+	@type sq: int
+	@param occupied: the bitboard of all the pieces
+	@type occupied: int
+	@return: the attacks bitboard
+	@rtype: int
+	"""
+
+	return ROOK_TABLES[sq][occupied & ROOK_MASKS[sq]]
+
+
+def bishopAttacks(sq, occupied):
+	"""
+	Return the squares attacked by a bishop
+	@param sq: the square of the bishop
+	@type sq: int
+	@param occupied: the bitboard of all the pieces
+	@type occupied: int
+	@return: the attacks bitboard
+	@rtype: int
+	"""
+
+	return BISHOP_TABLES[sq][occupied & BISHOP_MASKS[sq]]
+
+
+def queenAttacks(sq, occupied):
+	"""
+	Return the squares attacked by a queen
+	@param sq: the square of the queen
+	@type sq: int
+	@param occupied: the bitboard of all the pieces
+	@type occupied: int
+	@return: the attacks bitboard
+	@rtype: int
+	"""
+
+	return ROOK_TABLES[sq][occupied & ROOK_MASKS[sq]] | BISHOP_TABLES[sq][occupied & BISHOP_MASKS[sq]]
+
+
+def attacksFrom(position, sq):
+	"""
+	Return the squares attacked by the piece of a square
+	@param position: the position
+	@type position: Position
+	@param sq: the square of the piece
+	@type sq: int
+	@return: the attacks bitboard
+	@rtype: int
+	"""
+
+	code = position.squares[sq]
+	pieceType = code % 6
+
+	if pieceType == PAWN:
+		return PAWN_ATTACKS[code // 6][sq]
+	elif pieceType == KNIGHT:
+		return KNIGHT_ATTACKS[sq]
+	elif pieceType == BISHOP:
+		return bishopAttacks(sq, position.occupied)
+	elif pieceType == ROOK:
+		return rookAttacks(sq, position.occupied)
+	elif pieceType == QUEEN:
+		return queenAttacks(sq, position.occupied)
+
+	return KING_ATTACKS[sq]
+
+
+def attackersOf(position, sq, color, occupied):
+	"""
+	Return the pieces of a color attacking a square. The square is seen as a super-piece moving like
+	all the pieces at once : a piece attacks the square if the super-piece, moving like this piece,
+	attacks the piece from the square
+	@param position: the position
+	@type position: Position
+	@param sq: the square
+	@type sq: int
+	@param color: the color of the attackers
+	@type color: int
+	@param occupied: the bitboard of the pieces that block the sliding pieces
+	@type occupied: int
+	@return: the bitboard of the attackers
+	@rtype: int
+	"""
+
+	pieces = position.pieces
+	base = color * 6
+	queens = pieces[base + QUEEN]
+
+	return (PAWN_ATTACKS[color ^ 1][sq] & pieces[base + PAWN]) \
+		| (KNIGHT_ATTACKS[sq] & pieces[base + KNIGHT]) \
+		| (KING_ATTACKS[sq] & pieces[base + KING]) \
+		| (BISHOP_TABLES[sq][occupied & BISHOP_MASKS[sq]] & (pieces[base + BISHOP] | queens)) \
+		| (ROOK_TABLES[sq][occupied & ROOK_MASKS[sq]] & (pieces[base + ROOK] | queens))
+
+
+def isSquareAttacked(position, sq, color):
+	"""
+	Return if a square is attacked by a piece of a color. Works backward from the square like
+	attackersOf(), but stops at the first kind of piece found
+	@param position: the position
+	@type position: Position
+	@param sq: the square
+	@type sq: int
+	@param color: the color of the attackers
+	@type color: int
+	@return: if the square is attacked
+	@rtype: bool
+	"""
+
+	pieces = position.pieces
+	base = color * 6
+
+	if KNIGHT_ATTACKS[sq] & pieces[base + KNIGHT]:
+		return True
+	if PAWN_ATTACKS[color ^ 1][sq] & pieces[base + PAWN]:
+		return True
+	if KING_ATTACKS[sq] & pieces[base + KING]:
+		return True
+
+	occupied = position.occupied
+	queens = pieces[base + QUEEN]
+
+	if BISHOP_TABLES[sq][occupied & BISHOP_MASKS[sq]] & (pieces[base + BISHOP] | queens):
+		return True
+
+	return ROOK_TABLES[sq][occupied & ROOK_MASKS[sq]] & (pieces[base + ROOK] | queens) != 0
+
+
+def attackedSquares(position, color):
+	"""
+	Return all the squares attacked by the pieces of a color
+	@param position: the position
+	@type position: Position
+	@param color: COLOR_WHITE or COLOR_BLACK
+	@type color: int
+	@return: the attacks bitboard
+	@rtype: int
+	"""
+
+	occupied = position.occupied
+	pieces = position.pieces
+	base = color * 6
+
+	# The attacks of all the pawns are computed at once by shifting their bitboard
+	pawns = pieces[base + PAWN]
+	if color == COLOR_WHITE:
+		attacks = ((pawns & ~FILE_A) >> 9) | ((pawns & ~FILE_H) >> 7)
+	else:
+		attacks = (((pawns & ~FILE_A) << 7) | ((pawns & ~FILE_H) << 9)) & FULL_BOARD
+
+	for sq in squares(pieces[base + KNIGHT]):
+		attacks |= KNIGHT_ATTACKS[sq]
+	for sq in squares(pieces[base + BISHOP] | pieces[base + QUEEN]):
+		attacks |= BISHOP_TABLES[sq][occupied & BISHOP_MASKS[sq]]
+	for sq in squares(pieces[base + ROOK] | pieces[base + QUEEN]):
+		attacks |= ROOK_TABLES[sq][occupied & ROOK_MASKS[sq]]
+	for sq in squares(pieces[base + KING]):
+		attacks |= KING_ATTACKS[sq]
+
+	return attacks
+
+
+def pseudoLegalMoves(position, color):
+	"""
+	Return the moves of the pieces of a color, without checking if they leave their king in check
+	@param position: the position
+	@type position: Position
+	@param color: COLOR_WHITE or COLOR_BLACK
+	@type color: int
+	@return: the list of the moves, packed without their kind (see bitboard.encodeMove())
+	@rtype: List
+	"""
+
+	moves = []
+	occupied = position.occupied
+	pieces = position.pieces
+	base = color * 6
+	notOwn = ~position.colors[color] & FULL_BOARD
+	enemies = position.colors[color ^ 1]
+	empty = ~occupied & FULL_BOARD
+
+	# Pawns push forward on empty squares and capture diagonally. The pushes of all the pawns are
+	# computed at once by shifting their bitboard
+	pawns = pieces[base + PAWN]
+	if color == COLOR_WHITE:
+		step = -8
+		singlePushes = (pawns >> 8) & empty
+		doublePushes = ((singlePushes & (RANK_1 >> 16)) >> 8) & empty
+	else:
+		step = 8
+		singlePushes = (pawns << 8) & empty
+		doublePushes = (((singlePushes & (RANK_8 << 16)) << 8) & empty) & FULL_BOARD
+
+	for toSq in squares(singlePushes):
+		moves.append(MOVES[toSq - step][toSq])
+	for toSq in squares(doublePushes):
+		moves.append(MOVES[toSq - 2 * step][toSq])
+	for fromSq in squares(pawns):
+		for toSq in squares(PAWN_ATTACKS[color][fromSq] & enemies):
+			moves.append(MOVES[fromSq][toSq])
+
+	# Then the other pieces move to the squares they attack, except the ones of their own color
+	for fromSq in squares(pieces[base + KNIGHT]):
+		for toSq in squares(KNIGHT_ATTACKS[fromSq] & notOwn):
+			moves.append(MOVES[fromSq][toSq])
+	for fromSq in squares(pieces[base + BISHOP]):
+		for toSq in squares(BISHOP_TABLES[fromSq][occupied & BISHOP_MASKS[fromSq]] & notOwn):
+			moves.append(MOVES[fromSq][toSq])
+	for fromSq in squares(pieces[base + ROOK]):
+		for toSq in squares(ROOK_TABLES[fromSq][occupied & ROOK_MASKS[fromSq]] & notOwn):
+			moves.append(MOVES[fromSq][toSq])
+	for fromSq in squares(pieces[base + QUEEN]):
+		for toSq in squares(queenAttacks(fromSq, occupied) & notOwn):
+			moves.append(MOVES[fromSq][toSq])
+	for fromSq in squares(pieces[base + KING]):
+		for toSq in squares(KING_ATTACKS[fromSq] & notOwn):
+			moves.append(MOVES[fromSq][toSq])
+
+	return moves
+
+
+def moveToUci(move):
+	"""
+	Return the name of a move in the UCI notation, like 'e2e4' or 'e7e8q'
+	@param move: the packed move
+	@type move: int
+	@return: the name of the move
+	@rtype: str
+	"""
+
+	name = squareName(move & 63) + squareName(move >> 6 & 63)
+
+	promotion = movePromotion(move)
+	if promotion is not None:
+		name += PIECE_LETTERS[6 + promotion]
+
+	return name
+
+
+def moveFromUci(position, name):
+	"""
+	Find the legal move of the side to move written in the UCI notation
+	@param position: the position
+	@type position: Position
+	@param name: the name of the move, like 'e2e4' or 'e7e8q'
+	@type name: str
+	@return: the packed move (or None if the move isn't legal)
+	@rtype: int
+	"""
+
+	for move in legalMoves(position, position.sideToMove):
+		if moveToUci(move) == name:
+			return move
+
+	return None
+
+
+def _addPawnMoves(moves, count, fromSq, targets, color):
+	"""
+	Write the moves of a pawn in a move buffer, with the four promotions for each move to the last row
+	@param moves: the move buffer
+	@type moves: List
+	@param count: the number of moves already in the buffer
+	@type count: int
+	@param fromSq: the square of the pawn
+	@type fromSq: int
+	@param targets: the destination squares of the pawn
+	@type targets: int
+	@param color: the color of the pawn
+	@type color: int
+	@return: the number of moves in the buffer
+	@rtype: int
+	"""
+
+	lastRow = RANK_8 if color == COLOR_WHITE else RANK_1
+	fromMoves = MOVES[fromSq]
+
+	for toSq in squares(targets):
+		if SQUARE_BITS[toSq] & lastRow:
+			for promotion in PROMOTION_TYPES:
+				moves[count] = encodeMove(fromSq, toSq, MOVE_PROMOTION, promotion)
+				count += 1
+		else:
+			moves[count] = fromMoves[toSq]
+			count += 1
+
+	return count
+
+
+def generateLegalMoves(position, color, moves, stage=GENERATE_ALL):
+	"""
+	Write the legal moves of the pieces of a color in a move buffer. The buffer is allocated once by the
+	caller (the search keeps one for each ply), so generating the moves doesn't create any list. The
+	checkers and the pinned pieces are found once, then each piece only generates the moves that keep its
+	king safe :
+		- in double check, only the king can move
+		- in check, the other pieces must capture the checker or block the check
+		- a pinned piece can only move along the line between its king and the pinner
+		- the king cannot go to an attacked square
+	@param position: the position
+	@type position: Position
+	@param color: COLOR_WHITE or COLOR_BLACK
+	@type color: int
+	@param moves: the move buffer, a list of at least MAX_MOVES items
+	@type moves: List
+	@param stage: GENERATE_ALL, GENERATE_NOISY or GENERATE_QUIET
+	@type stage: int
+	@return: the number of moves written at the start of the buffer
+	@rtype: int
+	"""
+
+	count = 0
+	enemy = color ^ 1
+	pieces = position.pieces
+	occupied = position.occupied
+	own = position.colors[color]
+	enemies = position.colors[enemy]
+	notOwn = ~own & FULL_BOARD
+	base = color * 6
+	enemyBase = enemy * 6
+
+	# The destination squares of the stage : the enemy pieces for the noisy moves, the empty squares for
+	# the quiet moves. The pawns also promote on an empty square of the last row with a noisy move
+	lastRow = RANK_8 if color == COLOR_WHITE else RANK_1
+	if stage == GENERATE_NOISY:
+		notOwn &= enemies
+		pawnStageTargets = enemies | lastRow
+	elif stage == GENERATE_QUIET:
+		notOwn &= ~enemies
+		pawnStageTargets = ~(enemies | lastRow) & FULL_BOARD
+	else:
+		pawnStageTargets = FULL_BOARD
+
+	kingSq = position.kingSquare(color)
+	checkers = attackersOf(position, kingSq, enemy, occupied)
+
+	# The king cannot go to an attacked square, even one hidden by the king himself from a sliding piece
+	occupiedWithoutKing = occupied ^ SQUARE_BITS[kingSq]
+	fromMoves = MOVES[kingSq]
+	for toSq in squares(KING_ATTACKS[kingSq] & notOwn):
+		if not attackersOf(position, toSq, enemy, occupiedWithoutKing):
+			moves[count] = fromMoves[toSq]
+			count += 1
+
+	# In double check, only the king can move
+	if checkers & (checkers - 1):
+		return count
+
+	# In check, the other pieces must capture the checker or go between the checker and the king
+	if checkers:
+		checkerSq = checkers.bit_length() - 1
+		checkTargets = checkers | BETWEEN[kingSq][checkerSq]
+	else:
+		checkTargets = FULL_BOARD
+	targets = checkTargets & notOwn
+
+	# Find the pinned pieces : the only piece of their color between the king and an enemy sliding piece
+	pinLines = {}
+	enemyQueens = pieces[enemyBase + QUEEN]
+	snipers = (ROOK_TABLES[kingSq][0] & (pieces[enemyBase + ROOK] | enemyQueens)) \
+		| (BISHOP_TABLES[kingSq][0] & (pieces[enemyBase + BISHOP] | enemyQueens))
+	for sniperSq in squares(snipers):
+		blockers = BETWEEN[kingSq][sniperSq] & occupied
+
+		if blockers and not blockers & (blockers - 1) and blockers & own:
+			pinLines[blockers.bit_length() - 1] = BETWEEN[kingSq][sniperSq] | SQUARE_BITS[sniperSq]
+
+	# Pawns
+	empty = ~occupied & FULL_BOARD
+	step = -8 if color == COLOR_WHITE else 8
+	startRow = RANK_1 >> 8 if color == COLOR_WHITE else RANK_8 << 8
+	for fromSq in squares(pieces[base + PAWN]):
+		pawnTargets = PAWN_ATTACKS[color][fromSq] & enemies
+
+		if SQUARE_BITS[fromSq + step] & empty:
+			pawnTargets |= SQUARE_BITS[fromSq + step]
+
+			if SQUARE_BITS[fromSq] & startRow and SQUARE_BITS[fromSq + 2 * step] & empty:
+				pawnTargets |= SQUARE_BITS[fromSq + 2 * step]
+
+		pawnTargets &= checkTargets & pawnStageTargets
+		if fromSq in pinLines:
+			pawnTargets &= pinLines[fromSq]
+
+		count = _addPawnMoves(moves, count, fromSq, pawnTargets, color)
+
+	# En passant is only possible for the side to move. The captured pawn and the capturing pawn both
+	# leave their squares, which can uncover the king, so the move is tested on the resulting occupancy
+	epSquare = position.epSquare
+	if epSquare is not None and color == position.sideToMove and stage != GENERATE_QUIET:
+		capturedSquare = epSquare - step
+		for fromSq in squares(PAWN_ATTACKS[enemy][epSquare] & pieces[base + PAWN]):
+			occupiedAfter = (occupied ^ SQUARE_BITS[fromSq] ^ SQUARE_BITS[capturedSquare]) | SQUARE_BITS[epSquare]
+
+			if not attackersOf(position, kingSq, enemy, occupiedAfter) & ~SQUARE_BITS[capturedSquare]:
+				moves[count] = MOVES[fromSq][epSquare] | MOVE_EN_PASSANT
+				count += 1
+
+	# Knights (a pinned knight can never move), bishops, rooks and queens
+	for fromSq in squares(pieces[base + KNIGHT]):
+		if fromSq not in pinLines:
+			fromMoves = MOVES[fromSq]
+			for toSq in squares(KNIGHT_ATTACKS[fromSq] & targets):
+				moves[count] = fromMoves[toSq]
+				count += 1
+
+	bishops = pieces[base + BISHOP] | pieces[base + QUEEN]
+	for fromSq in squares(bishops):
+		pieceTargets = BISHOP_TABLES[fromSq][occupied & BISHOP_MASKS[fromSq]] & targets
+		if fromSq in pinLines:
+			pieceTargets &= pinLines[fromSq]
+
+		fromMoves = MOVES[fromSq]
+		for toSq in squares(pieceTargets):
+			moves[count] = fromMoves[toSq]
+			count += 1
+
+	rooks = pieces[base + ROOK] | pieces[base + QUEEN]
+	for fromSq in squares(rooks):
+		pieceTargets = ROOK_TABLES[fromSq][occupied & ROOK_MASKS[fromSq]] & targets
+		if fromSq in pinLines:
+			pieceTargets &= pinLines[fromSq]
+
+		fromMoves = MOVES[fromSq]
+		for toSq in squares(pieceTargets):
+			moves[count] = fromMoves[toSq]
+			count += 1
+
+	# Castling : the king cannot castle out of check, or through or into an attacked square
+	if not checkers and position.castling and stage != GENERATE_NOISY:
+		for right, castlingColor, kingFrom, kingTo, emptySquares, safeSquares in CASTLINGS:
+			if castlingColor == color and position.castling & right and not occupied & emptySquares:
+				for safeSq in safeSquares:
+					if attackersOf(position, safeSq, enemy, occupied):
+						break
+				else:
+					moves[count] = MOVES[kingFrom][kingTo] | MOVE_CASTLING
+					count += 1
+
+	return count
+
+
+def legalMoves(position, color):
+	"""
+	Return the legal moves of the pieces of a color, in a new list. Used outside the search, where
+	allocating a list doesn't matter (see generateLegalMoves())
+	@param position: the position
+	@type position: Position
+	@param color: COLOR_WHITE or COLOR_BLACK
+	@type color: int
+	@return: the list of the packed moves
+	@rtype: List
+	"""
+
+	moves = [0] * MAX_MOVES
+	count = generateLegalMoves(position, color, moves)
+
+	return moves[:count]
+
+
+def isLegalMove(position, move):
+	"""
+	Return if a move is legal for the side to move, without generating all the moves. Used by the search
+	to check the moves it remembers from other positions (the best move of the transposition table, the
+	killer moves) before playing them
+	@param position: the position
+	@type position: Position
+	@param move: the packed move
+	@type move: int
+	@return: if the move is legal
+	@rtype: bool
+	"""
+
+	fromSq = move & 63
+	toSq = move >> 6 & 63
+	color = position.sideToMove
+	code = position.squares[fromSq]
+
+	if move == NO_MOVE or code is None or code // 6 != color or SQUARE_BITS[toSq] & position.colors[color]:
+		return False
+
+	# The special moves are rare, they are found in all the legal moves
+	if move & MOVE_KIND_MASK != MOVE_NORMAL:
+		return move in legalMoves(position, color)
+
+	if code % 6 == PAWN:
+		step = -8 if color == COLOR_WHITE else 8
+		startRow = RANK_1 >> 8 if color == COLOR_WHITE else RANK_8 << 8
+
+		# A pawn going to the last row must be promoted
+		if SQUARE_BITS[toSq] & (RANK_8 | RANK_1):
+			return False
+
+		if toSq == fromSq + step:
+			if position.squares[toSq] is not None:
+				return False
+		elif toSq == fromSq + 2 * step:
+			if not SQUARE_BITS[fromSq] & startRow or position.squares[fromSq + step] is not None \
+					or position.squares[toSq] is not None:
+				return False
+		elif not PAWN_ATTACKS[color][fromSq] & position.colors[color ^ 1] & SQUARE_BITS[toSq]:
+			return False
+	elif not attacksFrom(position, fromSq) & SQUARE_BITS[toSq]:
+		return False
+
+	# The move must not leave the king in check
+	position.makeMove(move)
+	legal = not isSquareAttacked(position, position.kingSquare(color), color ^ 1)
+	position.unmakeMove()
+
+	return legal
+
+
+def findMove(position, fromSq, toSq, promotion=QUEEN):
+	"""
+	Find the legal move of the side to move between two squares
+	@param position: the position
+	@type position: Position
+	@param fromSq: the start square
+	@type fromSq: int
+	@param toSq: the destination square
+	@type toSq: int
+	@param promotion: the type of the promotion piece, if the move is a promotion
+	@type promotion: int
+	@return: the packed move (or None if the move isn't legal)
+	@rtype: int
+	"""
+
+	for move in legalMoves(position, position.sideToMove):
+		if move & 63 == fromSq and move >> 6 & 63 == toSq and movePromotion(move) in (None, promotion):
+			return move
+
+	return None
+
+
+if __name__ == '__main__':
+	# Report the time taken to get the tables, compared to the startup budget
+	source = 'loaded from ' + TABLES_CACHE_PATH if TABLES_FROM_CACHE else 'built (no valid cache file)'
+	print(f'Sliding tables {source} in {TABLES_LOAD_TIME * 1000:.1f} ms (budget: {STARTUP_BUDGET * 1000:.0f} ms)')
+
+	if TABLES_FROM_CACHE and TABLES_LOAD_TIME > STARTUP_BUDGET:
+		print('The startup budget is exceeded')
+		raise SystemExit(1)
@@ -0,0 +1,98 @@
+"""
+The pawn structure cache of the evaluation : the score of the pawn structure and the passed pawns of the
+positions already evaluated, found by the pawn hash of the position (the Zobrist hash of its pawns
+alone, see bitboard.Position.pawnHash)
+
+The pawns move much less often than the other pieces, so most positions of a search have a pawn
+structure already evaluated. The table has a fixed number of entries, stored in three arrays (the pawn
+hashes, the packed scores and the bitboards of the passed pawns), and a new entry always replaces the
+old one. The table of a process is only used by one search at a time
+"""
+
+from array import array
+
+# The number of entries, a power of two. Each entry takes 24 bytes
+DEFAULT_ENTRIES = 1 << 14
+
+
+class PawnHashTable:
+	"""
+	A fixed size hash table of pawn structures, with statistics about its use
+	"""
+
+	def __init__(self, entryCount=DEFAULT_ENTRIES):
+		"""
+		@param entryCount: the number of entries (rounded down to a power of two)
+		@type entryCount: int
+		"""
+
+		self.entryCount = 1 << max(0, entryCount.bit_length() - 1)
+		self.mask = self.entryCount - 1
+
+		self.clear()
+
+	def __repr__(self):
+		"""Used for debugging"""
+		return f'pawn hash table {self.entryCount} entries : {self.probes} probes, hit rate {self.hitRate() * 100:.1f}%'
+
+	def clear(self):
+		"""
+		Empty the table and reset its statistics
+		@return: None
+		@rtype: None
+		"""
+
+		# The empty entries have the pawn hash 0, the hash of the positions without pawns, whose score and
+		# passed pawns are 0 too
+		self.keys = array('Q', [0]) * self.entryCount
+		self.scores = array('q', [0]) * self.entryCount
+		self.passedPawns = array('Q', [0]) * self.entryCount
+
+		self.probes = 0
+		self.hits = 0
+
+	def probe(self, pawnHash):
+		"""
+		Find the pawn structure of a position
+		@param pawnHash: the pawn hash of the position
+		@type pawnHash: int
+		@return: the (packed score, passed pawns) of the entry, or None if the pawn structure isn't stored
+		@rtype: tuple
+		"""
+
+		self.probes += 1
+		index = pawnHash & self.mask
+
+		if self.keys[index] == pawnHash:
+			self.hits += 1
+			return self.scores[index], self.passedPawns[index]
+
+		return None
+
+	def store(self, pawnHash, packedScore, passedPawns):
+		"""
+		Store the evaluation of a pawn structure
+		@param pawnHash: the pawn hash of the position
+		@type pawnHash: int
+		@param packedScore: the packed score of the pawn structure (see piece_square)
+		@type packedScore: int
+		@param passedPawns: the bitboard of the passed pawns of both colors
+		@type passedPawns: int
+		@return: None
+		@rtype: None
+		"""
+
+		index = pawnHash & self.mask
+
+		self.keys[index] = pawnHash
+		self.scores[index] = packedScore
+		self.passedPawns[index] = passedPawns
+
+	def hitRate(self):
+		"""
+		Return the part of the probes that found their pawn structure
+		@return: the hit rate (between 0 and 1)
+		@rtype: float
+		"""
+
+		return self.hits / self.probes if self.probes else 0
@@ -0,0 +1,177 @@
+"""
+Perft : count the leaf nodes of the tree of legal moves to a given depth
+
+The counts of the standard test positions are known, so perft checks the move generator (castling, en
+passant, promotions, pins and checks), and the nodes per second measure its speed. Run :
+	python perft.py --depth 4                       perft of the initial position
+	python perft.py --fen "<fen>" --depth 3 --divide  perft of a position, detailed by root move
+	python perft.py --suite                         check the known counts of the test positions
+"""
+
+import argparse
+import sys
+import time
+
+from bitboard import Position, START_FEN, MAX_MOVES
+from movegen import generateLegalMoves, legalMoves, moveToUci
+
+# The standard test positions, with their known perft counts from depth 1
+PERFT_POSITIONS = (
+	('initial position', START_FEN,
+	 (20, 400, 8902, 197281, 4865609, 119060324)),
+	('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+	 (48, 2039, 97862, 4085603, 193690690)),
+	('position 3', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+	 (14, 191, 2812, 43238, 674624, 11030083)),
+	('position 4', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+	 (6, 264, 9467, 422333, 15833292)),
+	('position 5', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+	 (44, 1486, 62379, 2103487, 89941194)),
+	('position 6', 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+	 (46, 2079, 89890, 3894594, 164075551))
+)
+
+
+def perft(position, depth, buffers=None):
+	"""
+	Count the leaf nodes of the tree of legal moves of a position
+	@param position: the position
+	@type position: Position
+	@param depth: the depth of the tree
+	@type depth: int
+	@param buffers: the move buffers, one for each remaining depth (or None to allocate them)
+	@type buffers: List
+	@return: the number of leaf nodes
+	@rtype: int
+	"""
+
+	if depth <= 0:
+		return 1
+
+	if buffers is None:
+		buffers = [[0] * MAX_MOVES for _ in range(depth + 1)]
+
+	moves = buffers[depth]
+	count = generateLegalMoves(position, position.sideToMove, moves)
+
+	# The moves of the last level don't need to be played, only counted
+	if depth == 1:
+		return count
+
+	nodes = 0
+	for index in range(count):
+		position.makeMove(moves[index])
+		nodes += perft(position, depth - 1, buffers)
+		position.unmakeMove()
+
+	return nodes
+
+
+def divide(position, depth):
+	"""
+	Count the leaf nodes of the tree of legal moves of a position, for each root move. Used to find
+	which move has a wrong count
+	@param position: the position
+	@type position: Position
+	@param depth: the depth of the tree (at least 1)
+	@type depth: int
+	@return: a list of (move, number of leaf nodes) tuples
+	@rtype: List
+	"""
+
+	counts = []
+
+	for move in legalMoves(position, position.sideToMove):
+		position.makeMove(move)
+		counts.append((move, perft(position, depth - 1)))
+		position.unmakeMove()
+
+	return counts
+
+
+def runPerft(position, depth, showDivide=False):
+	"""
+	Run a perft and print the number of nodes, the time and the nodes per second
+	@param position: the position
+	@type position: Position
+	@param depth: the depth of the tree
+	@type depth: int
+	@param showDivide: if the count of each root move must be printed
+	@type showDivide: bool
+	@return: the number of leaf nodes
+	@rtype: int
+	"""
+
+	startTime = time.perf_counter()
+
+	if showDivide and depth >= 1:
+		counts = divide(position, depth)
+		for move, nodes in sorted(counts, key=lambda count: moveToUci(count[0])):
+			print(f'{moveToUci(move)}: {nodes}')
+
+		nodes = sum(count[1] for count in counts)
+		print()
+	else:
+		nodes = perft(position, depth)
+
+	elapsedTime = time.perf_counter() - startTime
+	nodesPerSecond = nodes / elapsedTime if elapsedTime > 0 else 0
+
+	print(f'depth {depth} nodes {nodes} time {elapsedTime:.3f}s nps {nodesPerSecond:.0f}')
+
+	return nodes
+
+
+def runSuite(maxNodes):
+	"""
+	Check the perft counts of the standard test positions, at every depth whose count is below a limit
+	@param maxNodes: the biggest count checked
+	@type maxNodes: int
+	@return: if all the counts are right
+	@rtype: bool
+	"""
+
+	success = True
+	totalNodes = 0
+	startTime = time.perf_counter()
+
+	for name, fen, counts in PERFT_POSITIONS:
+		position = Position.fromFen(fen)
+
+		for depth, expectedNodes in enumerate(counts, 1):
+			if expectedNodes > maxNodes:
+				break
+
+			nodes = perft(position, depth)
+			totalNodes += nodes
+
+			if nodes == expectedNodes:
+				print(f'{name} depth {depth} : {nodes} ok')
+			else:
+				print(f'{name} depth {depth} : {nodes} instead of {expectedNodes}')
+				success = False
+
+	elapsedTime = time.perf_counter() - startTime
+	print(f'{totalNodes} nodes in {elapsedTime:.3f}s, nps {totalNodes / elapsedTime:.0f}')
+
+	return success
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Count the leaf nodes of the tree of legal moves')
+	parser.add_argument('--fen', default=START_FEN, help='the position (initial position by default)')
+	parser.add_argument('--depth', type=int, default=4, help='the depth of the tree')
+	parser.add_argument('--divide', action='store_true', help='print the count of each root move')
+	parser.add_argument('--suite', action='store_true', help='check the known counts of the test positions')
+	parser.add_argument('--max-nodes', type=int, default=1000000, help='the biggest count checked by --suite')
+	arguments = parser.parse_args()
+
+	if arguments.suite:
+		if not runSuite(arguments.max_nodes):
+			sys.exit(1)
+	else:
+		runPerft(Position.fromFen(arguments.fen), arguments.depth, arguments.divide)
+
+
+if __name__ == '__main__':
+	main()
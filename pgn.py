@@ -0,0 +1,395 @@
+"""
+PGN : read and write games in the Portable Game Notation
+
+The reader is a generator : the games are parsed one at a time while the file is read line by line, so
+the memory used doesn't depend on the size of the file, and huge game databases can be streamed to the
+analysis. The file can also be read through mmap, which avoids copying it in the buffers of the file
+object. Run :
+	python pgn.py games.pgn          count the games and the moves of a file, checking every move
+	python pgn.py games.pgn --mmap   the same, reading the file through mmap
+
+The moves are written in the Standard Algebraic Notation (SAN, like 'Nf3', 'exd5' or 'e8=Q+'), and a SAN
+move is found among the legal moves of the position, so a move that is not legal is refused
+"""
+
+import argparse
+import mmap
+import os
+import re
+import time
+
+from bitboard import Position, START_FEN, COLOR_BLACK, PAWN, PIECE_LETTERS, MOVE_CASTLING, \
+	MOVE_KIND_MASK, squareName, squareFromName, movePromotion
+from movegen import legalMoves, isSquareAttacked
+
+# A tag pair, like [Event "Casual game"]
+TAG_PATTERN = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+
+# The tokens of the movetext : the comments, the variations, the NAGs, the move numbers and the moves
+TOKEN_PATTERN = re.compile(r'\{[^}]*\}?|;[^\n]*|\(|\)|\$\d+|\d+\.+|[^\s(){};$]+')
+
+# A SAN move (without the check suffix) : the piece, the start file and rank, the destination square and
+# the promotion piece
+SAN_PATTERN = re.compile(r'([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?')
+
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+
+# The Seven Tag Roster, the tags every PGN game has, in their order
+SEVEN_TAG_ROSTER = (('Event', '?'), ('Site', '?'), ('Date', '????.??.??'), ('Round', '?'), ('White', '?'),
+	('Black', '?'), ('Result', '*'))
+
+# The maximal length of the movetext lines written
+LINE_LENGTH = 80
+
+
+class PgnGame:
+	"""
+	A game read from a PGN file :
+		- the tags (Event, White, FEN, ...)
+		- the moves, in the Standard Algebraic Notation
+		- the result ('1-0', '0-1', '1/2-1/2' or '*')
+	"""
+
+	def __init__(self, headers, moves, result):
+		self.headers = headers
+		self.moves = moves
+		self.result = result
+
+	def __repr__(self):
+		"""Used for debugging"""
+		return f'{self.headers.get("White", "?")} - {self.headers.get("Black", "?")} {self.result}, ' \
+			f'{len(self.moves)} moves'
+
+	def startFen(self):
+		"""
+		Return the FEN string of the initial position of the game
+		@return: the FEN string
+		@rtype: str
+		"""
+
+		return self.headers.get('FEN', START_FEN)
+
+	def replay(self):
+		"""
+		Play the moves of the game from its initial position. The position yielded is always the same
+		object, the move is played on it after the yield
+		@return: a generator of (position, move) tuples, the position before each move and the packed move
+		@rtype: generator
+		"""
+
+		position = Position.fromFen(self.startFen())
+
+		for san in self.moves:
+			move = sanToMove(position, san)
+			yield position, move
+			position.makeMove(move)
+
+	def packedMoves(self):
+		"""
+		Return the moves of the game as packed moves, checking that they are legal
+		@return: the list of the packed moves
+		@rtype: List
+		"""
+
+		return [move for _, move in self.replay()]
+
+
+def moveToSan(position, move):
+	"""
+	Return the name of a legal move in the Standard Algebraic Notation, like 'Nbd7', 'exd5' or 'O-O+'
+	@param position: the position before the move (it is unchanged after the call)
+	@type position: Position
+	@param move: the packed move
+	@type move: int
+	@return: the name of the move
+	@rtype: str
+	"""
+
+	fromSq = move & 63
+	toSq = move >> 6 & 63
+	pieceType = position.squares[fromSq] % 6
+
+	if move & MOVE_KIND_MASK == MOVE_CASTLING:
+		name = 'O-O' if toSq & 7 == 6 else 'O-O-O'
+	elif pieceType == PAWN:
+		name = ''
+		if fromSq & 7 != toSq & 7:
+			name = squareName(fromSq)[0] + 'x'
+		name += squareName(toSq)
+
+		promotion = movePromotion(move)
+		if promotion is not None:
+			name += '=' + PIECE_LETTERS[promotion]
+	else:
+		name = PIECE_LETTERS[pieceType]
+
+		# Add the start file, or the start rank, or both, when another piece of the same type can go to
+		# the same square
+		others = [other & 63 for other in legalMoves(position, position.sideToMove)
+			if other >> 6 & 63 == toSq and other & 63 != fromSq and position.squares[other & 63] % 6 == pieceType]
+		if others:
+			fromName = squareName(fromSq)
+			if all(other & 7 != fromSq & 7 for other in others):
+				name += fromName[0]
+			elif all(other >> 3 != fromSq >> 3 for other in others):
+				name += fromName[1]
+			else:
+				name += fromName
+
+		if position.squares[toSq] is not None:
+			name += 'x'
+		name += squareName(toSq)
+
+	# Add the check or the checkmate
+	position.makeMove(move)
+	color = position.sideToMove
+	if isSquareAttacked(position, position.kingSquare(color), color ^ 1):
+		name += '+' if legalMoves(position, color) else '#'
+	position.unmakeMove()
+
+	return name
+
+
+def sanToMove(position, san):
+	"""
+	Find the legal move of the side to move written in the Standard Algebraic Notation
+	@param position: the position
+	@type position: Position
+	@param san: the name of the move, like 'Nf3', 'exd5', 'e8=Q+' or 'O-O'
+	@type san: str
+	@return: the packed move
+	@rtype: int
+	"""
+
+	name = san.rstrip('+#!?')
+	moves = legalMoves(position, position.sideToMove)
+
+	# Castling (also written with zeros)
+	if name in ('O-O', 'O-O-O', '0-0', '0-0-0'):
+		kingFile = 6 if len(name) == 3 else 2
+		for move in moves:
+			if move & MOVE_KIND_MASK == MOVE_CASTLING and move >> 6 & 7 == kingFile:
+				return move
+
+		raise ValueError(f'Illegal move {san} in {position.toFen()}')
+
+	match = SAN_PATTERN.fullmatch(name)
+	if match is None:
+		raise ValueError(f'Invalid SAN move {san}')
+
+	pieceLetter, fromFile, fromRank, toName, promotionLetter = match.groups()
+	pieceType = PIECE_LETTERS.index(pieceLetter) if pieceLetter else PAWN
+	promotion = PIECE_LETTERS.index(promotionLetter) if promotionLetter else None
+	toSq = squareFromName(toName)
+	fromX = 'abcdefgh'.index(fromFile) if fromFile else None
+	fromY = 8 - int(fromRank) if fromRank else None
+
+	found = []
+	for move in moves:
+		fromSq = move & 63
+
+		if move >> 6 & 63 == toSq and position.squares[fromSq] % 6 == pieceType and movePromotion(move) == promotion \
+				and move & MOVE_KIND_MASK != MOVE_CASTLING and (fromX is None or fromSq & 7 == fromX) \
+				and (fromY is None or fromSq >> 3 == fromY):
+			found.append(move)
+
+	if len(found) != 1:
+		problem = 'Illegal' if not found else 'Ambiguous'
+		raise ValueError(f'{problem} move {san} in {position.toFen()}')
+
+	return found[0]
+
+
+def _readLines(source, useMmap=False):
+	"""
+	Read the lines of a PGN file one at a time
+	@param source: the path of the file, or a text file object
+	@type source: str
+	@param useMmap: if the file must be read through mmap (only for a path)
+	@type useMmap: bool
+	@return: a generator of the lines
+	@rtype: generator
+	"""
+
+	if not isinstance(source, str):
+		yield from source
+		return
+
+	if not useMmap:
+		with open(source, encoding='utf-8', errors='replace') as file:
+			yield from file
+		return
+
+	# An empty file cannot be mapped
+	if os.path.getsize(source) == 0:
+		return
+
+	with open(source, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+		for line in iter(mapped.readline, b''):
+			yield line.decode('utf-8', errors='replace')
+
+
+def _parseMovetext(movetext):
+	"""
+	Extract the moves and the result of the movetext of a game. The comments, the NAGs and the variations
+	are skipped
+	@param movetext: the movetext
+	@type movetext: str
+	@return: the list of the SAN moves and the result
+	@rtype: tuple
+	"""
+
+	moves = []
+	result = '*'
+	variationDepth = 0
+
+	for token in TOKEN_PATTERN.findall(movetext):
+		first = token[0]
+
+		if first == '(':
+			variationDepth += 1
+		elif first == ')':
+			variationDepth = max(0, variationDepth - 1)
+		elif variationDepth or first in '{;$' or first.isdigit() and token[-1] == '.':
+			continue
+		elif token in RESULTS:
+			result = token
+		else:
+			moves.append(token)
+
+	return moves, result
+
+
+def readGames(source, useMmap=False):
+	"""
+	Read the games of a PGN file one at a time. Only the game being read is kept in memory
+	@param source: the path of the file, or a text file object
+	@type source: str
+	@param useMmap: if the file must be read through mmap (only for a path)
+	@type useMmap: bool
+	@return: a generator of the games
+	@rtype: generator
+	"""
+
+	headers = {}
+	movetext = []
+	inComment = False
+
+	for line in _readLines(source, useMmap):
+		stripped = line.strip()
+
+		# Lines starting with % are escaped
+		if not stripped or stripped[0] == '%':
+			continue
+
+		# A line starting with [ inside a comment is not a tag
+		if stripped[0] == '[' and not inComment:
+			# A tag after the movetext starts the next game
+			if movetext:
+				moves, result = _parseMovetext('\n'.join(movetext))
+				yield PgnGame(headers, moves, result)
+				headers = {}
+				movetext = []
+
+			tag = TAG_PATTERN.match(stripped)
+			if tag is not None:
+				headers[tag.group(1)] = tag.group(2).replace('\\"', '"').replace('\\\\', '\\')
+		else:
+			movetext.append(stripped)
+
+			# Find if the line leaves a comment open, the next lines are then in the comment
+			if stripped.rfind('{') > stripped.rfind('}'):
+				inComment = True
+			elif '}' in stripped:
+				inComment = False
+
+			# A result ends the game
+			if not inComment and stripped.rsplit(None, 1)[-1] in RESULTS:
+				moves, result = _parseMovetext('\n'.join(movetext))
+				yield PgnGame(headers, moves, result)
+				headers = {}
+				movetext = []
+
+	if headers or movetext:
+		moves, result = _parseMovetext('\n'.join(movetext))
+		yield PgnGame(headers, moves, result)
+
+
+def gameToPgn(moves, headers=None, startFen=START_FEN):
+	"""
+	Write a game in the PGN format
+	@param moves: the packed moves of the game
+	@type moves: List
+	@param headers: the tags of the game (the missing tags of the Seven Tag Roster get their default value)
+	@type headers: dict
+	@param startFen: the FEN string of the initial position of the game
+	@type startFen: str
+	@return: the PGN text of the game
+	@rtype: str
+	"""
+
+	headers = dict(headers or {})
+	for name, default in SEVEN_TAG_ROSTER:
+		headers.setdefault(name, default)
+
+	if startFen != START_FEN:
+		headers['SetUp'] = '1'
+		headers['FEN'] = startFen
+
+	# The Seven Tag Roster first, then the other tags
+	names = [name for name, _ in SEVEN_TAG_ROSTER] + [name for name in headers if name not in dict(SEVEN_TAG_ROSTER)]
+	lines = [f'[{name} "{headers[name]}"]' for name in names]
+	lines.append('')
+
+	# The movetext, with a move number before each white move (and before the first move if black starts)
+	position = Position.fromFen(startFen)
+	tokens = []
+	for move in moves:
+		if position.sideToMove != COLOR_BLACK:
+			tokens.append(f'{position.fullmoveNumber}.')
+		elif not tokens:
+			tokens.append(f'{position.fullmoveNumber}...')
+
+		tokens.append(moveToSan(position, move))
+		position.makeMove(move)
+	tokens.append(headers['Result'])
+
+	line = ''
+	for token in tokens:
+		if line and len(line) + 1 + len(token) > LINE_LENGTH:
+			lines.append(line)
+			line = token
+		else:
+			line = f'{line} {token}' if line else token
+	lines.append(line)
+
+	return '\n'.join(lines) + '\n'
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Read the games of a PGN file and check their moves')
+	parser.add_argument('path', help='the PGN file')
+	parser.add_argument('--mmap', action='store_true', help='read the file through mmap')
+	arguments = parser.parse_args()
+
+	games = 0
+	plies = 0
+	errors = 0
+	startTime = time.perf_counter()
+
+	for game in readGames(arguments.path, arguments.mmap):
+		games += 1
+
+		try:
+			plies += len(game.packedMoves())
+		except ValueError as error:
+			errors += 1
+			print(f'game {games} ({game}) : {error}')
+
+	elapsedTime = time.perf_counter() - startTime
+	print(f'{games} games, {plies} moves, {errors} errors in {elapsedTime:.2f}s '
+		f'({games / elapsedTime if elapsedTime > 0 else 0:.0f} games/s)')
+
+
+if __name__ == '__main__':
+	main()
@@ -284,13 +284,5 @@ class Queen(Piece):
 		return 'Queen'
 
 	def getPossiblesMoves(self, chessBoard):
-		rookPlaceholder = Rook(self.x, self.y, self.color)
-		bishopPlaceholder = Bishop(self.x, self.y, self.color)
-
-		firstPossiblesMoves = rookPlaceholder.getPossiblesMoves(chessBoard)
-		secondPossiblesMoves = bishopPlaceholder.getPossiblesMoves(chessBoard)
-
-		del rookPlaceholder
-		del bishopPlaceholder
-
-		return firstPossiblesMoves + secondPossiblesMoves
+		# The queen moves like a rook and a bishop, so use their methods directly on the queen
+		return Rook.getPossiblesMoves(self, chessBoard) + Bishop.getPossiblesMoves(self, chessBoard)
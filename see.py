@@ -0,0 +1,87 @@
+"""
+Static exchange evaluation (SEE) : the material won or lost by a capture once all the captures on its
+square are played, the least valuable attacker capturing first each time. The moves are not played :
+the pieces which captured are only removed from the occupancy, and the attackers of the square are
+found again with this occupancy, so the sliding pieces behind them (x-rays) join the exchange. Each
+player can stop capturing when it would lose material
+
+The pinned pieces are used like the others, and the king captures last : a capture by the king is
+answered by the capture of the king if the square is still attacked, which ends the exchange
+"""
+
+from bitboard import COLOR_WHITE, PAWN, KNIGHT, KING, SQUARE_BITS, MOVE_KIND_MASK, MOVE_PROMOTION, \
+	MOVE_EN_PASSANT, MOVE_CASTLING
+from movegen import attackersOf
+
+# The value of each piece type in an exchange, in centipawns
+SEE_VALUES = (100, 320, 330, 500, 900, 20000)
+
+
+def see(position, move):
+	"""
+	Return the material won by a move once the exchange on its destination square is resolved
+	@param position: the position
+	@type position: Position
+	@param move: the packed move
+	@type move: int
+	@return: the material won by the side to move (negative when it loses material), in centipawns
+	@rtype: int
+	"""
+
+	kind = move & MOVE_KIND_MASK
+	if kind == MOVE_CASTLING:
+		return 0
+
+	fromSq = move & 63
+	toSq = move >> 6 & 63
+	squares = position.squares
+	pieces = position.pieces
+	colors = position.colors
+
+	code = squares[fromSq]
+	color = code // 6
+	occupied = position.occupied ^ SQUARE_BITS[fromSq]
+
+	if kind == MOVE_EN_PASSANT:
+		capturedSq = toSq + 8 if color == COLOR_WHITE else toSq - 8
+		occupied ^= SQUARE_BITS[capturedSq]
+		gains = [SEE_VALUES[PAWN]]
+	else:
+		captured = squares[toSq]
+		gains = [SEE_VALUES[captured % 6] if captured is not None else 0]
+
+	# The value of the piece standing on the square, which the next capture wins
+	if kind == MOVE_PROMOTION:
+		promotion = (move >> 12 & 3) + KNIGHT
+		gains[0] += SEE_VALUES[promotion] - SEE_VALUES[PAWN]
+		victimValue = SEE_VALUES[promotion]
+	else:
+		victimValue = SEE_VALUES[code % 6]
+
+	attackers = (attackersOf(position, toSq, 0, occupied) | attackersOf(position, toSq, 1, occupied)) & occupied
+	side = color ^ 1
+
+	while True:
+		sideAttackers = attackers & colors[side]
+		if not sideAttackers:
+			break
+
+		# The least valuable attacker captures
+		base = side * 6
+		for pieceType in range(PAWN, KING + 1):
+			attacker = sideAttackers & pieces[base + pieceType]
+			if attacker:
+				break
+
+		gains.append(victimValue - gains[-1])
+
+		victimValue = SEE_VALUES[pieceType]
+		occupied ^= attacker & -attacker
+		attackers = (attackersOf(position, toSq, 0, occupied) | attackersOf(position, toSq, 1, occupied)) & occupied
+		side ^= 1
+
+	# Each player chooses between stopping and capturing, from the last capture to the first
+	for index in range(len(gains) - 1, 0, -1):
+		gains[index - 1] = -max(-gains[index - 1], gains[index])
+
+	return gains[0]
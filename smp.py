@@ -0,0 +1,171 @@
+"""
+Lazy SMP : the parallel search of the engine on several processes
+
+Python threads cannot search at the same time (the GIL), so the parallel search uses processes. All the
+processes search the same position with their own Searcher, and share the transposition table in shared
+memory : the results found by a process cut the tree of the others. The helper processes don't start
+at the same depth as the main search (one on two starts one ply deeper), so they fill the table with
+the results the main search will need next. The main search decides the move, the helpers stop when it
+ends. Run :
+	python smp.py --workers 4 --depth 5   benchmark the time to depth and the nodes per second with
+	                                      1 to 4 workers on the test positions
+"""
+
+import argparse
+import multiprocessing
+import queue
+import time
+
+from bitboard import Position
+from engine import Searcher, MAX_DEPTH
+from transposition import TranspositionTable, DEFAULT_SIZE
+from perft import PERFT_POSITIONS
+
+# The time a helper can take to stop after the end of the main search, in seconds
+HELPER_STOP_TIMEOUT = 5
+
+
+def _helperSearch(position, timeLimit, maxDepth, table, stopEvent, firstDepth, nodesQueue):
+	"""
+	Search a position in a helper process, until the main search stops it
+	@param position: the position
+	@type position: Position
+	@param timeLimit: the time budget, in milliseconds
+	@type timeLimit: int
+	@param maxDepth: the maximal depth
+	@type maxDepth: int
+	@param table: the shared transposition table
+	@type table: TranspositionTable
+	@param stopEvent: the event set when the main search ends
+	@type stopEvent: multiprocessing.Event
+	@param firstDepth: the depth of the first iteration
+	@type firstDepth: int
+	@param nodesQueue: the queue where the number of nodes searched is sent
+	@type nodesQueue: multiprocessing.Queue
+	@return: None
+	@rtype: None
+	"""
+
+	searcher = Searcher(position, timeLimit, table=table, stopEvent=stopEvent)
+
+	# The main search can end before the maximal depth, so the helper searches until it is stopped
+	searcher.search(MAX_DEPTH, min(firstDepth, maxDepth))
+
+	nodesQueue.put(searcher.nodes)
+
+
+def parallelSearch(position, timeLimit, workers, maxDepth=MAX_DEPTH, info=None, table=None, stopEvent=None):
+	"""
+	Search the best move of a position with several processes (Lazy SMP)
+	@param position: the position (the moves searched are taken back)
+	@type position: Position
+	@param timeLimit: the time budget, in milliseconds
+	@type timeLimit: int
+	@param workers: the number of processes, the main process included
+	@type workers: int
+	@param maxDepth: the maximal depth
+	@type maxDepth: int
+	@param info: a function called with a SearchResult after each iteration of the main search (or None)
+	@type info: function
+	@param table: a shared transposition table (or None to use a new one)
+	@type table: TranspositionTable
+	@param stopEvent: an event which stops the main search when it is set (or None)
+	@type stopEvent: threading.Event
+	@return: the result of the main search, with the nodes of all the processes
+	@rtype: SearchResult
+	"""
+
+	ownTable = table is None
+	if ownTable:
+		table = TranspositionTable(shared=True)
+	elif table.sharedMemory is None:
+		raise ValueError('The transposition table of a parallel search must be shared')
+
+	helpersStopEvent = multiprocessing.Event()
+	nodesQueue = multiprocessing.Queue()
+
+	helpers = []
+	for index in range(1, workers):
+		helper = multiprocessing.Process(target=_helperSearch, args=(position.copy(), timeLimit, maxDepth, table,
+			helpersStopEvent, 1 + index % 2, nodesQueue), daemon=True)
+		helper.start()
+		helpers.append(helper)
+
+	try:
+		result = Searcher(position, timeLimit, info, table, stopEvent).search(maxDepth)
+	finally:
+		helpersStopEvent.set()
+
+		helperNodes = 0
+		for _ in helpers:
+			try:
+				helperNodes += nodesQueue.get(timeout=HELPER_STOP_TIMEOUT)
+			except queue.Empty:
+				break
+
+		for helper in helpers:
+			helper.join(HELPER_STOP_TIMEOUT)
+			if helper.is_alive():
+				helper.terminate()
+
+		if ownTable:
+			table.close()
+
+	result.nodes += helperNodes
+
+	return result
+
+
+def benchmark(maxWorkers, depth, hashSize=DEFAULT_SIZE):
+	"""
+	Search the test positions to a fixed depth with 1 to maxWorkers processes, and print the time to
+	depth, the nodes per second and the speedup compared to one process
+	@param maxWorkers: the maximal number of processes
+	@type maxWorkers: int
+	@param depth: the depth of the searches
+	@type depth: int
+	@param hashSize: the size of the transposition table, in megabytes
+	@type hashSize: float
+	@return: a list of (workers, time, nodes) tuples
+	@rtype: List
+	"""
+
+	print(f'{multiprocessing.cpu_count()} cores, depth {depth}, {len(PERFT_POSITIONS)} positions')
+
+	results = []
+	for workers in range(1, maxWorkers + 1):
+		totalTime = 0
+		totalNodes = 0
+
+		for _, fen, _ in PERFT_POSITIONS:
+			# A new table for each search, so the searches don't help each other
+			table = TranspositionTable(hashSize, shared=True)
+
+			startTime = time.perf_counter()
+			result = parallelSearch(Position.fromFen(fen), 10 ** 9, workers, depth, table=table)
+			totalTime += time.perf_counter() - startTime
+			totalNodes += result.nodes
+
+			table.close()
+
+		results.append((workers, totalTime, totalNodes))
+
+		speedup = results[0][1] / totalTime if totalTime > 0 else 0
+		print(f'workers {workers} : time to depth {totalTime:.2f}s nodes {totalNodes} '
+			f'nps {totalNodes / totalTime:.0f} speedup {speedup:.2f}')
+
+	return results
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Benchmark the parallel search of the engine')
+	parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(), help='the maximal number of processes')
+	parser.add_argument('--depth', type=int, default=5, help='the depth of the searches')
+	parser.add_argument('--hash', type=float, default=DEFAULT_SIZE, help='the size of the transposition table, in megabytes')
+	arguments = parser.parse_args()
+
+	benchmark(arguments.workers, arguments.depth, arguments.hash)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,99 @@
+"""
+The images of the pieces, loaded once in a sprite atlas
+
+The twelve images are loaded the first time a piece is drawn (the display must exist to convert them to
+its pixel format), converted, scaled to the size of the pieces and copied in a single surface. Each
+piece image is then a subsurface of the atlas, found by its (piece type, color) in a dict, so drawing a
+piece is a dict lookup and a blit without any pixel format conversion
+"""
+
+import os
+
+import pygame
+
+from bitboard import COLOR_WHITE, COLOR_BLACK, PIECE_TYPES
+from constants import IMAGE_WIDTH
+
+PIECES_DIRECTORY = os.path.join('assets', 'pieces')
+
+# The name of the image file of each piece type, and of the directory of each color
+PIECE_IMAGE_NAMES = ('pawn', 'knight', 'bishop', 'rook', 'queen', 'king')
+COLOR_DIRECTORIES = ('white', 'black')
+
+
+class SpriteAtlas:
+	"""
+	The images of the pieces, loaded when they are first needed
+	"""
+
+	def __init__(self, imageSize=IMAGE_WIDTH, directory=PIECES_DIRECTORY):
+		"""
+		@param imageSize: the width and height of the piece images, in pixels
+		@type imageSize: int
+		@param directory: the directory of the piece images
+		@type directory: str
+		"""
+
+		self.imageSize = imageSize
+		self.directory = directory
+
+		self.atlas = None
+		self.sprites = {}
+
+	def __repr__(self):
+		"""Used for debugging"""
+		state = 'loaded' if self.atlas is not None else 'not loaded'
+		return f'sprite atlas {self.imageSize}px, {state}'
+
+	def load(self):
+		"""
+		Load the piece images in the atlas. The display must be created before
+		@return: None
+		@rtype: None
+		"""
+
+		size = self.imageSize
+		self.atlas = pygame.Surface((size * len(PIECE_TYPES), size * 2), pygame.SRCALPHA).convert_alpha()
+		self.sprites = {}
+
+		for color in (COLOR_WHITE, COLOR_BLACK):
+			for pieceType in PIECE_TYPES:
+				path = os.path.join(self.directory, COLOR_DIRECTORIES[color], PIECE_IMAGE_NAMES[pieceType] + '.png')
+				image = pygame.image.load(path).convert_alpha()
+
+				if image.get_size() != (size, size):
+					image = pygame.transform.smoothscale(image, (size, size))
+
+				rect = pygame.Rect(pieceType * size, color * size, size, size)
+				self.atlas.blit(image, rect)
+				self.sprites[pieceType, color] = self.atlas.subsurface(rect)
+
+	def resize(self, imageSize):
+		"""
+		Change the size of the piece images, they are loaded again the next time they are needed
+		@param imageSize: the new width and height of the piece images, in pixels
+		@type imageSize: int
+		@return: None
+		@rtype: None
+		"""
+
+		if imageSize != self.imageSize:
+			self.imageSize = imageSize
+			self.atlas = None
+			self.sprites = {}
+
+	def get(self, pieceType, color):
+		"""
+		Return the image of a piece
+		@param pieceType: the type of the piece (PAWN ... KING)
+		@type pieceType: int
+		@param color: COLOR_WHITE or COLOR_BLACK
+		@type color: int
+		@return: the image of the piece
+		@rtype: pygame.Surface
+		"""
+
+		if self.atlas is None:
+			self.load()
+
+		return self.sprites[pieceType, color]
@@ -0,0 +1,635 @@
+"""
+Endgame tablebases : the exact result of every position of a few endgames (king and queen, king and
+rook, king and pawn against the lone king), with the distance to mate, so the engine plays them
+perfectly without searching
+
+The tables are computed by retrograde analysis : the checkmates are found first, then the positions
+which mate in one ply, then the positions which cannot avoid them, and so on, going back along the
+moves until nothing changes. The positions never reached are draws. The moves of the positions are
+generated by movegen, and the tables of the pawn endings use the tables of the queen and the rook for
+the promotions
+
+A table has an entry of one byte for each position with the strong side white : 0 for a draw (or a
+position that cannot happen), or the distance to mate in plies plus one. The distance is odd when the
+side to move mates, and even when it is mated. The white king is kept on the files a to d by mirroring
+the board, so a table has 2 x 32 x 64 x 64 entries. The positions of the strong side black are found
+by swapping the colors
+
+The file of a table is a header, the offsets of its blocks, and the blocks of entries compressed with
+zlib. It is mapped in memory, and a block is only decompressed when a position needs it : the
+decompressed blocks are kept in a bounded cache, dropping the least recently used block first. Run :
+	python tablebase.py generate                 compute the tables and write them in the tablebases
+	                                             directory
+	python tablebase.py probe --fen "<fen>"      print the result of a position and of each of its moves
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+
+from bitboard import Position, COLOR_WHITE, COLOR_BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, \
+	SQUARE_BITS, MAX_MOVES, MOVE_KIND_MASK, MOVE_PROMOTION, pieceCode
+from movegen import KING_ATTACKS, PAWN_ATTACKS, rookAttacks, queenAttacks, generateLegalMoves, legalMoves, \
+	isSquareAttacked, moveToUci
+
+# The directory of the table files
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tablebases')
+
+# The tables, in the order of their generation : the piece of the strong side with its king
+TABLE_PIECES = OrderedDict((('KQK', QUEEN), ('KRK', ROOK), ('KPK', PAWN)))
+
+# The table reached by each promotion, None for the promotions to a piece that cannot mate
+PROMOTION_TABLES = {QUEEN: 'KQK', ROOK: 'KRK', BISHOP: None, KNIGHT: None}
+
+# The number of entries of a table : side to move, white king (files a to d), black king, piece
+TABLE_ENTRIES = 2 * 32 * 64 * 64
+
+# The results of a probe, for the side to move
+LOSS = -1
+DRAW = 0
+WIN = 1
+
+# The layout of a file : the header (magic, version, entries, entries of a block, blocks), then the
+# offset of each block and of the end of the last block
+HEADER_FORMAT = '>4sHIII'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+MAGIC = b'PCTB'
+VERSION = 1
+BLOCK_ENTRIES = 8192
+
+# The number of decompressed blocks kept in memory by default, each one takes BLOCK_ENTRIES bytes
+DEFAULT_CACHE_BLOCKS = 64
+
+# The entry of an unknown position during the generation
+_UNKNOWN = 255
+
+
+def tableIndex(sideToMove, whiteKing, blackKing, pieceSq):
+	"""
+	Return the index of the entry of a position in a table, the board being mirrored when the white king
+	is on the files e to h
+	@param sideToMove: the color of the side to move
+	@type sideToMove: int
+	@param whiteKing: the square of the white king
+	@type whiteKing: int
+	@param blackKing: the square of the black king
+	@type blackKing: int
+	@param pieceSq: the square of the white piece
+	@type pieceSq: int
+	@return: the index
+	@rtype: int
+	"""
+
+	if whiteKing & 7 >= 4:
+		whiteKing ^= 7
+		blackKing ^= 7
+		pieceSq ^= 7
+
+	return ((sideToMove * 32 + (whiteKing >> 3) * 4 + (whiteKing & 7)) * 64 + blackKing) * 64 + pieceSq
+
+
+def decodeIndex(index):
+	"""
+	Return the position of an entry of a table
+	@param index: the index of the entry
+	@type index: int
+	@return: the side to move and the squares of the white king, the black king and the white piece
+	@rtype: tuple
+	"""
+
+	pieceSq = index & 63
+	blackKing = index >> 6 & 63
+	kingIndex = index >> 12 & 31
+
+	return index >> 17, (kingIndex >> 2) * 8 + (kingIndex & 3), blackKing, pieceSq
+
+
+def _pieceAttacks(pieceType, sq, occupied):
+	"""
+	Return the squares attacked by the white piece of a table
+	@param pieceType: the type of the piece
+	@type pieceType: int
+	@param sq: the square of the piece
+	@type sq: int
+	@param occupied: the bitboard of the pieces
+	@type occupied: int
+	@return: the attacks bitboard
+	@rtype: int
+	"""
+
+	if pieceType == PAWN:
+		return PAWN_ATTACKS[COLOR_WHITE][sq]
+	if pieceType == ROOK:
+		return rookAttacks(sq, occupied)
+
+	return queenAttacks(sq, occupied)
+
+
+def _validEntries(pieceType):
+	"""
+	Find the entries of a table which are legal positions : three different squares, the kings not in
+	contact, no pawn on the first or the last rank, and the side which doesn't have the turn not in check
+	@param pieceType: the type of the white piece
+	@type pieceType: int
+	@return: the flag of each entry
+	@rtype: bytearray
+	"""
+
+	valid = bytearray(TABLE_ENTRIES)
+
+	for index in range(TABLE_ENTRIES):
+		sideToMove, whiteKing, blackKing, pieceSq = decodeIndex(index)
+
+		if whiteKing == blackKing or pieceSq == whiteKing or pieceSq == blackKing \
+				or KING_ATTACKS[whiteKing] & SQUARE_BITS[blackKing]:
+			continue
+		if pieceType == PAWN and (pieceSq < 8 or pieceSq >= 56):
+			continue
+
+		occupied = SQUARE_BITS[whiteKing] | SQUARE_BITS[blackKing] | SQUARE_BITS[pieceSq]
+		if sideToMove == COLOR_WHITE and _pieceAttacks(pieceType, pieceSq, occupied) & SQUARE_BITS[blackKing]:
+			continue
+
+		valid[index] = 1
+
+	return valid
+
+
+def generateTable(name, solvedTables):
+	"""
+	Compute a table by retrograde analysis
+	@param name: the name of the table (a key of TABLE_PIECES)
+	@type name: str
+	@param solvedTables: the entries of the tables already computed, by name, for the promotions
+	@type solvedTables: dict
+	@return: the entries of the table
+	@rtype: bytearray
+	"""
+
+	pieceType = TABLE_PIECES[name]
+	valid = _validEntries(pieceType)
+
+	# For each position : its entry, the moves not known to lose yet, the longest loss among the moves
+	# known to lose, and if a move leaving the table doesn't lose
+	entries = bytearray([_UNKNOWN]) * TABLE_ENTRIES
+	remaining = bytearray(TABLE_ENTRIES)
+	longestLoss = bytearray(TABLE_ENTRIES)
+	escapes = bytearray(TABLE_ENTRIES)
+
+	# levels[distance] : the positions whose distance to mate is found, to decide in this order
+	levels = [[] for _ in range(256)]
+
+	position = Position()
+	moves = [0] * MAX_MOVES
+	whiteKingCode = pieceCode(COLOR_WHITE, KING)
+	blackKingCode = pieceCode(COLOR_BLACK, KING)
+	whitePieceCode = pieceCode(COLOR_WHITE, pieceType)
+
+	# The moves of each position, played forward once : the positions without moves, and the moves
+	# leaving the table (the capture of the white piece and the promotions), whose result is known
+	for index in range(TABLE_ENTRIES):
+		if not valid[index]:
+			continue
+
+		sideToMove, whiteKing, blackKing, pieceSq = decodeIndex(index)
+		position.putPiece(whiteKingCode, whiteKing)
+		position.putPiece(blackKingCode, blackKing)
+		position.putPiece(whitePieceCode, pieceSq)
+		position.sideToMove = sideToMove
+
+		count = generateLegalMoves(position, sideToMove, moves)
+		inTable = 0
+
+		for moveIndex in range(count):
+			move = moves[moveIndex]
+			toSq = move >> 6 & 63
+
+			if toSq == pieceSq:
+				exitEntry = 0
+			elif move & MOVE_KIND_MASK == MOVE_PROMOTION:
+				promotionTable = PROMOTION_TABLES[(move >> 12 & 3) + KNIGHT]
+				exitEntry = solvedTables[promotionTable][tableIndex(COLOR_BLACK, whiteKing, blackKing, toSq)] \
+					if promotionTable is not None else 0
+			else:
+				inTable += 1
+				continue
+
+			# The entry is the result of the move for the opponent : a move which doesn't lose is an escape
+			if exitEntry & 1:
+				escapes[index] = 1
+				levels[exitEntry].append(index)
+			elif exitEntry:
+				longestLoss[index] = max(longestLoss[index], exitEntry - 1)
+			else:
+				escapes[index] = 1
+
+		if not count:
+			if isSquareAttacked(position, position.kingSquare(sideToMove), sideToMove ^ 1):
+				levels[0].append(index)
+			else:
+				entries[index] = 0
+		elif not inTable and not escapes[index]:
+			levels[longestLoss[index] + 1].append(index)
+
+		remaining[index] = inTable
+
+		position.removePiece(whiteKing)
+		position.removePiece(blackKing)
+		position.removePiece(pieceSq)
+
+	# The positions are decided by increasing distance to mate, each one updating the positions whose
+	# moves lead to it (its predecessors, found by taking back the moves)
+	for distance, level in enumerate(levels):
+		for index in level:
+			if entries[index] != _UNKNOWN:
+				continue
+
+			entries[index] = distance + 1
+			sideToMove, whiteKing, blackKing, pieceSq = decodeIndex(index)
+			occupied = SQUARE_BITS[whiteKing] | SQUARE_BITS[blackKing] | SQUARE_BITS[pieceSq]
+			empty = ~occupied
+
+			predecessors = []
+			if sideToMove == COLOR_BLACK:
+				for fromSq in _bits(KING_ATTACKS[whiteKing] & empty):
+					predecessors.append(tableIndex(COLOR_WHITE, fromSq, blackKing, pieceSq))
+
+				if pieceType == PAWN:
+					# A pawn comes from the rank below, or from its first rank two ranks below
+					if pieceSq < 48 and not occupied & SQUARE_BITS[pieceSq + 8]:
+						predecessors.append(tableIndex(COLOR_WHITE, whiteKing, blackKing, pieceSq + 8))
+						if pieceSq >> 3 == 4 and not occupied & SQUARE_BITS[pieceSq + 16]:
+							predecessors.append(tableIndex(COLOR_WHITE, whiteKing, blackKing, pieceSq + 16))
+				else:
+					for fromSq in _bits(_pieceAttacks(pieceType, pieceSq, occupied) & empty):
+						predecessors.append(tableIndex(COLOR_WHITE, whiteKing, blackKing, fromSq))
+			else:
+				for fromSq in _bits(KING_ATTACKS[blackKing] & empty):
+					predecessors.append(tableIndex(COLOR_BLACK, whiteKing, fromSq, pieceSq))
+
+			for predecessor in predecessors:
+				if not valid[predecessor] or entries[predecessor] != _UNKNOWN:
+					continue
+
+				if distance & 1 == 0:
+					# The move mates or wins the opponent
+					levels[distance + 1].append(predecessor)
+				else:
+					# The move loses : the predecessor is lost once all its moves lose
+					remaining[predecessor] -= 1
+					longestLoss[predecessor] = max(longestLoss[predecessor], distance)
+					if not remaining[predecessor] and not escapes[predecessor]:
+						levels[longestLoss[predecessor] + 1].append(predecessor)
+
+	# The positions never decided are draws, like the entries of the impossible positions
+	return entries.replace(bytes([_UNKNOWN]), b'\x00')
+
+
+def _bits(bitboard):
+	"""
+	Yield the squares of a bitboard
+	@param bitboard: the bitboard (only its 64 lowest bits are used)
+	@type bitboard: int
+	@return: a generator of squares
+	@rtype: generator
+	"""
+
+	bitboard &= 0xFFFFFFFFFFFFFFFF
+	while bitboard:
+		lowestBit = bitboard & -bitboard
+		yield lowestBit.bit_length() - 1
+		bitboard ^= lowestBit
+
+
+def writeTable(path, entries):
+	"""
+	Write a table in a file, compressed by blocks
+	@param path: the path of the file
+	@type path: str
+	@param entries: the entries of the table
+	@type entries: bytearray
+	@return: the size of the file, in bytes
+	@rtype: int
+	"""
+
+	blocks = [zlib.compress(bytes(entries[start:start + BLOCK_ENTRIES]), 9)
+		for start in range(0, len(entries), BLOCK_ENTRIES)]
+
+	offsets = array('I')
+	offset = HEADER_SIZE + (len(blocks) + 1) * 4
+	for block in blocks:
+		offsets.append(offset)
+		offset += len(block)
+	offsets.append(offset)
+
+	temporaryPath = path + '.' + str(os.getpid())
+	with open(temporaryPath, 'wb') as file:
+		file.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, len(entries), BLOCK_ENTRIES, len(blocks)))
+		file.write(struct.pack(f'>{len(offsets)}I', *offsets))
+		for block in blocks:
+			file.write(block)
+
+	os.replace(temporaryPath, path)
+
+	return offset
+
+
+class BlockCache:
+	"""
+	The decompressed blocks of the tables, the least recently used block dropped first when the cache is
+	full
+	"""
+
+	def __init__(self, maxBlocks=DEFAULT_CACHE_BLOCKS):
+		"""
+		@param maxBlocks: the number of blocks kept
+		@type maxBlocks: int
+		"""
+
+		self.maxBlocks = max(1, maxBlocks)
+		self.blocks = OrderedDict()
+
+		self.hits = 0
+		self.misses = 0
+
+	def __repr__(self):
+		"""Used for debugging"""
+		probes = self.hits + self.misses
+		return f'tablebase cache {len(self.blocks)}/{self.maxBlocks} blocks : {probes} probes, hit rate ' \
+			f'{self.hits / probes * 100 if probes else 0:.1f}%'
+
+	def get(self, key, load):
+		"""
+		Return a block, loading it if it isn't in the cache
+		@param key: the key of the block
+		@type key: tuple
+		@param load: the function loading the block
+		@type load: function
+		@return: the block
+		@rtype: bytes
+		"""
+
+		block = self.blocks.get(key)
+		if block is not None:
+			self.hits += 1
+			self.blocks.move_to_end(key)
+			return block
+
+		self.misses += 1
+		block = load()
+		self.blocks[key] = block
+		if len(self.blocks) > self.maxBlocks:
+			self.blocks.popitem(last=False)
+
+		return block
+
+
+class TablebaseFile:
+	"""
+	A table file mapped in memory, whose blocks are decompressed when they are read
+	"""
+
+	def __init__(self, name, path, cache):
+		"""
+		@param name: the name of the table
+		@type name: str
+		@param path: the path of the file
+		@type path: str
+		@param cache: the cache of the decompressed blocks
+		@type cache: BlockCache
+		"""
+
+		self.name = name
+		self.cache = cache
+
+		with open(path, 'rb') as file:
+			self.mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+		magic, version, self.entryCount, self.blockEntries, blockCount = struct.unpack_from(HEADER_FORMAT, self.mapped)
+		if magic != MAGIC or version != VERSION:
+			self.mapped.close()
+			raise ValueError(f'{path} is not a tablebase file of version {VERSION}')
+
+		self.offsets = struct.unpack_from(f'>{blockCount + 1}I', self.mapped, HEADER_SIZE)
+
+	def close(self):
+		"""
+		Unmap the file
+		@return: None
+		@rtype: None
+		"""
+
+		self.mapped.close()
+
+	def entry(self, index):
+		"""
+		Return an entry of the table
+		@param index: the index of the entry
+		@type index: int
+		@return: the entry
+		@rtype: int
+		"""
+
+		blockIndex, offset = divmod(index, self.blockEntries)
+		block = self.cache.get((self.name, blockIndex), lambda: self._loadBlock(blockIndex))
+
+		return block[offset]
+
+	def _loadBlock(self, blockIndex):
+		"""
+		Decompress a block of the file
+		@param blockIndex: the index of the block
+		@type blockIndex: int
+		@return: the entries of the block
+		@rtype: bytes
+		"""
+
+		return zlib.decompress(self.mapped[self.offsets[blockIndex]:self.offsets[blockIndex + 1]])
+
+
+class Tablebases:
+	"""
+	The tables of a directory, opened the first time a position needs them
+	"""
+
+	def __init__(self, directory=DEFAULT_DIRECTORY, cacheBlocks=DEFAULT_CACHE_BLOCKS):
+		"""
+		@param directory: the directory of the table files
+		@type directory: str
+		@param cacheBlocks: the number of decompressed blocks kept in memory
+		@type cacheBlocks: int
+		"""
+
+		self.directory = directory
+		self.cache = BlockCache(cacheBlocks)
+
+		# The opened tables by name, None for the tables without file
+		self.tables = {}
+
+	def __repr__(self):
+		"""Used for debugging"""
+		return repr(self.cache)
+
+	def close(self):
+		"""
+		Close the opened tables
+		@return: None
+		@rtype: None
+		"""
+
+		for table in self.tables.values():
+			if table is not None:
+				table.close()
+
+		self.tables = {}
+
+	def _table(self, name):
+		"""
+		Return a table, opening its file the first time
+		@param name: the name of the table
+		@type name: str
+		@return: the table, or None if it has no file
+		@rtype: TablebaseFile
+		"""
+
+		if name not in self.tables:
+			path = os.path.join(self.directory, name + '.tb')
+			self.tables[name] = TablebaseFile(name, path, self.cache) if os.path.exists(path) else None
+
+		return self.tables[name]
+
+	def probe(self, position):
+		"""
+		Find the result of a position in the tables
+		@param position: the position
+		@type position: Position
+		@return: the result for the side to move (WIN, DRAW or LOSS) and the distance to mate in plies, or
+			None if the position isn't in the tables
+		@rtype: tuple
+		"""
+
+		# Three pieces at most, quickly : two bits removed leave at most one bit
+		occupied = position.occupied
+		others = occupied & (occupied - 1)
+		others &= others - 1
+		if others & (others - 1) or position.castling:
+			return None
+
+		pieces = position.pieces
+		if occupied == pieces[KING] | pieces[KING + 6]:
+			return DRAW, 0
+
+		for pieceType, name in ((QUEEN, 'KQK'), (ROOK, 'KRK'), (PAWN, 'KPK'), (KNIGHT, None), (BISHOP, None)):
+			whitePiece = pieces[pieceType]
+			if whitePiece or pieces[pieceType + 6]:
+				break
+
+		# A knight or a bishop cannot mate
+		if name is None:
+			return DRAW, 0
+
+		table = self._table(name)
+		if table is None:
+			return None
+
+		whiteKing = pieces[KING].bit_length() - 1
+		blackKing = pieces[KING + 6].bit_length() - 1
+		sideToMove = position.sideToMove
+
+		# The positions with the strong side black are found with the colors swapped
+		if whitePiece:
+			index = tableIndex(sideToMove, whiteKing, blackKing, whitePiece.bit_length() - 1)
+		else:
+			pieceSq = pieces[pieceType + 6].bit_length() - 1
+			index = tableIndex(sideToMove ^ 1, blackKing ^ 56, whiteKing ^ 56, pieceSq ^ 56)
+
+		entry = table.entry(index)
+		if not entry:
+			return DRAW, 0
+
+		return (WIN if entry & 1 == 0 else LOSS), entry - 1
+
+
+def generateTables(directory=DEFAULT_DIRECTORY):
+	"""
+	Compute all the tables and write their files
+	@param directory: the directory of the files
+	@type directory: str
+	@return: None
+	@rtype: None
+	"""
+
+	os.makedirs(directory, exist_ok=True)
+	solvedTables = {}
+
+	for name in TABLE_PIECES:
+		startTime = time.perf_counter()
+		entries = generateTable(name, solvedTables)
+		solvedTables[name] = entries
+
+		size = writeTable(os.path.join(directory, name + '.tb'), entries)
+		longest = max(entries) - 1
+		print(f'{name} : {TABLE_ENTRIES} entries, {size} bytes, longest mate {longest} plies, computed in '
+			f'{time.perf_counter() - startTime:.1f}s')
+
+
+def resultName(result, distance):
+	"""
+	Return the description of a probe result
+	@param result: the result (WIN, DRAW or LOSS)
+	@type result: int
+	@param distance: the distance to mate in plies
+	@type distance: int
+	@return: the description
+	@rtype: str
+	"""
+
+	if result == DRAW:
+		return 'draw'
+
+	return f'{"win" if result == WIN else "loss"} in {distance} plies'
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Compute the endgame tablebases, or probe a position')
+	commands = parser.add_subparsers(dest='command', required=True)
+
+	generate = commands.add_parser('generate', help='compute the tables and write their files')
+	generate.add_argument('--directory', default=DEFAULT_DIRECTORY, help='the directory of the files')
+
+	probe = commands.add_parser('probe', help='print the result of a position and of its moves')
+	probe.add_argument('--fen', required=True, help='the position (FEN string)')
+	probe.add_argument('--directory', default=DEFAULT_DIRECTORY, help='the directory of the files')
+
+	arguments = parser.parse_args()
+
+	if arguments.command == 'generate':
+		generateTables(arguments.directory)
+		return
+
+	tablebases = Tablebases(arguments.directory)
+	position = Position.fromFen(arguments.fen)
+
+	probed = tablebases.probe(position)
+	if probed is None:
+		print('the position is not in the tables')
+		return
+
+	print(f'position : {resultName(*probed)}')
+	for move in legalMoves(position, position.sideToMove):
+		position.makeMove(move)
+		result, distance = tablebases.probe(position)
+		position.unmakeMove()
+
+		print(f'{moveToUci(move)} : {resultName(-result, distance + 1 if result != DRAW else 0)}')
+
+	tablebases.close()
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,8 @@
+"""
+The modules of the project are at the root of the repository, next to this directory
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
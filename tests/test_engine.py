@@ -0,0 +1,24 @@
+"""
+The draws and the mates found by the search
+"""
+
+from bitboard import Position
+from engine import Searcher, MATE_SCORE
+from movegen import moveToUci
+
+
+def testMateOnTheLastMoveOfTheFiftyMovesRule():
+	# Ra8 is mate and brings the halfmove clock to 100 : the mate is not a draw
+	position = Position.fromFen('6k1/5ppp/8/8/8/8/8/R5K1 w - - 99 80')
+	result = Searcher(position, 10 ** 9).search(2)
+
+	assert moveToUci(result.move) == 'a1a8'
+	assert result.score == MATE_SCORE - 1
+
+
+def testFiftyMovesRuleDraw():
+	# Up a rook, but every move reaches the 100th halfmove without a mate
+	position = Position.fromFen('6k1/5pp1/7p/8/8/8/8/R5K1 w - - 99 80')
+	result = Searcher(position, 10 ** 9).search(2)
+
+	assert result.score == 0
@@ -0,0 +1,43 @@
+"""
+The evaluation doesn't prefer a color : a position and its mirror (the board flipped, the colors and
+the turn swapped) have the same evaluation for the side to move. The scores kept up to date by the
+moves are also compared to the scores computed from scratch
+"""
+
+import pytest
+
+from bitboard import Position, START_FEN
+from evaluation import evaluate, staticScore, randomPositions
+from pawn_table import PawnHashTable
+from perft import PERFT_POSITIONS
+
+FENS = [START_FEN] + [fen for _, fen, _ in PERFT_POSITIONS] + [
+	# Passed pawns and kings in the endgame
+	'8/5k2/8/3P4/8/1p6/5K2/8 w - - 0 1',
+	'8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 b - - 0 1',
+	# Doubled, isolated and backward pawns
+	'r1bqk2r/pp3ppp/2n1pn2/2pp4/1bPP4/2N1PN2/PP1B1PPP/R2QKB1R w KQkq - 0 7',
+	'6k1/5ppp/8/1P1P4/1P6/8/5PPP/6K1 b - - 0 1',
+	# Unequal material
+	'4k3/8/8/8/8/8/8/RN2K3 w - - 0 1',
+	'rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3',
+]
+
+
+@pytest.mark.parametrize('fen', FENS)
+def testMirroredEvaluation(fen):
+	position = Position.fromFen(fen)
+
+	assert evaluate(position) == evaluate(position.mirror())
+
+
+def testRandomGames():
+	pawnTable = PawnHashTable()
+
+	for position in randomPositions(games=5):
+		fen = position.toFen()
+		whiteScore = staticScore(position)
+
+		assert position.pieceSquareScore == position.computePieceSquareScore(), fen
+		assert staticScore(position, pawnTable) == whiteScore, fen
+		assert evaluate(position) == evaluate(position.mirror()), fen
@@ -0,0 +1,25 @@
+"""
+The node counts of the move generator on the perft suite, kept to the shallow depths so the test is fast
+"""
+
+import pytest
+
+from bitboard import Position
+from perft import PERFT_POSITIONS, perft
+
+# The deepest counts checked have at most this number of nodes
+MAX_NODES = 100000
+
+
+@pytest.mark.parametrize('name, fen, counts', PERFT_POSITIONS, ids=[name for name, _, _ in PERFT_POSITIONS])
+def testPerftSuite(name, fen, counts):
+	position = Position.fromFen(fen)
+
+	for depth, expectedNodes in enumerate(counts, 1):
+		if expectedNodes > MAX_NODES:
+			break
+
+		assert perft(position, depth) == expectedNodes, f'{name} depth {depth}'
+
+	# The moves are taken back, the position is unchanged
+	assert position.toFen() == Position.fromFen(fen).toFen()
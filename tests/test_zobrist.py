@@ -0,0 +1,41 @@
+"""
+The hashes kept up to date by the moves, compared to the hashes computed from scratch in random games
+"""
+
+import random
+
+from bitboard import Position, START_FEN
+from movegen import legalMoves
+
+GAMES = 30
+PLIES = 200
+
+
+def testIncrementalHash():
+	generator = random.Random(0)
+
+	for _ in range(GAMES):
+		position = Position.fromFen(START_FEN)
+		hashes = []
+
+		for _ in range(PLIES):
+			moves = legalMoves(position, position.sideToMove)
+			if not moves:
+				break
+
+			hashes.append((position.hash, position.pawnHash))
+			position.makeMove(generator.choice(moves))
+
+			assert position.hash == position.computeHash(), f'hash after {position.toFen()}'
+			assert position.pawnHash == position.computePawnHash(), f'pawn hash after {position.toFen()}'
+
+		# Taking back all the moves must give back the hashes of each position
+		while hashes:
+			hashKey, pawnHashKey = hashes.pop()
+			position.unmakeMove()
+
+			assert position.hash == hashKey, f'hash after taking back a move to {position.toFen()}'
+			assert position.pawnHash == pawnHashKey, f'pawn hash after taking back a move to {position.toFen()}'
+			assert position.hash == position.computeHash(), f'hash after taking back a move to {position.toFen()}'
+			assert position.pawnHash == position.computePawnHash(), \
+				f'pawn hash after taking back a move to {position.toFen()}'
@@ -0,0 +1,216 @@
+"""
+The transposition table of the engine : the results of the positions already searched, found by the
+Zobrist hash of the position
+
+The table is preallocated with a fixed size in megabytes. Its entries are stored in two arrays of 64
+bits integers (the keys and the packed data), grouped by buckets of two entries :
+	- the first entry of a bucket keeps the deepest search (depth-preferred), unless it comes from an
+	  older search
+	- the second entry is always replaced
+
+The table can be created in shared memory, to be used by the search processes of a parallel search
+(see smp.py). The processes write the entries without lock, so an entry can be read while another
+process writes it. The key of an entry is stored XORed with its data : an entry whose key and data
+come from two different writes doesn't match the key of any position, so it is never used
+"""
+
+from array import array
+from multiprocessing import resource_tracker, shared_memory
+
+from bitboard import NO_MOVE
+
+# The bound of a stored score : the exact score, or only a lower or an upper bound because of a cutoff
+BOUND_EXACT = 0
+BOUND_LOWER = 1
+BOUND_UPPER = 2
+
+# Each entry takes 16 bytes : 8 for the key and 8 for the data
+ENTRY_SIZE = 16
+BUCKET_SIZE = 2
+
+# The data of an entry is packed in 64 bits : move (16 bits), score + SCORE_OFFSET (32 bits), depth
+# (8 bits), bound (2 bits) and age (6 bits)
+SCORE_OFFSET = 1 << 31
+
+DEFAULT_SIZE = 16
+
+
+class TranspositionTable:
+	"""
+	A fixed size hash table of search results, with statistics about its use
+	"""
+
+	def __init__(self, sizeMb=DEFAULT_SIZE, shared=False, sharedName=None):
+		"""
+		@param sizeMb: the size of the table, in megabytes
+		@type sizeMb: float
+		@param shared: if the table must be in shared memory, to be used by several processes
+		@type shared: bool
+		@param sharedName: the name of the shared memory of an existing shared table, to use it in another
+			process (None to create a new table)
+		@type sharedName: str
+		"""
+
+		self.sizeMb = sizeMb
+		self.bucketCount = max(1, int(sizeMb * 1024 * 1024) // (ENTRY_SIZE * BUCKET_SIZE))
+		self.entryCount = self.bucketCount * BUCKET_SIZE
+
+		self.sharedMemory = None
+		self.owner = sharedName is None
+
+		if sharedName is not None:
+			# The process creating the table removes the shared memory, the other processes only close it
+			self.sharedMemory = shared_memory.SharedMemory(sharedName)
+			resource_tracker.unregister(self.sharedMemory._name, 'shared_memory')
+		elif shared:
+			self.sharedMemory = shared_memory.SharedMemory(create=True, size=self.entryCount * ENTRY_SIZE)
+
+		self.age = 0
+		self.clear()
+
+	def __reduce__(self):
+		"""
+		Send a shared table to another process : the process uses the same shared memory
+		"""
+
+		if self.sharedMemory is None:
+			raise TypeError('Only a shared transposition table can be sent to another process')
+
+		return TranspositionTable, (self.sizeMb, True, self.sharedMemory.name), {'age': self.age}
+
+	def __repr__(self):
+		"""Used for debugging"""
+		return f'transposition table {self.sizeMb} MB : {self.probes} probes, hit rate {self.hitRate() * 100:.1f}%, ' \
+			f'{self.stores} stores, occupancy {self.occupancy() * 100:.1f}%'
+
+	def clear(self):
+		"""
+		Empty the table and reset its statistics
+		@return: None
+		@rtype: None
+		"""
+
+		if self.sharedMemory is None:
+			self.keys = array('Q', [0]) * self.entryCount
+			self.data = array('Q', [0]) * self.entryCount
+		else:
+			# The keys and the data are two views of 64 bits integers on the shared memory. A table used by
+			# another process is already filled
+			buffer = self.sharedMemory.buf
+			if self.owner:
+				buffer[:self.entryCount * ENTRY_SIZE] = bytes(self.entryCount * ENTRY_SIZE)
+
+			self.keys = buffer[:self.entryCount * 8].cast('Q')
+			self.data = buffer[self.entryCount * 8:self.entryCount * ENTRY_SIZE].cast('Q')
+
+		self.age = 0
+		self.usedEntries = 0
+		self.probes = 0
+		self.hits = 0
+		self.stores = 0
+
+	def newSearch(self):
+		"""
+		Start a new search : the entries of the previous searches can be replaced by shallower ones
+		@return: None
+		@rtype: None
+		"""
+
+		self.age = (self.age + 1) & 63
+
+	def probe(self, key):
+		"""
+		Find the entry of a position
+		@param key: the hash of the position
+		@type key: int
+		@return: the (depth, score, bound, move) of the entry (move is NO_MOVE when no best move is known), or
+			None if the position isn't stored
+		@rtype: tuple
+		"""
+
+		self.probes += 1
+		index = (key % self.bucketCount) * BUCKET_SIZE
+
+		for entry in (index, index + 1):
+			data = self.data[entry]
+
+			if data and self.keys[entry] ^ data == key:
+				self.hits += 1
+				return data >> 48 & 255, (data >> 16 & 0xFFFFFFFF) - SCORE_OFFSET, data >> 56 & 3, data & 0xFFFF
+
+		return None
+
+	def store(self, key, depth, score, bound, move):
+		"""
+		Store the result of the search of a position
+		@param key: the hash of the position
+		@type key: int
+		@param depth: the depth of the search
+		@type depth: int
+		@param score: the score found
+		@type score: int
+		@param bound: BOUND_EXACT, BOUND_LOWER or BOUND_UPPER
+		@type bound: int
+		@param move: the best move found (or NO_MOVE)
+		@type move: int
+		@return: None
+		@rtype: None
+		"""
+
+		self.stores += 1
+		index = (key % self.bucketCount) * BUCKET_SIZE
+
+		# The first entry is only replaced by a deeper search, a search of the same position or a newer
+		# search. Otherwise the second entry is replaced
+		data = self.data[index]
+		if data and self.keys[index] ^ data != key and data >> 58 == self.age and data >> 48 & 255 > depth:
+			index += 1
+			data = self.data[index]
+
+		# Keep the best move already known when the new search has none
+		if move == NO_MOVE and data and self.keys[index] ^ data == key:
+			move = data & 0xFFFF
+
+		if not data:
+			self.usedEntries += 1
+
+		data = move | (score + SCORE_OFFSET) << 16 | min(depth, 255) << 48 | bound << 56 | self.age << 58
+		self.keys[index] = key ^ data
+		self.data[index] = data
+
+	def hitRate(self):
+		"""
+		Return the part of the probes that found their position
+		@return: the hit rate (between 0 and 1)
+		@rtype: float
+		"""
+
+		return self.hits / self.probes if self.probes else 0
+
+	def occupancy(self):
+		"""
+		Return the part of the entries that are used
+		@return: the occupancy (between 0 and 1)
+		@rtype: float
+		"""
+
+		return self.usedEntries / self.entryCount
+
+	def close(self):
+		"""
+		Release the shared memory of a shared table. The process which created the table removes it
+		@return: None
+		@rtype: None
+		"""
+
+		if self.sharedMemory is None:
+			return
+
+		self.keys.release()
+		self.data.release()
+		self.sharedMemory.close()
+
+		if self.owner:
+			self.sharedMemory.unlink()
+
+		self.sharedMemory = None
@@ -0,0 +1,366 @@
+"""
+UCI front-end : the engine speaks the Universal Chess Interface on the standard input and output, so it
+can be used by the chess GUIs and the tournament managers without the pygame window. Run :
+	python uci.py
+
+The commands supported are uci, isready, setoption (Hash, Threads and BookFile), ucinewgame, position, go (depth,
+movetime, wtime, btime, winc, binc, movestogo, infinite), stop and quit. The search runs in a thread, so
+stop and isready are answered during the search. After each iteration an info line gives the depth, the
+score, the nodes, the nodes per second, the time and the principal variation
+"""
+
+import sys
+import threading
+
+from bitboard import START_FEN, COLOR_WHITE
+from chess_board import ChessBoard
+from engine import searchPosition, MATE_SCORE, MAX_DEPTH, MAX_PLY, PAWN_TABLE
+from movegen import moveFromUci, moveToUci
+from transposition import TranspositionTable, DEFAULT_SIZE
+from book import OpeningBook
+
+ENGINE_NAME = 'PyChess'
+ENGINE_AUTHOR = 'Scyp1'
+
+# The limits of the options
+MAX_HASH_SIZE = 4096
+MAX_THREADS = 64
+
+# The time budget of a search without limit (go infinite, or go without parameters), in milliseconds
+UNLIMITED_TIME = 10 ** 9
+
+# Time management : without movestogo, the remaining time is shared between MOVES_TO_GO moves, and a
+# move never takes more than a part of the remaining time, minus a margin for the communication
+MOVES_TO_GO = 30
+MAX_TIME_PART = 0.5
+TIME_MARGIN = 50
+
+
+def formatScore(score):
+	"""
+	Return the score of an info line : 'cp <centipawns>', or 'mate <moves>' (negative when the engine is
+	mated)
+	@param score: the score of the search
+	@type score: int
+	@return: the score in the UCI notation
+	@rtype: str
+	"""
+
+	if score >= MATE_SCORE - MAX_PLY:
+		return f'mate {(MATE_SCORE - score + 1) // 2}'
+	if score <= -MATE_SCORE + MAX_PLY:
+		return f'mate {-((MATE_SCORE + score + 1) // 2)}'
+
+	return f'cp {score}'
+
+
+def allocateTime(remainingTime, increment=0, movesToGo=None):
+	"""
+	Decide the time budget of a move from the clock of the engine
+	@param remainingTime: the time left on the clock, in milliseconds
+	@type remainingTime: int
+	@param increment: the time added after each move, in milliseconds
+	@type increment: int
+	@param movesToGo: the number of moves before the next time control (or None)
+	@type movesToGo: int
+	@return: the time budget, in milliseconds
+	@rtype: int
+	"""
+
+	moves = movesToGo if movesToGo else MOVES_TO_GO
+	budget = remainingTime / moves + increment * 0.8
+
+	return max(1, int(min(budget, remainingTime * MAX_TIME_PART) - TIME_MARGIN))
+
+
+class UciEngine:
+	"""
+	The state of the engine between the UCI commands : the chess board of the last position command, the
+	options, the transposition table and the running search
+	"""
+
+	def __init__(self, output=sys.stdout):
+		"""
+		@param output: the text file where the answers are written
+		@type output: file
+		"""
+
+		self.output = output
+		self.outputLock = threading.Lock()
+
+		self.chessBoard = ChessBoard()
+		self.hashSize = DEFAULT_SIZE
+		self.threads = 1
+		self.table = TranspositionTable(self.hashSize)
+		self.book = None
+
+		self.searchThread = None
+		self.stopEvent = None
+
+	def send(self, line):
+		"""
+		Write an answer, the search thread and the main thread can both write
+		@param line: the answer
+		@type line: str
+		@return: None
+		@rtype: None
+		"""
+
+		with self.outputLock:
+			self.output.write(line + '\n')
+			self.output.flush()
+
+	def run(self, input=sys.stdin):
+		"""
+		Read and execute the commands until quit or the end of the input
+		@param input: the text file where the commands are read
+		@type input: file
+		@return: None
+		@rtype: None
+		"""
+
+		for line in input:
+			if not self.execute(line):
+				break
+
+		self.stop()
+		self.table.close()
+		if self.book is not None:
+			self.book.close()
+
+	def execute(self, line):
+		"""
+		Execute a command
+		@param line: the command
+		@type line: str
+		@return: False for quit, True otherwise
+		@rtype: bool
+		"""
+
+		tokens = line.split()
+		if not tokens:
+			return True
+
+		command, arguments = tokens[0], tokens[1:]
+
+		if command == 'uci':
+			self.send(f'id name {ENGINE_NAME}')
+			self.send(f'id author {ENGINE_AUTHOR}')
+			self.send(f'option name Hash type spin default {DEFAULT_SIZE} min 1 max {MAX_HASH_SIZE}')
+			self.send(f'option name Threads type spin default 1 min 1 max {MAX_THREADS}')
+			self.send('option name BookFile type string default <empty>')
+			self.send('uciok')
+		elif command == 'isready':
+			self.send('readyok')
+		elif command == 'setoption':
+			self.setOption(arguments)
+		elif command == 'ucinewgame':
+			self.stop()
+			self.table.clear()
+			PAWN_TABLE.clear()
+		elif command == 'position':
+			self.stop()
+			self.setPosition(arguments)
+		elif command == 'go':
+			self.go(arguments)
+		elif command == 'stop':
+			self.stop()
+		elif command == 'quit':
+			return False
+		else:
+			self.send(f'info string unknown command {command}')
+
+		return True
+
+	def setOption(self, arguments):
+		"""
+		Execute the setoption command : 'name <name> value <value>'
+		@param arguments: the tokens after setoption
+		@type arguments: List
+		@return: None
+		@rtype: None
+		"""
+
+		if 'name' not in arguments or 'value' not in arguments:
+			return
+
+		name = ' '.join(arguments[arguments.index('name') + 1:arguments.index('value')]).lower()
+		value = ' '.join(arguments[arguments.index('value') + 1:])
+
+		if name == 'bookfile':
+			self.setBook(value)
+			return
+
+		try:
+			if name == 'hash':
+				self.hashSize = min(max(int(value), 1), MAX_HASH_SIZE)
+			elif name == 'threads':
+				self.threads = min(max(int(value), 1), MAX_THREADS)
+			else:
+				self.send(f'info string unknown option {name}')
+				return
+		except ValueError:
+			self.send(f'info string invalid value {value}')
+			return
+
+		# The table is shared between the processes when several threads search
+		self.stop()
+		self.table.close()
+		self.table = TranspositionTable(self.hashSize, shared=self.threads > 1)
+
+	def setBook(self, path):
+		"""
+		Open the opening book consulted before the searches
+		@param path: the path of the book file, or <empty> to search every position
+		@type path: str
+		@return: None
+		@rtype: None
+		"""
+
+		self.stop()
+		if self.book is not None:
+			self.book.close()
+			self.book = None
+
+		if not path or path == '<empty>':
+			return
+
+		try:
+			self.book = OpeningBook(path)
+		except (OSError, ValueError) as error:
+			self.send(f'info string {error}')
+
+	def setPosition(self, arguments):
+		"""
+		Execute the position command : 'startpos' or 'fen <fen>', then 'moves <move1> ... <movei>'
+		@param arguments: the tokens after position
+		@type arguments: List
+		@return: None
+		@rtype: None
+		"""
+
+		movesIndex = arguments.index('moves') if 'moves' in arguments else len(arguments)
+
+		if arguments and arguments[0] == 'fen':
+			fen = ' '.join(arguments[1:movesIndex])
+		else:
+			fen = START_FEN
+
+		try:
+			chessBoard = ChessBoard(fen)
+		except ValueError as error:
+			self.send(f'info string {error}')
+			return
+
+		for name in arguments[movesIndex + 1:]:
+			move = moveFromUci(chessBoard.position, name)
+			if move is None:
+				self.send(f'info string illegal move {name}')
+				break
+
+			chessBoard.makeMove(move)
+
+		self.chessBoard = chessBoard
+
+	def go(self, arguments):
+		"""
+		Execute the go command : start the search of the position in a thread
+		@param arguments: the tokens after go
+		@type arguments: List
+		@return: None
+		@rtype: None
+		"""
+
+		self.stop()
+
+		parameters = {}
+		for index, token in enumerate(arguments[:-1]):
+			if token in ('depth', 'movetime', 'wtime', 'btime', 'winc', 'binc', 'movestogo'):
+				try:
+					parameters[token] = int(arguments[index + 1])
+				except ValueError:
+					pass
+
+		position = self.chessBoard.position.copy()
+		maxDepth = min(parameters.get('depth', MAX_DEPTH), MAX_DEPTH)
+		infinite = 'infinite' in arguments
+
+		# The time budget : the movetime, or a part of the clock of the engine, or no limit
+		clockName, incrementName = ('wtime', 'winc') if position.sideToMove == COLOR_WHITE else ('btime', 'binc')
+		if 'movetime' in parameters:
+			timeLimit = parameters['movetime']
+		elif clockName in parameters and not infinite:
+			timeLimit = allocateTime(parameters[clockName], parameters.get(incrementName, 0), parameters.get('movestogo'))
+		else:
+			timeLimit = UNLIMITED_TIME
+
+		self.stopEvent = threading.Event()
+		self.searchThread = threading.Thread(target=self.search, args=(position, timeLimit, maxDepth, infinite,
+			self.stopEvent), daemon=True)
+		self.searchThread.start()
+
+	def search(self, position, timeLimit, maxDepth, infinite, stopEvent):
+		"""
+		The search, run by the search thread. The best move is sent at the end
+		@param position: the position
+		@type position: Position
+		@param timeLimit: the time budget, in milliseconds
+		@type timeLimit: int
+		@param maxDepth: the maximal depth
+		@type maxDepth: int
+		@param infinite: if the best move must only be sent after the stop command
+		@type infinite: bool
+		@param stopEvent: the event set by the stop command
+		@type stopEvent: threading.Event
+		@return: None
+		@rtype: None
+		"""
+
+		result = searchPosition(position, timeLimit, maxDepth, self.sendInfo, self.table, self.threads, stopEvent,
+			self.book)
+
+		# In infinite mode, the GUI waits for the stop command even if the search ended before
+		if infinite:
+			stopEvent.wait()
+
+		if result.move is None:
+			self.send('bestmove 0000')
+		elif len(result.pv) >= 2:
+			self.send(f'bestmove {moveToUci(result.move)} ponder {moveToUci(result.pv[1])}')
+		else:
+			self.send(f'bestmove {moveToUci(result.move)}')
+
+	def sendInfo(self, result):
+		"""
+		Send the info line of an iteration of the search
+		@param result: the result of the iteration
+		@type result: SearchResult
+		@return: None
+		@rtype: None
+		"""
+
+		nodesPerSecond = int(result.nodes / result.elapsedTime) if result.elapsedTime > 0 else 0
+		pv = ' '.join(moveToUci(move) for move in result.pv)
+
+		self.send(f'info depth {result.depth} score {formatScore(result.score)} nodes {result.nodes} '
+			f'nps {nodesPerSecond} time {int(result.elapsedTime * 1000)} pv {pv}')
+
+	def stop(self):
+		"""
+		Stop the running search, its best move is sent
+		@return: None
+		@rtype: None
+		"""
+
+		if self.searchThread is not None:
+			self.stopEvent.set()
+			self.searchThread.join()
+			self.searchThread = None
+
+
+def main():
+	UciEngine().run()
+
+
+if __name__ == '__main__':
+	main()
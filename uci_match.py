@@ -0,0 +1,252 @@
+"""
+A small stand-in for a tournament manager : plays games between two UCI engines, started as processes,
+and writes the games in a PGN file. The rules of the games (legal moves, checkmate, stalemate) are
+checked with the move generator of the project. Run :
+	python uci_match.py --games 4 --movetime 100
+	python uci_match.py --first "python uci.py" --second "stockfish" --games 10 --movetime 200 --pgn match.pgn
+
+Both engines are this engine (python uci.py) by default, which checks the UCI front-end from end to end
+"""
+
+import argparse
+import os
+import shlex
+import subprocess
+import sys
+import time
+
+from bitboard import Position, START_FEN, COLOR_WHITE
+from movegen import legalMoves, isSquareAttacked, moveFromUci, moveToUci
+import pgn
+
+# The command of this engine, which works from any directory
+DEFAULT_ENGINE = f'{shlex.quote(sys.executable)} ' \
+	f'{shlex.quote(os.path.join(os.path.dirname(os.path.abspath(__file__)), "uci.py"))}'
+
+# The games longer than this number of plies are adjudicated as a draw
+MAX_PLIES = 300
+
+# The time a UCI engine has to answer a command which isn't a search, in seconds
+ANSWER_TIMEOUT = 10
+
+
+class UciProcess:
+	"""
+	A UCI engine running in a process, with which the commands are exchanged line by line
+	"""
+
+	def __init__(self, command):
+		"""
+		@param command: the command line which starts the engine
+		@type command: str
+		"""
+
+		self.command = command
+		self.process = subprocess.Popen(shlex.split(command), stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+			universal_newlines=True, bufsize=1)
+		self.name = command
+
+		self.send('uci')
+		for line in self.readUntil('uciok'):
+			if line.startswith('id name '):
+				self.name = line[len('id name '):]
+
+		self.send('isready')
+		self.readUntil('readyok')
+
+	def __repr__(self):
+		"""Used for debugging"""
+		return f'UCI engine {self.name}'
+
+	def send(self, line):
+		"""
+		Send a command to the engine
+		@param line: the command
+		@type line: str
+		@return: None
+		@rtype: None
+		"""
+
+		self.process.stdin.write(line + '\n')
+		self.process.stdin.flush()
+
+	def readUntil(self, prefix):
+		"""
+		Read the lines of the engine until a line starting with a prefix
+		@param prefix: the prefix of the last line
+		@type prefix: str
+		@return: the lines read, the last one included
+		@rtype: List
+		"""
+
+		lines = []
+
+		while True:
+			line = self.process.stdout.readline()
+			if not line:
+				raise EOFError(f'{self.name} stopped')
+
+			line = line.strip()
+			lines.append(line)
+
+			if line.startswith(prefix):
+				return lines
+
+	def bestMove(self, fen, moves, moveTime):
+		"""
+		Search the best move of a position
+		@param fen: the FEN string of the initial position of the game
+		@type fen: str
+		@param moves: the moves played since the initial position, in the UCI notation
+		@type moves: List
+		@param moveTime: the time budget, in milliseconds
+		@type moveTime: int
+		@return: the best move in the UCI notation, and the last info line (or None)
+		@rtype: tuple
+		"""
+
+		position = 'startpos' if fen == START_FEN else f'fen {fen}'
+		if moves:
+			position += ' moves ' + ' '.join(moves)
+
+		self.send(f'position {position}')
+		self.send(f'go movetime {moveTime}')
+
+		lines = self.readUntil('bestmove')
+		infoLines = [line for line in lines if line.startswith('info') and ' pv ' in line]
+
+		return lines[-1].split()[1], infoLines[-1] if infoLines else None
+
+	def newGame(self):
+		"""
+		Tell the engine a new game starts
+		@return: None
+		@rtype: None
+		"""
+
+		self.send('ucinewgame')
+		self.send('isready')
+		self.readUntil('readyok')
+
+	def quit(self):
+		"""
+		Stop the engine
+		@return: None
+		@rtype: None
+		"""
+
+		try:
+			self.send('quit')
+			self.process.wait(ANSWER_TIMEOUT)
+		except (OSError, subprocess.TimeoutExpired):
+			self.process.kill()
+
+
+def playGame(white, black, moveTime, fen=START_FEN, maxPlies=MAX_PLIES, verbose=False):
+	"""
+	Play a game between two UCI engines
+	@param white: the engine playing white
+	@type white: UciProcess
+	@param black: the engine playing black
+	@type black: UciProcess
+	@param moveTime: the time budget of each move, in milliseconds
+	@type moveTime: int
+	@param fen: the FEN string of the initial position
+	@type fen: str
+	@param maxPlies: the number of plies after which the game is a draw
+	@type maxPlies: int
+	@param verbose: if the info line of each move must be printed
+	@type verbose: bool
+	@return: the packed moves of the game, the result ('1-0', '0-1' or '1/2-1/2') and the reason
+	@rtype: tuple
+	"""
+
+	position = Position.fromFen(fen)
+	moves = []
+	uciMoves = []
+
+	for engine in (white, black):
+		engine.newGame()
+
+	while True:
+		color = position.sideToMove
+
+		# The end of the game
+		if not legalMoves(position, color):
+			if isSquareAttacked(position, position.kingSquare(color), color ^ 1):
+				return moves, '0-1' if color == COLOR_WHITE else '1-0', 'checkmate'
+			return moves, '1/2-1/2', 'stalemate'
+
+		drawReason = position.drawReason()
+		if drawReason is not None:
+			return moves, '1/2-1/2', drawReason
+		if len(moves) >= maxPlies:
+			return moves, '1/2-1/2', 'adjudication'
+
+		engine = white if color == COLOR_WHITE else black
+		name, info = engine.bestMove(fen, uciMoves, moveTime)
+
+		move = moveFromUci(position, name)
+		if move is None:
+			# An illegal move loses the game
+			return moves, '0-1' if color == COLOR_WHITE else '1-0', f'illegal move {name} by {engine.name}'
+
+		if verbose and info is not None:
+			print(f'{moveToUci(move)} : {info}')
+
+		position.makeMove(move)
+		moves.append(move)
+		uciMoves.append(name)
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Play games between two UCI engines')
+	parser.add_argument('--first', default=DEFAULT_ENGINE, help='the command line of the first engine')
+	parser.add_argument('--second', default=DEFAULT_ENGINE, help='the command line of the second engine')
+	parser.add_argument('--games', type=int, default=2, help='the number of games, the engines swap colors after each game')
+	parser.add_argument('--movetime', type=int, default=100, help='the time budget of each move, in milliseconds')
+	parser.add_argument('--fen', default=START_FEN, help='the initial position of the games')
+	parser.add_argument('--max-plies', type=int, default=MAX_PLIES, help='the number of plies after which a game is a draw')
+	parser.add_argument('--pgn', help='the PGN file where the games are written')
+	parser.add_argument('--verbose', action='store_true', help='print the info line of each move')
+	arguments = parser.parse_args()
+
+	engines = [UciProcess(arguments.first), UciProcess(arguments.second)]
+	points = [0, 0]
+	output = open(arguments.pgn, 'w', encoding='utf-8') if arguments.pgn else None
+	startTime = time.perf_counter()
+
+	try:
+		for game in range(arguments.games):
+			# The engines swap colors after each game
+			whiteIndex = game % 2
+			white, black = engines[whiteIndex], engines[1 - whiteIndex]
+
+			moves, result, reason = playGame(white, black, arguments.movetime, arguments.fen, arguments.max_plies,
+				arguments.verbose)
+
+			if result == '1/2-1/2':
+				points[0] += 0.5
+				points[1] += 0.5
+			else:
+				points[whiteIndex if result == '1-0' else 1 - whiteIndex] += 1
+
+			print(f'game {game + 1} : {white.name} - {black.name} {result} ({reason}, {len(moves)} plies), '
+				f'score {points[0]} - {points[1]}')
+
+			if output is not None:
+				headers = {'Event': 'UCI match', 'Round': str(game + 1), 'White': white.name, 'Black': black.name,
+					'Result': result, 'Termination': reason}
+				output.write(pgn.gameToPgn(moves, headers, arguments.fen) + '\n')
+				output.flush()
+	finally:
+		for engine in engines:
+			engine.quit()
+		if output is not None:
+			output.close()
+
+	print(f'{arguments.first} {points[0]} - {points[1]} {arguments.second} in {time.perf_counter() - startTime:.1f}s')
+
+
+if __name__ == '__main__':
+	main()
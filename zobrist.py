@@ -0,0 +1,29 @@
+"""
+Zobrist hashing : the key of a position is the XOR of a random 64 bits number for each piece on each
+square, for the side to move, for the castling rights and for the en passant file. Moving a piece only
+needs to XOR out its old key and XOR in its new key, so the Position keeps its hash up to date while
+the moves are played (see bitboard.Position)
+
+The random numbers come from a fixed seed, so the keys are the same in every process
+"""
+
+import random
+
+_random = random.Random(0x5EED)
+
+# PIECE_KEYS[pieceCode][square]
+PIECE_KEYS = [[_random.getrandbits(64) for _ in range(64)] for _ in range(12)]
+
+# PAWN_KEYS[pieceCode][square] : the keys of the pawns, and 0 for the other pieces. The pawn hash of a
+# position only depends on its pawns, it is the key of the pawn structure cache (see pawn_table.py)
+PAWN_KEYS = [PIECE_KEYS[code] if code % 6 == 0 else [0] * 64 for code in range(12)]
+
+# XORed when black has the turn
+SIDE_KEY = _random.getrandbits(64)
+
+# CASTLING_KEYS[castling rights], one key for each combination of the 4 rights
+CASTLING_KEYS = [_random.getrandbits(64) for _ in range(16)]
+
+# EN_PASSANT_KEYS[file of the en passant square]
+EN_PASSANT_KEYS = [_random.getrandbits(64) for _ in range(8)]
+